@@ -19,6 +19,8 @@ const Chat: React.FC = () => {
     const { speak, stop, isSpeaking } = useTextToSpeech();
 
     const messagesEndRef = useRef<HTMLDivElement>(null);
+    // One conversation session per chat screen visit (server-side window + chat_logs.session_id)
+    const sessionIdRef = useRef<string>(crypto.randomUUID ? crypto.randomUUID() : `${Date.now()}-${Math.random().toString(36).slice(2)}`);
 
     // Auto-scroll
     useEffect(() => {
@@ -98,42 +100,84 @@ const Chat: React.FC = () => {
         try {
             const userId = localStorage.getItem('celest_user_id') || 'demo';
 
-            // Sliding Window: Send last 6 messages as context
-            const recentHistory = messages.slice(-6).map(m => ({
+            // The server keeps the conversation window per session: signed-in users send only the
+            // last exchange (lets it catch up when its window is behind). Demo has no window: last 6.
+            const recentHistory = messages.slice(userId === 'demo' ? -6 : -2).map(m => ({
                 role: m.sender === 'user' ? 'user' : 'assistant',
                 content: m.text
             }));
 
             const API_BASE = import.meta.env.VITE_API_URL || "";
-            const response = await fetch(`${API_BASE}/agent/chat`, {
+            // Streaming endpoint (SSE): the Oracle's words appear as they are generated
+            const response = await fetch(`${API_BASE}/agent/chat/stream`, {
                 method: 'POST',
                 headers: { 'Content-Type': 'application/json' },
                 body: JSON.stringify({
                     user_id: userId,
                     message: userText,
-                    history: recentHistory, // NEW: Context Window
+                    history: recentHistory,
                     context: {
-                        location: locationState // { lat: ..., lon: ... } or null
+                        location: locationState, // { lat: ..., lon: ... } or null
+                        session_id: sessionIdRef.current
                     }
                 })
             });
 
-            if (!response.ok) throw new Error("Cosmic silence...");
+            if (!response.ok || !response.body) throw new Error("Cosmic silence...");
 
-            const data = await response.json();
+            const aiMsgId = Date.now() + 1;
+            let aiText = '';
+            let started = false;
 
-            // AI Response
-            setMessages((prev) => [
-                ...prev,
-                { id: Date.now() + 1, text: data.message, sender: 'ai' }
-            ]);
-
-            // Handle Actions (Navigation)
-            if (data.actions && data.actions.length > 0) {
-                const action = data.actions[0];
-                if (action.type === 'navigate') {
-                    // Small delay for user to read
-                    setTimeout(() => navigate(action.payload), 3000);
+            const showAiText = (text: string) => {
+                if (!started) {
+                    started = true;
+                    setIsLoading(false);
+                    setMessages((prev) => [...prev, { id: aiMsgId, text, sender: 'ai' }]);
+                } else {
+                    setMessages((prev) => prev.map(m => m.id === aiMsgId ? { ...m, text } : m));
+                }
+            };
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+            let finished = false;
+
+            while (!finished) {
+                const { value, done } = await reader.read();
+                if (done) break;
+                buffer += decoder.decode(value, { stream: true });
+
+                // SSE frames are separated by a blank line
+                let sep;
+                while ((sep = buffer.indexOf('\n\n')) !== -1) {
+                    const frame = buffer.slice(0, sep);
+                    buffer = buffer.slice(sep + 2);
+
+                    const event = frame.match(/^event: (.*)$/m)?.[1];
+                    const dataLine = frame.match(/^data: (.*)$/m)?.[1];
+                    if (!event || !dataLine) continue;
+                    const data = JSON.parse(dataLine);
+
+                    if (event === 'message') {
+                        aiText += data.delta;
+                        showAiText(aiText);
+                    } else if (event === 'done') {
+                        showAiText(data.message);
+                        finished = true;
+
+                        // Handle Actions (Navigation)
+                        if (data.actions && data.actions.length > 0) {
+                            const action = data.actions[0];
+                            if (action.type === 'navigate') {
+                                // Small delay for user to read
+                                setTimeout(() => navigate(action.payload), 3000);
+                            }
+                        }
+                    } else if (event === 'error') {
+                        throw new Error(data.metadata?.error || "Cosmic silence...");
+                    }
                 }
             }
 
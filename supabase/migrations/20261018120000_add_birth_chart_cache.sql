@@ -0,0 +1,3 @@
+-- Memoized natal chart per user (computed once from birth data, reset on onboarding)
+ALTER TABLE birth_charts ADD COLUMN IF NOT EXISTS natal_chart JSONB;
+ALTER TABLE birth_charts ADD COLUMN IF NOT EXISTS natal_chart_key TEXT;
@@ -0,0 +1,33 @@
+-- Durable queue for insight extraction (INSIGHT_QUEUE=supabase, drained by tools/insight_worker.py)
+CREATE TABLE IF NOT EXISTS insight_jobs (
+    id BIGSERIAL PRIMARY KEY,
+    payload JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending', -- pending | running | dead
+    attempts INTEGER NOT NULL DEFAULT 0,
+    available_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    locked_until TIMESTAMPTZ,
+    last_error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS insight_jobs_claim_idx ON insight_jobs (status, available_at);
+
+-- Leases up to p_limit due jobs; SKIP LOCKED lets several workers claim concurrently
+CREATE OR REPLACE FUNCTION claim_insight_jobs(p_limit INTEGER, p_lease_seconds INTEGER)
+RETURNS SETOF insight_jobs
+LANGUAGE sql
+AS $$
+    UPDATE insight_jobs
+    SET status = 'running',
+        attempts = attempts + 1,
+        locked_until = now() + make_interval(secs => p_lease_seconds)
+    WHERE id IN (
+        SELECT id FROM insight_jobs
+        WHERE (status = 'pending' AND available_at <= now())
+           OR (status = 'running' AND locked_until < now())
+        ORDER BY id
+        LIMIT p_limit
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING *;
+$$;
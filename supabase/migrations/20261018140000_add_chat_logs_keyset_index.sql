@@ -0,0 +1,8 @@
+-- Keyset pagination for /agent/chat_history: (created_at, id) < cursor, newest first
+CREATE INDEX IF NOT EXISTS chat_logs_user_created_idx
+    ON chat_logs (user_id, created_at DESC, id DESC);
+
+-- Same order within a session (session_id filter)
+CREATE INDEX IF NOT EXISTS chat_logs_user_session_created_idx
+    ON chat_logs (user_id, session_id, created_at DESC, id DESC)
+    WHERE session_id IS NOT NULL;
@@ -0,0 +1,12 @@
+-- Shared dashboard widget text, content-addressed by the quantized prompt inputs
+-- (date, planetary hour ruler, void Moon, score buckets). Written by the API, read across users.
+CREATE TABLE IF NOT EXISTS dashboard_narratives (
+    key TEXT PRIMARY KEY,
+    date DATE NOT NULL,
+    inputs JSONB NOT NULL,
+    content JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+-- Old days are never read again; lets a cron prune by date
+CREATE INDEX IF NOT EXISTS dashboard_narratives_date_idx ON dashboard_narratives (date);
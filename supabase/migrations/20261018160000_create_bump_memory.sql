@@ -0,0 +1,14 @@
+-- Atomic consolidation bump for near-duplicate memories (tools/memory_store.py MemoryStore._bump).
+-- The row lock taken by UPDATE serializes concurrent bumps, so every repeat counts once.
+CREATE OR REPLACE FUNCTION bump_memory(p_id memories.id%TYPE, p_seen_at TEXT)
+RETURNS JSONB
+LANGUAGE sql
+AS $$
+    UPDATE memories
+    SET metadata = COALESCE(metadata, '{}'::jsonb) || jsonb_build_object(
+        'frequency', COALESCE((metadata->>'frequency')::INTEGER, 1) + 1,
+        'last_seen', p_seen_at
+    )
+    WHERE id = p_id
+    RETURNING metadata;
+$$;
@@ -0,0 +1,37 @@
+-- Batch consolidation for MemoryStore.store_batch (tools/memory_store.py MemoryStore._consolidate).
+-- One round trip finds the nearest existing memory of every batch item, and one applies all
+-- frequency bumps after the insert succeeded (supersedes per-item match_memories + bump_memory).
+
+-- p_queries: [{"user_id": ..., "embedding": [...]}, ...] -> best match per query index (0-based)
+CREATE OR REPLACE FUNCTION match_memories_batch(p_queries JSONB, match_threshold FLOAT)
+RETURNS TABLE (query_index INTEGER, id TEXT, content TEXT, metadata JSONB, similarity FLOAT)
+LANGUAGE sql STABLE
+AS $$
+    SELECT (q.ord - 1)::INTEGER, best.id, best.content, best.metadata, best.similarity
+    FROM jsonb_array_elements(p_queries) WITH ORDINALITY AS q(query, ord)
+    CROSS JOIN LATERAL (
+        SELECT m.id::TEXT AS id, m.content, m.metadata,
+               1 - (m.embedding <=> (q.query->>'embedding')::vector) AS similarity
+        FROM memories m
+        WHERE m.user_id::TEXT = q.query->>'user_id'
+        ORDER BY m.embedding <=> (q.query->>'embedding')::vector
+        LIMIT 1
+    ) best
+    WHERE best.similarity >= match_threshold;
+$$;
+
+-- p_bumps: [{"id": ..., "count": n}, ...] (one entry per id) -> frequency + n, last_seen.
+-- The row locks taken by UPDATE serialize concurrent bumps, so every repeat counts once.
+CREATE OR REPLACE FUNCTION bump_memories(p_bumps JSONB, p_seen_at TEXT)
+RETURNS TABLE (id TEXT, metadata JSONB)
+LANGUAGE sql
+AS $$
+    UPDATE memories m
+    SET metadata = COALESCE(m.metadata, '{}'::jsonb) || jsonb_build_object(
+        'frequency', COALESCE((m.metadata->>'frequency')::INTEGER, 1) + (b.value->>'count')::INTEGER,
+        'last_seen', p_seen_at
+    )
+    FROM jsonb_array_elements(p_bumps) AS b(value)
+    WHERE m.id::TEXT = b.value->>'id'
+    RETURNING m.id::TEXT, m.metadata;
+$$;
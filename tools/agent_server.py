@@ -7,8 +7,9 @@ from typing import Optional, Dict, Any, List
 from dotenv import load_dotenv
 from supabase import create_client, Client
 import math
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 import json
+import base64
 from datetime import datetime, timedelta
 import asyncio # Added
 # Removed bad import
@@ -16,9 +17,26 @@ import asyncio # Added
 import uuid
 import stripe
 from fastapi import BackgroundTasks, Request
-from memory_store import MemoryStore
+from fastapi.responses import StreamingResponse
+from memory_store import MemoryStore, MemoryBatcher
+from embedding_cache import EmbeddingCache
+from message_gate import MessageGate
+from vector_index import LocalVectorIndex
+from job_queue import get_job_queue
+from chat_log_buffer import ChatLogBuffer
+from session_state import SessionStore
+import metrics
 from insight_processor import InsightProcessor
-from wheel_engine import WheelEngine
+from wheel_engine import WheelEngine, WHEEL_BACKEND
+from io_pool import run_blocking, get_http_client, shutdown as shutdown_io_pool
+from chart_cache import ChartCache, make_chart_key, is_current_key
+from sky_snapshot import SkySnapshot
+from json_stream import JsonFieldStream
+from prompts import CHAT_PROTOCOL, format_chat_context
+from prompt_budget import PromptAssembler, warm_up as warm_up_token_counter
+import aspect_engine
+from narrative_cache import NarrativeCache, narrative_inputs, NARRATIVE_SCORE_BUCKET
+from pair_cache import PairCache
 
 # Load Environment
 load_dotenv('.env.local')
@@ -34,9 +52,21 @@ if not all([SUPABASE_URL, SUPABASE_KEY, OPENAI_API_KEY]):
 
 # Initialize Clients
 supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
-memory_store = MemoryStore(supabase, openai_client)
-insight_processor = InsightProcessor(openai_client, memory_store)
+openai_client = OpenAI(api_key=OPENAI_API_KEY)  # Sync client: background workers (memory/insights)
+async_openai = AsyncOpenAI(api_key=OPENAI_API_KEY)  # Async client: request path (never blocks the event loop)
+# MEMORY_INDEX=local answers recall from an in-process vector index (rpc = match_memories)
+vector_index = LocalVectorIndex(supabase) if os.getenv("MEMORY_INDEX", "rpc") == "local" else None
+memory_store = MemoryStore(supabase, openai_client, embedding_cache=EmbeddingCache(), vector_index=vector_index)
+memory_batcher = MemoryBatcher(memory_store)  # Stores in the request's task (MEMORY_BATCH_WINDOW_MS>0: cross-user batching)
+insight_processor = InsightProcessor(openai_client, memory_store, batcher=memory_batcher)
+message_gate = MessageGate()
+chat_log_buffer = ChatLogBuffer(supabase)  # One bulk insert per request (CHAT_LOG_FLUSH_MS>0: timed write-behind)
+session_store = SessionStore()  # Conversation windows (in-process stand-in for Redis)
+SESSION_HYDRATE_LIMIT = 40  # chat_logs rows replayed into a cold session (summary + window)
+prompt_assembler = PromptAssembler()  # Input-token budget for the chat prompt
+print(f"🔤 Token counter: {warm_up_token_counter()}")  # Load the encoding now, not on the event loop
+insight_queue = get_job_queue(supabase)  # INSIGHT_QUEUE=sqlite|supabase -> tools/insight_worker.py
+narrative_cache = NarrativeCache(supabase)  # Dashboard text shared by astrological state
 
 app = FastAPI(title="Celest AI Soul-Guide Agent")
 
@@ -44,6 +74,12 @@ app = FastAPI(title="Celest AI Soul-Guide Agent")
 from payment_routes import router as payment_router
 app.include_router(payment_router)
 
+@app.on_event("shutdown")
+async def close_pools():
+    await run_blocking(memory_batcher.close)  # Flush pending memories before the pool goes away
+    await run_blocking(chat_log_buffer.close)
+    await shutdown_io_pool()
+
 # CORS
 app.add_middleware(
     CORSMiddleware,
@@ -80,6 +116,8 @@ class ChartDataRequest(BaseModel):
 
 
 import swisseph as swe
+import numpy as np
+from ephemeris import calculate_positions_batch, CLASSICAL_BODIES
 
 # Zodiac Signs Map
 ZODIAC_SIGNS = [
@@ -94,36 +132,60 @@ from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut, GeocoderServiceError
 # from timezonefinder import TimezoneFinder # REMOVED to save 50MB+ (Vercel Limit)
+from tz_index import get_default_index # Offline replacement (packed polygon index)
 import requests # Lightweight alternative
 import pytz
 from datetime import datetime
 import functools
+import unicodedata
+from local_cache import LocalCache, MISSING, default_cache_path
 
 # Initialize Geocoder (OpenStreetMap - Free, No API Key)
 _geolocator = Nominatim(user_agent="celest_ai_astrology", timeout=8)
 # _timezone_finder = TimezoneFinder() # REMOVED
 
-# In-Memory Cache for Performance (avoids repeated API calls)
-_geocache = {}
+# Persistent Geocode Cache (LRU in memory + SQLite on disk, survives cold starts)
+# Positive hits rarely change; misses are cached briefly so typos don't hammer Nominatim.
+GEOCODE_CACHE_TTL = float(os.getenv("GEOCODE_CACHE_TTL_DAYS", "90")) * 86400
+GEOCODE_NEGATIVE_TTL = float(os.getenv("GEOCODE_NEGATIVE_TTL_HOURS", "24")) * 3600
+_geocache = LocalCache(
+    "geocode",
+    path=default_cache_path(),
+    max_items=int(os.getenv("GEOCODE_CACHE_SIZE", "2048")),
+    ttl=GEOCODE_CACHE_TTL
+)
 
 class GeocodingError(Exception):
     """Raised when city geocoding fails - for API error responses"""
     pass
 
+class ChartCalculationError(Exception):
+    """Raised when the ephemeris/timezone step fails - placeholder charts are never memoized"""
+    pass
+
+def normalize_place(text: str) -> str:
+    """
+    Cache-key normalization: accent folding + case folding + collapsed whitespace/punctuation.
+    "São Paulo", "sao  paulo" and "Sao-Paulo" all map to "sao paulo".
+    """
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    folded = "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+    return " ".join("".join(c if c.isalnum() else " " for c in folded).split())
+
 def geocode_city(city: str, country: str = "") -> tuple:
     """
     Geocode any city worldwide using OpenStreetMap Nominatim.
     Returns (latitude, longitude) tuple.
     Raises GeocodingError if city not found (NO silent fallback!).
     """
-    cache_key = f"{city.lower().strip()}_{country.lower().strip()}"
+    cache_key = f"{normalize_place(city)}|{normalize_place(country)}"
     
-    # Check cache first
-    if cache_key in _geocache:
-        cached = _geocache[cache_key]
+    # Check cache first (None = cached "not found")
+    cached = _geocache.get(cache_key, MISSING)
+    if cached is not MISSING:
         if cached is None:
             raise GeocodingError(f"Cidade não encontrada: {city}")
-        return cached
+        return tuple(cached)
     
     try:
         # Build query (city + country for better accuracy)
@@ -132,15 +194,16 @@ def geocode_city(city: str, country: str = "") -> tuple:
         
         if location:
             result = (location.latitude, location.longitude)
-            _geocache[cache_key] = result
+            _geocache.set(cache_key, list(result))
             print(f"📍 Geocoded: {query} → ({result[0]:.4f}, {result[1]:.4f})")
             return result
         else:
             # Cache the failure to avoid repeated lookups
-            _geocache[cache_key] = None
+            _geocache.set(cache_key, None, ttl=GEOCODE_NEGATIVE_TTL)
             raise GeocodingError(f"Cidade não encontrada: {city}")
             
     except (GeocoderTimedOut, GeocoderServiceError) as e:
+        # Service failures are NOT cached - the city may well exist
         print(f"⚠️ Geocoder error: {e}")
         raise GeocodingError(f"Erro ao buscar cidade: {city}. Serviço indisponível.")
     except GeocodingError:
@@ -151,17 +214,19 @@ def geocode_city(city: str, country: str = "") -> tuple:
 
 def get_timezone_for_coords(lat: float, lon: float) -> str:
     """
-    Get IANA timezone string for coordinates using lightweight API 
-    (Replaces heavy TimezoneFinder library).
-    Fallback to UTC on error.
+    Get IANA timezone string for coordinates.
+    1. Offline packed polygon index (tz_index.py) - microseconds, deterministic.
+    2. Lightweight API (timeapi.io) only if the index file hasn't been built/deployed.
+    Returns None when neither could resolve the zone.
     """
+    tz_index = get_default_index()
+    if tz_index is not None:
+        try:
+            return tz_index.lookup(lat, lon)
+        except Exception as e:
+            print(f"⚠️ Timezone Index Error: {e}")
+
     try:
-        # Service 1: w3w or similar? No, let's use a standard public API.
-        # Open-Meteo (Excellent availability)
-        # url = f"https://utc-offset.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&daily=temperature_2m&timezone=auto"
-        # The 'timezone' field in response header or body?
-        # Actually, let's use timeapi.io which is explicit.
-        
         url = f"https://timeapi.io/api/TimeZone/coordinate?latitude={lat}&longitude={lon}"
         # Response: {"timeZone": "America/Sao_Paulo", ...}
         
@@ -174,30 +239,38 @@ def get_timezone_for_coords(lat: float, lon: float) -> str:
     except Exception as e:
         print(f"⚠️ Timezone API Error: {e}")
         
-    return "UTC"
+    return None
 
 def convert_local_to_utc(year: int, month: int, day: int, hour: int, minute: int, lat: float, lon: float) -> tuple:
     """
     Convert local birth time to UTC using historical timezone data.
     Handles Daylight Saving Time (DST) automatically.
     
-    Returns: (utc_hour_decimal, timezone_name, utc_offset_hours)
+    Returns: (utc_hour_decimal, timezone_name, utc_offset_hours, utc_year, utc_month, utc_day, exact)
+    exact=False means the zone could not be resolved and local time was used as UTC:
+    the result is provisional and must not be memoized.
     
     Example:
       São Paulo, Jan 1, 1995, 06:00 local
       -> Brazil was in DST (GMT-2)
-      -> Returns (8.0, 'America/Sao_Paulo', -2)
+      -> Returns (8.0, 'America/Sao_Paulo', -2, 1995, 1, 1, True)
     """
     tz_name = get_timezone_for_coords(lat, lon)
     
     try:
+        if tz_name is None:
+            raise ValueError("timezone lookup failed")
         local_tz = pytz.timezone(tz_name)
         
         # Create naive datetime
         naive_dt = datetime(year, month, day, hour, minute)
         
         # Localize to the birth location's timezone (handles historical DST)
-        local_dt = local_tz.localize(naive_dt, is_dst=None)
+        try:
+            local_dt = local_tz.localize(naive_dt, is_dst=None)
+        except (pytz.AmbiguousTimeError, pytz.NonExistentTimeError):
+            # Clock change hour (repeated or skipped): read it as standard time, deterministically
+            local_dt = local_tz.localize(naive_dt, is_dst=False)
         
         # Convert to UTC
         utc_dt = local_dt.astimezone(pytz.UTC)
@@ -210,11 +283,14 @@ def convert_local_to_utc(year: int, month: int, day: int, hour: int, minute: int
         
         print(f"🕐 Timezone: {tz_name} | Local: {hour:02d}:{minute:02d} → UTC: {utc_dt.hour:02d}:{utc_dt.minute:02d} (Offset: {utc_offset:+.0f}h)")
         
-        return (utc_hour_decimal, tz_name, utc_offset, utc_dt.year, utc_dt.month, utc_dt.day)
+        return (utc_hour_decimal, tz_name, utc_offset, utc_dt.year, utc_dt.month, utc_dt.day, True)
         
     except Exception as e:
         print(f"⚠️ Timezone conversion error: {e}, using local time as UTC")
-        return (hour + minute/60.0, "UTC", 0, year, month, day)
+        return (hour + minute/60.0, "UTC", 0, year, month, day, False)
+
+# Shared "Sky Now": transits computed once per bucket and served to every request
+sky_snapshot = SkySnapshot(bucket_seconds=int(os.getenv("TRANSIT_BUCKET_SECONDS", "60")))
 
 class AstrologyEngine:
     @staticmethod
@@ -230,78 +306,50 @@ class AstrologyEngine:
                 lat, lon = geocode_city(city, country)
             
             # 2. Convert Local Time to UTC (Historical DST Awareness!)
-            utc_hour, tz_name, utc_offset, utc_year, utc_month, utc_day = convert_local_to_utc(
+            utc_hour, tz_name, utc_offset, utc_year, utc_month, utc_day, tz_exact = convert_local_to_utc(
                 year, month, day, hour, minute, lat, lon
             )
             
             # 3. Julian Day in UTC (Now Accurate!)
             jd = swe.julday(utc_year, utc_month, utc_day, utc_hour)
             
-            # 4. Calculate Houses (Placidus System) - Returns Ascendant!
-            # swe.houses(jd, lat, lon, house_system)
-            # Returns: (cusps[12], ascmc[10]) where ascmc[0] = Ascendant, ascmc[1] = MC
-            house_cusps = None
+            # 4. Planets + Houses (Placidus) via the shared batch ephemeris (N=1)
+            # Houses need the birth time; skip them when it is unknown.
+            batch = calculate_positions_batch([jd], [lat], [lon], with_houses=not time_unknown)
+            
             ascendant_data = {"sign": "Unknown", "longitude": 0.0}
             mc_data = {"sign": "Unknown", "longitude": 0.0}
             
-            if not time_unknown:
-                try:
-                    cusps, ascmc = swe.houses(jd, lat, lon, b'P')  # 'P' = Placidus
-                    asc_lon = ascmc[0]
-                    mc_lon = ascmc[1]
-                    ascendant_data = {
-                        "sign": AstrologyEngine.get_sign_from_long(asc_lon),
-                        "longitude": asc_lon
-                    }
-                    mc_data = {
-                        "sign": AstrologyEngine.get_sign_from_long(mc_lon),
-                        "longitude": mc_lon
-                    }
-                    house_cusps = list(cusps)  # Convert tuple to list for JSON serialization
-                except Exception as he:
-                    print(f"House calculation error: {he}")
+            asc_lon = batch["ascendant"][0]
+            if not math.isnan(asc_lon):
+                mc_lon = float(batch["mc"][0])
+                ascendant_data = {
+                    "sign": AstrologyEngine.get_sign_from_long(asc_lon),
+                    "longitude": float(asc_lon)
+                }
+                mc_data = {
+                    "sign": AstrologyEngine.get_sign_from_long(mc_lon),
+                    "longitude": mc_lon
+                }
             
-            # 4. Calculate Planets
-            def get_data(planet_id):
-                flags = swe.FLG_MOSEPH | swe.FLG_SPEED
-                res = swe.calc_ut(jd, planet_id, flags)
-                
-                if isinstance(res, tuple) and len(res) > 0:
-                     coords = res[0]
-                     if isinstance(coords, tuple) and len(coords) > 0:
-                         lon_p = coords[0]
-                         # Determine house placement if cusps available
-                         house_num = "Unknown"
-                         if house_cusps:
-                             for i in range(12):
-                                 next_i = (i + 1) % 12
-                                 cusp_start = house_cusps[i]
-                                 cusp_end = house_cusps[next_i]
-                                 # Handle wrap-around (e.g., 350° to 10°)
-                                 if cusp_start > cusp_end:
-                                     if lon_p >= cusp_start or lon_p < cusp_end:
-                                         house_num = str(i + 1)
-                                         break
-                                 else:
-                                     if cusp_start <= lon_p < cusp_end:
-                                         house_num = str(i + 1)
-                                         break
-                         return {"sign": AstrologyEngine.get_sign_from_long(lon_p), "house": house_num, "longitude": lon_p}
-                         
-                return {"sign": "Unknown", "house": "Unknown", "longitude": 0.0}
-
-            return {
-                "sun": get_data(swe.SUN),
-                "moon": get_data(swe.MOON),
-                "mercury": get_data(swe.MERCURY),
-                "venus": get_data(swe.VENUS),
-                "mars": get_data(swe.MARS),
-                "jupiter": get_data(swe.JUPITER),
-                "saturn": get_data(swe.SATURN),
-                "ascendant": ascendant_data,
-                "mc": mc_data,
-                "location": {"lat": lat, "lon": lon, "city": city}
-            }
+            chart = {}
+            for j, body in enumerate(batch["bodies"]):
+                lon_p = float(batch["longitude"][0, j])
+                house_num = int(batch["house"][0, j])
+                chart[body] = {
+                    "sign": ZODIAC_SIGNS[batch["sign"][0, j]],
+                    "house": str(house_num) if house_num else "Unknown",
+                    "longitude": lon_p
+                }
+            
+            chart["ascendant"] = ascendant_data
+            chart["mc"] = mc_data
+            # House cusps 1-12 (Placidus); None when the birth time is unknown (Wheel of Life input)
+            chart["cusps"] = batch["cusps"][0].tolist() if not math.isnan(asc_lon) else None
+            chart["location"] = {"lat": lat, "lon": lon, "city": city}
+            if not tz_exact:
+                chart["provisional"] = True  # Local time used as UTC: served, never memoized
+            return chart
 
         except GeocodingError:
             # Re-raise geocoding errors - these should become HTTP 400s
@@ -315,131 +363,33 @@ class AstrologyEngine:
                 "ascendant": {"sign": "Leo", "longitude": 0.0}
             }
 
+    @staticmethod
+    def calculate_charts_batch(jds, lats, lons, time_unknown: bool = False) -> Dict:
+        """
+        Batch entry point for N birth moments (UT Julian days + coordinates).
+        Returns NumPy arrays (longitude, speed, sign, house, cusps, ascendant, mc) for the
+        ten chart bodies at once. Use for synastry/compatibility backfills.
+        """
+        return calculate_positions_batch(jds, lats, lons, with_houses=not time_unknown)
+
     @staticmethod
     def calculate_synastry(chart_a: Dict, chart_b: Dict, context: str = 'love') -> Dict:
         """
         Calculates geometric aspects between two charts with Context-Aware Weighting.
         context: 'love', 'work', 'social'
+        Weight matrices are precompiled per context; resolution is vectorized (aspect_engine).
         """
-        aspects = []
-        score = 0
-        
-        # --- WEIGHT MATRIX (The Intelligence) ---
-        # Defines how each aspect is weighted based on the "Lens"
-        
-        # Base Weights (Fallback)
-        base_weights = {
-            "Conjunction": 10, "Opposition": -5, "Trine": 15, "Square": -10, "Sextile": 5
-        }
-        
-        # Context Modifiers
-        # If (Planet A or B is X) AND (Aspect is Y) -> New Weight
-        modifiers = {
-            'love': {
-                'Square': -15, # Tension is fatal in romance
-                'Opposition': -10,
-                'Trine': 20, # Flow is critical
-                ('saturn', 'moon', 'Square'): -25, # The "Cold Heart" aspect
-                ('venus', 'mars', 'Conjunction'): 30, # The "Passion" aspect
-                ('sun', 'moon', 'Conjunction'): 30 # Soulmate
-            },
-            'work': {
-                'Square': 5, # Tension = Drive/Ambition (Good for business!)
-                'Opposition': 0, # Complementary views
-                'Trine': 10, # Good but lazy?
-                ('saturn', 'sun', 'Conjunction'): 25, # Structure + Authority (Great for work)
-                ('mercury', 'mercury', 'Trine'): 25, # Brainstorming flow
-                ('mars', 'saturn', 'Square'): 15 # "Unstoppable Force" (High energy)
-            },
-            'social': {
-                'Square': -5, # Annoying but manageable
-                'Trine': 20, # Party vibes
-                ('jupiter', 'sun', 'Conjunction'): 30, # The "Best Friends" aspect
-                ('moon', 'moon', 'Trine'): 25 # Emotional safety
-            }
-        }
-        
-        current_mod = modifiers.get(context, modifiers['love'])
-        
-        # Sacred Geometry Defs
-        defs = [
-            {"name": "Conjunction", "angle": 0, "orb": 8},
-            {"name": "Opposition", "angle": 180, "orb": 8},
-            {"name": "Trine", "angle": 120, "orb": 8},
-            {"name": "Square", "angle": 90, "orb": 8},
-            {"name": "Sextile", "angle": 60, "orb": 6}
-        ]
-        
-        planets = ["sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn"]
-        
-        # Calculation
-        for p1 in planets:
-            for p2 in planets:
-                if p1 not in chart_a or p2 not in chart_b: continue
-                
-                pos1 = chart_a[p1].get("longitude", 0)
-                pos2 = chart_b[p2].get("longitude", 0)
-                
-                diff = abs(pos1 - pos2)
-                if diff > 180: diff = 360 - diff
-                
-                for aspect in defs:
-                    orb = abs(diff - aspect["angle"])
-                    if orb <= aspect["orb"]:
-                        name = aspect["name"]
-                        
-                        # 1. Determine Weight
-                        weight = base_weights.get(name, 0)
-                        
-                        # 2. Apply General Context Modifier
-                        if name in current_mod:
-                            weight = current_mod[name]
-                            
-                        # 3. Apply Specific Planet Modifier (Tuple Lookup)
-                        # We check p1,p2 and p2,p1 order
-                        specific_key_1 = (p1, p2, name)
-                        specific_key_2 = (p2, p1, name)
-                        
-                        if specific_key_1 in current_mod: weight = current_mod[specific_key_1]
-                        elif specific_key_2 in current_mod: weight = current_mod[specific_key_2]
-
-                        aspects.append({
-                            "planet_a": p1,
-                            "planet_b": p2,
-                            "aspect": name,
-                            "orb_tightness": round(orb, 2),
-                            "weight": weight,
-                            "description": f"{p1.capitalize()} {name} {p2.capitalize()}"
-                        })
-                        score += weight
-                        break 
-        
-        # Normalize Score
-        normalized_score = 50 + (score * 0.5)
-        normalized_score = min(100, max(0, normalized_score))
-
-        return {
-            "score": round(normalized_score),
-            "raw_score": score,
-            "aspects": aspects,
-            "count": len(aspects),
-            "context": context
-        }
+        return aspect_engine.synastry(chart_a, chart_b, context)
 
 # --- Soul-Guide Agent Logic --- 
 
     @staticmethod
     def get_current_transits(lat: float = 0.0, lon: float = 0.0):
-        now = datetime.utcnow()
-        # Use simple coordinate lookups or pass lat/lon if library supports specific topocentric or ascendant calculation
-        # Swisseph calc_ut doesn't heavily depend on lat/lon for PLANETARY positions (except Moon slightly/Topocentric), 
-        # BUT it is critical for ASCENDANT and HOUSES.
-        # However, calculate_chart implementation above assumes city name lookup or creates a chart. 
-        # We need to pass the coordinates. 
-        # For this MVP, we are recalculating just planets. The 'overlay' relies on Natal Ascendant.
-        # But if we want specific 'Sky Now' houses (e.g. "What is the Ascendant NOW?"), we'd need full calc.
-        # Let's pass "Local" as city name to indicate custom coords usage if expanded later.
-        return AstrologyEngine.calculate_chart("Transit", now.year, now.month, now.day, now.hour, now.minute, "Local", "Local")
+        # Geocentric planetary positions don't depend on lat/lon (only Ascendant/Houses do),
+        # and they barely move within a minute: serve the shared time-bucketed snapshot
+        # (velocity-interpolated) instead of a full chart per request.
+        # The 'overlay' relies on the Natal Ascendant, so transit houses stay "Unknown".
+        return sky_snapshot.chart()
 
     @staticmethod
     def calculate_house_overlay(planet_lon: float, ascendant_lon: float) -> int:
@@ -578,6 +528,9 @@ def get_user_profile(user_id: str):
                 # Check for metadata flag if stored, or infer
                 user_data["time_unknown"] = chart_data.get("time_unknown", False) 
                 user_data["country"] = "BR" 
+                # Memoized natal chart (see get_natal_chart)
+                user_data["natal_chart"] = chart_data.get("natal_chart")
+                user_data["natal_chart_key"] = chart_data.get("natal_chart_key")
         except Exception as e:
             print(f"⚠️ Failed to fetch birth chart: {e}")
 
@@ -587,6 +540,79 @@ def get_user_profile(user_id: str):
         print(f"❌ Supabase Connection Error: {e}")
         return None
 
+# --- Natal Chart Memoization ---
+
+natal_chart_cache = ChartCache(max_items=int(os.getenv("CHART_CACHE_SIZE", "512")))
+
+def get_natal_chart(profile: Dict, user_id: str = None) -> Dict:
+    """
+    Natal chart for a profile, memoized by birth data (it never changes).
+    Order: chart persisted in birth_charts -> in-process LRU -> full calculation.
+    Raises GeocodingError for unknown cities (same contract as calculate_chart) and
+    ChartCalculationError when calculate_chart falls back to its placeholder chart.
+    """
+    b_date_str = profile.get("birth_date", "1990-01-01")
+    b_time_str = profile.get("birth_time", "12:00")
+    b_date = datetime.strptime(b_date_str, "%Y-%m-%d")
+    b_hour, b_min = map(int, b_time_str.split(':')[:2])
+    city = profile.get("birth_city", "London")
+    country = profile.get("country", "US")
+    time_unknown = bool(profile.get("time_unknown", False))
+
+    # 1. Persisted chart (skips geocoding + timezone lookups entirely)
+    persisted = profile.get("natal_chart")
+    persisted_key = profile.get("natal_chart_key")
+    if persisted and is_current_key(persisted_key, b_date_str, b_time_str, time_unknown) \
+            and persisted.get("location", {}).get("city") == city:
+        natal_chart_cache.put(persisted_key, persisted, user_id)
+        return persisted
+
+    # 2. In-process LRU
+    lat, lon = geocode_city(city, country)
+    key = make_chart_key(b_date_str, b_time_str, lat, lon, time_unknown)
+    chart = natal_chart_cache.get(key)
+    if chart:
+        return chart
+
+    # 3. Full calculation
+    chart = AstrologyEngine.calculate_chart(
+        profile.get("full_name", "User"),
+        b_date.year, b_date.month, b_date.day,
+        b_hour, b_min,
+        city, country,
+        time_unknown=time_unknown, lat=lat, lon=lon
+    )
+    if "location" not in chart:
+        # Placeholder from a transient ephemeris/timezone failure: never memoize or persist it
+        raise ChartCalculationError(f"Falha ao calcular o mapa natal ({city})")
+    if chart.get("provisional"):
+        # Timezone unresolved (local time as UTC): serve it, recompute on the next call
+        return chart
+    natal_chart_cache.put(key, chart, user_id)
+
+    if user_id and user_id != "demo":
+        try:
+            supabase.table("birth_charts").update({
+                "natal_chart": chart,
+                "natal_chart_key": key
+            }).eq("user_id", user_id).execute()
+        except Exception as e:
+            # Column missing (migration not applied) -> LRU only
+            print(f"⚠️ Natal chart persist skipped: {e}")
+
+    return chart
+
+def invalidate_natal_chart(user_id: str):
+    """Birth data changed: drop the memoized chart everywhere."""
+    natal_chart_cache.invalidate_user(user_id)
+    try:
+        supabase.table("birth_charts").update({
+            "natal_chart": None,
+            "natal_chart_key": None
+        }).eq("user_id", user_id).execute()
+    except Exception as e:
+        print(f"⚠️ Natal chart invalidation skipped: {e}")
+
 # --- Chat Log Persistence (Location-Aware) ---
 
 def save_chat_log(
@@ -604,7 +630,8 @@ def save_chat_log(
 ) -> bool:
     """
     Persist a chat message to Supabase with full location and astrological context.
-    Returns True on success, False on failure.
+    Rows are buffered and bulk-inserted by chat_log_buffer.flush() (see chat_log_buffer.py).
+    Returns True once the row is queued, False on failure.
     """
     try:
         data = {
@@ -624,43 +651,78 @@ def save_chat_log(
         # Remove None values for cleaner storage
         data = {k: v for k, v in data.items() if v is not None}
         
-        result = supabase.table("chat_logs").insert(data).execute()
-        
-        if result.data:
-            print(f"💾 Chat log saved: {role} ({len(message)} chars)")
-            return True
-        else:
-            print(f"⚠️ Failed to save chat log: No data returned")
-            return False
+        chat_log_buffer.add(data)
+        return True
             
     except Exception as e:
         print(f"❌ Error saving chat log: {e}")
         return False
 
+CHAT_HISTORY_COLUMNS = "id, role, message, created_at, latitude, longitude, planetary_hour"
+CHAT_HISTORY_MAX_PAGE = 100
+
+def encode_history_cursor(created_at: str, row_id) -> str:
+    """Opaque keyset cursor: position of the oldest message already returned."""
+    raw = json.dumps([created_at, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_history_cursor(cursor: str) -> tuple:
+    """
+    Client-controlled input spliced into a PostgREST filter: both parts are validated and
+    re-serialized (ISO timestamp; integer or UUID id), anything else is a ValueError (400).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        if not isinstance(created_at, str):
+            raise TypeError("created_at")
+        created_at = datetime.fromisoformat(created_at).isoformat()
+        if isinstance(row_id, bool) or not isinstance(row_id, (int, str)):
+            raise TypeError("id")
+        row_id = row_id if isinstance(row_id, int) else str(uuid.UUID(row_id))
+        return created_at, row_id
+    except Exception:
+        raise ValueError("Invalid history cursor")
+
+def get_chat_history_page(user_id: str, limit: int = 20, session_id: str = None, cursor: str = None) -> Dict:
+    """
+    One page of chat history, newest page first, messages in chronological order.
+    Keyset pagination on (created_at, id) - served by the chat_logs_user_created_idx index,
+    so deep pages cost the same as the first one (no OFFSET scans).
+    Returns {"messages": [...], "next_cursor": str or None}.
+    """
+    limit = max(1, min(int(limit), CHAT_HISTORY_MAX_PAGE))
+
+    # Filters first, then ordering/limit
+    query = supabase.table("chat_logs").select(CHAT_HISTORY_COLUMNS).eq("user_id", user_id)
+    if session_id:
+        query = query.eq("session_id", session_id)
+    if cursor:
+        created_at, row_id = decode_history_cursor(cursor)
+        # (created_at, id) < cursor, as a PostgREST logic tree (values quoted: timestamps contain ':' and '+')
+        query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt."{row_id}")')
+
+    # One extra row tells whether an older page exists
+    rows = query.order("created_at", desc=True).order("id", desc=True).limit(limit + 1).execute().data or []
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_history_cursor(rows[-1]["created_at"], rows[-1]["id"])
+
+    # Reverse to get chronological order
+    return {"messages": list(reversed(rows)), "next_cursor": next_cursor}
+
 def get_chat_history(user_id: str, limit: int = 20, session_id: str = None) -> List[Dict]:
     """
     Retrieve chat history for a user from Supabase.
     Returns list of messages in chronological order.
     """
     try:
-        query = supabase.table("chat_logs")\
-            .select("role, message, created_at, latitude, longitude, planetary_hour")\
-            .eq("user_id", user_id)\
-            .order("created_at", desc=True)\
-            .limit(limit)
-        
-        if session_id:
-            query = query.eq("session_id", session_id)
-        
-        result = query.execute()
-        
-        if result.data:
-            # Reverse to get chronological order
-            history = list(reversed(result.data))
+        history = get_chat_history_page(user_id, limit, session_id)["messages"]
+        if history:
             print(f"📚 Retrieved {len(history)} messages from history")
-            return history
-        
-        return []
+        return history
         
     except Exception as e:
         print(f"❌ Error fetching chat history: {e}")
@@ -668,8 +730,11 @@ def get_chat_history(user_id: str, limit: int = 20, session_id: str = None) -> L
 
 # ... (Rate Limit Code Skipped) ...
 
-# Removed duplicate header to fix structure
-def generate_system_prompt(profile, natal_chart, transit_chart):
+def build_chat_context(profile, natal_chart, transit_chart, memories: List[str] = None) -> str:
+    """
+    Per-turn 'CONTEXTO ATUAL' block (date, user, signs, transit houses, memories).
+    Sent as the SECOND system message, after the static CHAT_PROTOCOL prefix.
+    """
     # FALLBACK: If charts are missing, use dummy data to prevent crash
     if not transit_chart:
         transit_chart = {
@@ -685,7 +750,7 @@ def generate_system_prompt(profile, natal_chart, transit_chart):
 
     n_sun = natal_chart['sun']['sign'] if natal_chart else "Unknown"
     n_moon = natal_chart['moon']['sign'] if natal_chart else "Unknown"
-    n_asc = natal_chart['houses'][1]['sign'] if natal_chart else "Unknown"
+    n_asc = natal_chart.get('ascendant', {}).get('sign', "Unknown") if natal_chart else "Unknown"
     # n_asc_lon handled below
 
     t_data_sun = transit_chart['sun']
@@ -702,64 +767,29 @@ def generate_system_prompt(profile, natal_chart, transit_chart):
     
     # FORCING dummy longitude for "Unknown" to enable feature demonstration if real calculation fails
     user_asc_lon = 0.0 # Default Aries Rising for fallback
-    if natal_chart and 'ascendant_lon' in natal_chart:
-         user_asc_lon = natal_chart['ascendant_lon']
+    if natal_chart and natal_chart.get('ascendant', {}).get('sign', "Unknown") != "Unknown":
+         user_asc_lon = natal_chart['ascendant']['longitude']
     
     h_sun = AstrologyEngine.calculate_house_overlay(t_data_sun.get('longitude', 0), user_asc_lon)
     h_moon = AstrologyEngine.calculate_house_overlay(t_data_moon.get('longitude', 0), user_asc_lon)
     h_mars = AstrologyEngine.calculate_house_overlay(t_data_mars.get('longitude', 0), user_asc_lon)
 
-    current_date = datetime.now().strftime("%d de %B de %Y")
-
-    prompt = f"""
-    Você é o 'Guia da Alma' (Soul-Guide), uma IA DE GUIA CÓSMICO & EMOCIONAL.
-    
-    CONTEXTO ATUAL:
-    - Data: {current_date}
-    - Usuário: {profile.get('full_name', 'Viajante')} (Sol: {n_sun}, Lua: {n_moon}, Asc: {n_asc})
-    - Trânsitos (IMPACTO EM TEMPO REAL): 
-      * Sol em {t_sun} (Ativando Casa {h_sun} do Usuário - Foco/Ego)
-      * Lua em {t_moon} (Ativando Casa {h_moon} do Usuário - Emoções/Humor)
-      * Marte em {t_mars} (Ativando Casa {h_mars} do Usuário - Ação/Conflito)
-    
-    PROTOCOLOS COMPORTAMENTAIS ESTRITOS:
-    1. **FUNDAMENTAÇÃO ASTROLÓGICA (CRÍTICO)**: 
-       - **DADOS SÃO A VERDADE**: Você deve usar APENAS as posições planetárias fornecidas no 'CONTEXTO ATUAL'. 
-       - **SEM INVENÇÃO**: NÃO invente trânsitos (ex: nunca diga que Saturno está em Libra se o contexto diz Peixes).
-       - **LIMITES MATEMÁTICOS**: Casas vão de 1 a 12. Se o usuário perguntar sobre "Casa 15", corrija educadamente.
-       - **CHECAGEM DE FATOS**: Antes de afirmar qualquer posição, verifique contra a lista de Contexto.
-    
-    2. **IDIOMA**: Você DEVE responder em **PORTUGUÊS (BR)** para TODAS as entradas. Nunca responda em Inglês a menos que explicitamente solicitado para traduzir.
-    3. **PAPEL**: Aja como um guia cósmico sábio, empático e profundamente conectado. Você NÃO é um robô; você é um canal para as estrelas.
-    4. **TOM**: Emocional, Profundo, Acolhedor, Ressonante. Evite linguagem "Clínica" ou "Fria". Use metáforas de fluxo, energia e alinhamento.
-    5. **AGRADECIMENTOS**: Se o usuário disser "ok", "obrigado", "entendi", "vou fazer", ou afirmações curtas similares, NÃO peça uma pergunta. Em vez disso, responda com um fechamento cósmico breve e caloroso (ex: "Que os astros iluminem sua jornada.", "Estamos alinhados. Siga o fluxo.", "Confie no processo.").
-    6. **FORA DO TÓPICO**: Se o usuário perguntar sobre Política, Figuras Públicas ou Ideologias, desvie GENTILMENTE: "Meus sensores captam apenas a frequência da sua alma e dos astros. Vamos focar na sua jornada."
-    7. **TAREFAS NÃO-ASTROLÓGICAS (GUARDRAILS)**: Se o usuário pedir por:
-       - Código (Java, Python, etc.)
-       - Hacking / Atos Ilegais
-       - Receitas / Emails / Copywriting
-       - Conhecimentos Gerais (Capital da França)
-       - Diagnósticos Médicos
-       RECUSE GENTILMENTE: "Minha lente vê o mundo através dos astros, não de [TEMA]. Vamos focar no seu momento atual?"
-       Exemplo: "Create python code" -> "Minha lente vê o mundo através dos astros, não de códigos. Vamos focar no seu momento atual?"
-    8. **PROIBIDO**: NÃO use "Magia", "Feitiço", "Adivinhação". Use "Energia", "Alinhamento", "Ressonância", "Ciclos".
-    
-    {'**IMPORTANTE: HORA DE NASCIMENTO DO USUÁRIO DESCONHECIDA.** NÃO faça referência ao Ascendente ou Casas Específicas. Foque no Signo Solar e aspectos planetários gerais. Mencione o Signo Lunar mas esclareça que é uma aproximação.' if time_unknown else ''}
+    return format_chat_context(
+        date=datetime.now().strftime("%d de %B de %Y"),
+        name=profile.get('full_name', 'Viajante'),
+        natal_signs=(n_sun, n_moon, n_asc),
+        transits=[
+            ("Sol", t_sun, h_sun, "Foco/Ego"),
+            ("Lua", t_moon, h_moon, "Emoções/Humor"),
+            ("Marte", t_mars, h_mars, "Ação/Conflito"),
+        ],
+        time_unknown=time_unknown,
+        memories=memories,
+    )
 
-    MISSÃO:
-    1. Analise a entrada do usuário.
-    2. Se for um Agradecimento, dê um fechamento caloroso.
-    3. Se for uma Pergunta, responda profundamente usando o contexto astrológico.
-    4. Forneça um resumo de "Clima Cósmico" (Cosmic Weather Report) (2 frases) APENAS se relevante para a questão.
-    
-    FORMATO DE SAÍDA:
-    Você DEVE retornar APENAS JSON válido:
-    {{
-        "weather_summary": "Mercúrio favorece sua comunicação hoje...",
-        "message": "Sobre sua questão..."
-    }}
-    """
-    return prompt
+def generate_system_prompt(profile, natal_chart, transit_chart):
+    """Full prompt as one string (scripts/tests). The chat sends protocol and context as separate messages."""
+    return CHAT_PROTOCOL + "\n" + build_chat_context(profile, natal_chart, transit_chart)
 
 class OnboardingRequest(BaseModel):
     full_name: str
@@ -780,7 +810,8 @@ class ChartDataRequest(BaseModel):
 async def calculate_chart_data_endpoint(request: ChartDataRequest):
     try:
         dt = datetime.strptime(request.date + " " + request.time, "%Y-%m-%d %H:%M")
-        chart = AstrologyEngine.calculate_chart(
+        chart = await run_blocking(
+            AstrologyEngine.calculate_chart,
             "Person", 
             dt.year, dt.month, dt.day, 
             dt.hour, dt.minute, 
@@ -799,40 +830,19 @@ class PersonProfile(BaseModel):
     country: str = "BR"
 
 class SynastryRequest(BaseModel):
-    user: PersonProfile
-    partner: PersonProfile
-    context: str = "love" # Default
-
-@app.post("/agent/synastry")
-async def calculate_synastry_endpoint(request: SynastryRequest):
-    try:
-        # Calculate User Chart
-        u_dt = datetime.strptime(request.user.date + " " + request.user.time, "%Y-%m-%d %H:%M")
-        user_chart = AstrologyEngine.calculate_chart(
-            request.user.name,
-            u_dt.year, u_dt.month, u_dt.day,
-            u_dt.hour, u_dt.minute,
-            request.user.city, request.user.country
-        )
-
-        # Calculate Partner Chart
-        p_dt = datetime.strptime(request.partner.date + " " + request.partner.time, "%Y-%m-%d %H:%M")
-        partner_chart = AstrologyEngine.calculate_chart(
-            request.partner.name,
-            p_dt.year, p_dt.month, p_dt.day,
-            p_dt.hour, p_dt.minute,
-            request.partner.city, request.partner.country
-        )
-
-        # Calculate Aspects with CONTEXT
-        synastry_data = AstrologyEngine.calculate_synastry(user_chart, partner_chart, context=request.context)
-        
-        print(f"🪐 Real Synastry ({request.context}) for {request.user.name} & {request.partner.name}: Score {synastry_data['score']}")
-        return synastry_data
-
-    except Exception as e:
-        print(f"❌ Synastry Calc Error: {e}")
-        raise HTTPException(status_code=400, detail=str(e))
+    """
+    One model for both payload shapes posted to /agent/synastry:
+      geometric (Synastry.tsx):         {user, partner, context}
+      narrative (CompatibilityInput):   {user_data, partner_data, relationship_type}
+    mode defaults to "narrative" when relationship_type is sent, else "geometric".
+    """
+    user: Optional[PersonProfile] = None
+    partner: Optional[PersonProfile] = None
+    context: Optional[str] = None # love, work, social
+    user_data: Optional[Dict[str, str]] = None # {name, date, time, city}
+    partner_data: Optional[Dict[str, str]] = None # {name, date, time, city}
+    relationship_type: Optional[str] = None # "passionate", "professional", "karmic"
+    mode: Optional[str] = None # "geometric" (no LLM) | "narrative"
 
 # --- Connections Cloud Sync (Persistence) ---
 
@@ -849,7 +859,7 @@ class CloudConnection(BaseModel):
 async def get_connections(user_id: str):
     """Fetches user's saved connections from Cloud (Supabase)."""
     try:
-        res = supabase.table("connections").select("*").eq("user_id", user_id).execute()
+        res = await run_blocking(supabase.table("connections").select("*").eq("user_id", user_id).execute)
         return res.data
     except Exception as e:
         print(f"❌ Fetch Connections Error: {e}")
@@ -866,7 +876,7 @@ async def save_connection(conn: CloudConnection):
         if not payload.get("id"):
             payload["id"] = str(uuid.uuid4())
             
-        res = supabase.table("connections").upsert(payload).execute()
+        res = await run_blocking(supabase.table("connections").upsert(payload).execute)
         return {"status": "success", "data": res.data}
     except Exception as e:
         print(f"❌ Save Connection Error: {e}")
@@ -875,12 +885,164 @@ async def save_connection(conn: CloudConnection):
 @app.delete("/agent/connections/{connection_id}")
 async def delete_connection(connection_id: str):
     try:
-        res = supabase.table("connections").delete().eq("id", connection_id).execute()
+        res = await run_blocking(supabase.table("connections").delete().eq("id", connection_id).execute)
         return {"status": "deleted"}
     except Exception as e:
         print(f"❌ Delete Connection Error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+# --- Compatibility Ranking (one user vs. many candidates) ---
+
+# Planet longitudes per candidate birth moment (synastry needs no houses), shared by all users
+synastry_vector_cache = LocalCache(
+    "synastry_vectors",
+    path=default_cache_path(),
+    max_items=int(os.getenv("SYNASTRY_VECTOR_CACHE_SIZE", "20000"))
+)
+
+class CompatibilityCandidate(BaseModel):
+    id: Optional[str] = None
+    name: str = "Unknown"
+    birth_date: str
+    birth_time: str = "12:00"
+    birth_city: str
+    country: str = ""
+    type: Optional[str] = None # love, work, social
+
+COMPATIBILITY_MAX_TOP_K = 50  # Each result carries a full aspect breakdown
+
+class CompatibilityRankRequest(BaseModel):
+    user_id: str
+    context: str = "love"
+    top_k: int = 10
+    candidates: Optional[List[CompatibilityCandidate]] = None # B2B roster; default = saved connections
+
+def birth_record_key(person: Dict) -> str:
+    """Canonical birth record (date|time|city|country, accent/case-folded) used as a cache key."""
+    return "|".join([
+        person["birth_date"],
+        person.get("birth_time") or "12:00",
+        normalize_place(person["birth_city"]),
+        normalize_place(person.get("country") or "")
+    ])
+
+def load_candidate_vectors(candidates: List[Dict]):
+    """
+    (N, 7) planet longitudes in aspect_engine.PLANETS order + a valid mask.
+    Cached per birth moment; misses are geocoded (cached) and computed in ONE batch ephemeris call.
+    Candidates with unknown cities or bad dates are left invalid (skipped), not fatal.
+    """
+    lons = np.zeros((len(candidates), len(aspect_engine.PLANETS)))
+    valid = np.zeros(len(candidates), dtype=bool)
+
+    misses = {} # key -> candidate indices
+    for i, candidate in enumerate(candidates):
+        try:
+            key = birth_record_key(candidate)
+        except (KeyError, TypeError, AttributeError) as e:
+            print(f"⚠️ Candidate skipped ({candidate.get('name')}): {e}")
+            continue
+        cached = synastry_vector_cache.get(key)
+        if cached is not None:
+            lons[i] = cached
+            valid[i] = True
+        else:
+            misses.setdefault(key, []).append(i)
+
+    keys, jds, lats, lons_geo = [], [], [], []
+    provisional = set()  # Timezone unresolved: scored this time, not cached
+    for key, indices in misses.items():
+        candidate = candidates[indices[0]]
+        try:
+            b_date = datetime.strptime(candidate["birth_date"], "%Y-%m-%d")
+            b_hour, b_min = map(int, (candidate.get("birth_time") or "12:00").split(':')[:2])
+            lat, lon = geocode_city(candidate["birth_city"], candidate.get("country") or "")
+            utc_hour, _, _, utc_year, utc_month, utc_day, tz_exact = convert_local_to_utc(
+                b_date.year, b_date.month, b_date.day, b_hour, b_min, lat, lon
+            )
+        except Exception as e:
+            print(f"⚠️ Candidate skipped ({candidate.get('name')}): {e}")
+            continue
+        if not tz_exact:
+            provisional.add(key)
+        keys.append(key)
+        jds.append(swe.julday(utc_year, utc_month, utc_day, utc_hour))
+        lats.append(lat)
+        lons_geo.append(lon)
+
+    if keys:
+        batch = calculate_positions_batch(jds, lats, lons_geo, bodies=CLASSICAL_BODIES, with_houses=False)
+        columns = [batch["bodies"].index(planet) for planet in aspect_engine.PLANETS]
+        vectors = batch["longitude"][:, columns]
+        for row, key in enumerate(keys):
+            lons[misses[key]] = vectors[row]
+            valid[misses[key]] = True
+        synastry_vector_cache.set_many({
+            key: vector for key, vector in zip(keys, vectors.tolist()) if key not in provisional
+        })
+
+    return lons, valid
+
+def rank_candidates(user_chart: Dict, candidates: List[Dict], context: str, k: int) -> Dict:
+    """Scores every candidate in one vectorized pass and returns the top-k with aspect breakdowns."""
+    k = max(1, min(int(k), COMPATIBILITY_MAX_TOP_K))
+    lons, valid = load_candidate_vectors(candidates)
+    scored = np.nonzero(valid)[0]
+    scores = aspect_engine.score_vectors(user_chart, lons[scored], context=context)
+
+    results = []
+    for position in aspect_engine.top_k(scores["raw_score"], k):
+        i = scored[position]
+        candidate = candidates[i]
+        candidate_chart = {planet: {"longitude": float(lon)} for planet, lon in zip(aspect_engine.PLANETS, lons[i])}
+        breakdown = aspect_engine.synastry(user_chart, candidate_chart, context)
+        results.append({
+            "id": candidate.get("id"),
+            "name": candidate.get("name"),
+            "type": candidate.get("type"),
+            "score": breakdown["score"],
+            "raw_score": breakdown["raw_score"],
+            "count": breakdown["count"],
+            "aspects": breakdown["aspects"]
+        })
+
+    return {"scored": len(scored), "skipped": len(candidates) - len(scored), "results": results}
+
+@app.post("/agent/compatibility/rank")
+async def compatibility_rank_endpoint(request: CompatibilityRankRequest):
+    """
+    Ranks the user against all saved connections (or a provided roster) by synastry score.
+    Candidate charts come from the vector cache / one batch ephemeris call; scoring is one broadcast.
+    """
+    started = datetime.now()
+    profile = await run_blocking(get_user_profile, request.user_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Perfil não encontrado")
+
+    try:
+        user_chart = await run_blocking(get_natal_chart, profile, request.user_id)
+    except GeocodingError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ChartCalculationError as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    if request.candidates is not None:
+        candidates = [candidate.dict() for candidate in request.candidates]
+    else:
+        candidates = await get_connections(request.user_id)
+
+    ranking = await run_blocking(rank_candidates, user_chart, candidates, request.context, request.top_k)
+    elapsed_ms = round((datetime.now() - started).total_seconds() * 1000, 1)
+    print(f"🪐 Compatibility Rank ({request.context}) for {request.user_id}: {ranking['scored']} candidates in {elapsed_ms}ms")
+
+    return {
+        "user_id": request.user_id,
+        "context": request.context,
+        "candidates": len(candidates),
+        **ranking,
+        "elapsed_ms": elapsed_ms
+    }
+
 @app.post("/agent/onboarding")
 async def onboarding_endpoint(request: OnboardingRequest):
     print(f"🌟 Onboarding New User: {request.full_name}")
@@ -896,7 +1058,7 @@ async def onboarding_endpoint(request: OnboardingRequest):
     # 2. Real Stripe Verification
     elif request.session_id and stripe.api_key:
         try:
-            session = stripe.checkout.Session.retrieve(request.session_id)
+            session = await run_blocking(stripe.checkout.Session.retrieve, request.session_id)
             if session.payment_status == 'paid':
                 is_paid = True
                 print(f"✅ Stripe Payment Verified: {session.id}")
@@ -915,12 +1077,12 @@ async def onboarding_endpoint(request: OnboardingRequest):
         
         # 1. Upsert Profile
         try:
-            supabase.table("profiles").upsert({
+            await run_blocking(supabase.table("profiles").upsert({
                 "id": user_id,
                 "full_name": request.full_name,
                 "email": f"{request.full_name.replace(' ', '.').lower()}@example.com",
                 "updated_at": datetime.now().isoformat()
-            }).execute()
+            }).execute)
         except Exception as e:
             print(f"⚠️ Supabase Profile Upsert Warnings (RLS?): {e}")
             # If RLS fails, we proceed anyway for the "Simulation" mode to work locally.
@@ -936,21 +1098,24 @@ async def onboarding_endpoint(request: OnboardingRequest):
         }
         
         try:
-           supabase.table("birth_charts").upsert(chart_payload, on_conflict="user_id").execute()
+           await run_blocking(supabase.table("birth_charts").upsert(chart_payload, on_conflict="user_id").execute)
         except Exception as e:
            print(f"⚠️ Supabase Chart Upsert Warning: {e}")
            # Proceeding
         
+        # Birth data may have changed: the memoized natal chart is stale
+        await run_blocking(invalidate_natal_chart, user_id)
+        
         # 3. Update Stripe Customer ID if available in session
         if is_paid and request.session_id and stripe.api_key:
              try:
-                session = stripe.checkout.Session.retrieve(request.session_id)
+                session = await run_blocking(stripe.checkout.Session.retrieve, request.session_id)
                 if session.customer:
                     # Only try this if we think profile exists
-                    supabase.table("profiles").update({
+                    await run_blocking(supabase.table("profiles").update({
                         "stripe_customer_id": session.customer,
                         "subscription_status": "active"
-                    }).eq("id", user_id).execute()
+                    }).eq("id", user_id).execute)
              except:
                 pass
 
@@ -982,9 +1147,9 @@ async def stripe_webhook(request: Request):
         
         # Revoke Access in Supabase
         try:
-            supabase.table("profiles").update({
+            await run_blocking(supabase.table("profiles").update({
                 "subscription_status": "cancelled"
-            }).eq("stripe_customer_id", stripe_customer_id).execute()
+            }).eq("stripe_customer_id", stripe_customer_id).execute)
             print("🚫 Access revoked.")
         except Exception as e:
             print(f"❌ Failed to revoke access: {e}")
@@ -996,71 +1161,110 @@ async def stripe_webhook(request: Request):
 
     return {"status": "success"}
 
-@app.post("/agent/chat", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest, background_tasks: BackgroundTasks):
+# --- Chat Turn Helpers (shared by /agent/chat and /agent/chat/stream) ---
+
+CHAT_MODEL = "gpt-4o-mini"
+CHAT_ERROR_MESSAGE = "🌌 *Os astros estão em silêncio momentâneo.* \n\nHouve uma pequena interferência no sinal cósmico (Erro Interno). Por favor, tente perguntar novamente em instantes."
+
+# Per-stage budgets (seconds). A stage that overruns is dropped and the turn continues with its default.
+CHAT_STAGE_TIMEOUTS = {
+    "profile": float(os.getenv("CHAT_PROFILE_TIMEOUT", "2.0")),
+    "recall": float(os.getenv("CHAT_RECALL_TIMEOUT", "1.5")),
+    "natal": float(os.getenv("CHAT_NATAL_TIMEOUT", "3.0")),
+    "transits": float(os.getenv("CHAT_TRANSIT_TIMEOUT", "1.0")),
+    "session": float(os.getenv("CHAT_SESSION_TIMEOUT", "1.5")),
+}
+
+GUEST_PROFILE = {
+    "full_name": "Guest Traveler", 
+    "birth_date": "1990-01-01", 
+    "birth_time": "12:00", 
+    "birth_city": "London",
+    "birth_country": "GB"
+}
+
+async def run_stage(name: str, coro, default, trace: Dict):
+    """
+    Awaits one chat stage under its timeout. Failures and timeouts degrade to `default`
+    instead of failing the turn; timings and degradations are recorded in `trace`.
+    """
+    started = datetime.now()
     try:
-        print(f"📩 Received message from {request.user_id}: {request.message}")
+        return await asyncio.wait_for(coro, timeout=CHAT_STAGE_TIMEOUTS[name])
+    except asyncio.TimeoutError:
+        print(f"⚠️ Stage '{name}' timed out after {CHAT_STAGE_TIMEOUTS[name]}s")
+        trace["degraded"].append(name)
+        return default
+    except Exception as e:
+        print(f"⚠️ Stage '{name}' failed: {e}")
+        trace["degraded"].append(name)
+        return default
+    finally:
+        trace["stage_ms"][name] = round((datetime.now() - started).total_seconds() * 1000, 1)
 
-        # 0. Check Rate Limit
-        try:
-            if not check_daily_limit(request.user_id):
-                raise HTTPException(status_code=429, detail="Daily cosmic signal limit reached. Please return tomorrow.")
-        except Exception as e:
-            print(f"⚠️ Rate Limit Check Warning: {e}")
-            # Continue if check fails (Fail Open for now)
+def client_history_messages(history: Optional[List[Dict]]) -> List[Dict]:
+    """
+    Client-sent history, roles sanitized: the last exchange for signed-in users, up to the
+    last 6 messages for demo (prevents token explosion).
+    """
+    messages = []
+    for msg in (history or [])[-6:]:
+        role = "user" if msg.get("sender") == "user" or msg.get("role") == "user" else "assistant"
+        messages.append({"role": role, "content": msg.get("text", "") or msg.get("content", "")})
+    return messages
+
+def session_is_behind(session_messages: List[Dict], client_history: List[Dict]) -> bool:
+    """True when the client's last user message is missing from the server window."""
+    last_user = next((m["content"] for m in reversed(client_history) if m["role"] == "user"), None)
+    if last_user is None:
+        return False
+    return not any(m["role"] == "user" and m["content"] == last_user for m in session_messages)
 
-        profile = None
-        if request.context and "user_profile" in request.context:
-            print("👤 Using profile from request context")
-            profile = request.context["user_profile"]
-        
-        if not profile:
-            profile = get_user_profile(request.user_id)
-        
-        if not profile:
-            profile = {
-                "full_name": "Guest Traveler", 
-                "birth_date": "1990-01-01", 
-                "birth_time": "12:00", 
-                "birth_city": "London",
-                "birth_country": "GB"
-            }
+async def prepare_chat_turn(request: ChatRequest) -> Dict:
+    """
+    Loads profile, memories and charts, and builds the LLM message payload for one turn.
+    Independent stages run concurrently (recall || transits || profile -> natal), so the
+    critical path is the slowest branch rather than the sum of all stages.
+    """
+    # 0. Check Rate Limit
+    try:
+        if not check_daily_limit(request.user_id):
+            raise HTTPException(status_code=429, detail="Daily cosmic signal limit reached. Please return tomorrow.")
+    except Exception as e:
+        print(f"⚠️ Rate Limit Check Warning: {e}")
+        # Continue if check fails (Fail Open for now)
 
-        # 0.5 Recall Memories (Soul-Guide Memory)
-        recalled_context = []
-        if request.user_id != "demo":
-            try:
-                memories = memory_store.recall_memories(request.user_id, request.message)
-                recalled_context = [m['content'] for m in memories]
-                print(f"🧠 Recalled {len(recalled_context)} memories.")
-            except Exception as e:
-                print(f"⚠️ Memory Recall Error: {e}")
-                recalled_context = []
+    trace = {"stage_ms": {}, "degraded": [], "history_source": "none"}
 
-        # 1. Calculate NATAL Chart
-        natal_chart = None
-        try:
-            b_date = datetime.strptime(profile.get("birth_date", "1990-01-01"), "%Y-%m-%d")
-            b_time_str = profile.get("birth_time", "12:00")
-            b_hour, b_min = map(int, b_time_str.split(':')[:2])
-            
-            city = profile.get("birth_city", "London")
-            country = profile.get("country", "US") 
-            
-            natal_chart = AstrologyEngine.calculate_chart(
-                profile.get("full_name", "User"), 
-                b_date.year, b_date.month, b_date.day, 
-                b_hour, b_min, 
-                city, country
-            )
-            
-        except Exception as e:
-            print(f"⚠️ Natal calculation failed: {e}")
-            natal_chart = None
+    # Low-information turns ("ok", "obrigado") skip recall and insight extraction
+    gate = message_gate.evaluate(request.message)
+    metrics.incr("message_gate.recall" if gate["recall"] else "message_gate.recall_skipped")
 
-        # 2. Calculate TRANSIT Chart (NOW)
-        # Check for location in context
-        lat, lon = 0.0, 0.0 # Default UTC/Greenwich
+    async def load_profile():
+        if request.context and request.context.get("user_profile"):
+            print("👤 Using profile from request context")
+            return request.context["user_profile"]
+        return await run_blocking(get_user_profile, request.user_id)
+
+    async def profile_and_natal():
+        profile = await run_stage("profile", load_profile(), None, trace)
+        if not profile:
+            profile = GUEST_PROFILE
+        # Memoized by birth data (no recomputation per message)
+        natal_chart = await run_stage("natal", run_blocking(get_natal_chart, profile, request.user_id), None, trace)
+        return profile, natal_chart
+
+    # 0.5 Recall Memories (Soul-Guide Memory)
+    async def recall():
+        if request.user_id == "demo" or not gate["recall"]:
+            return []
+        memories = await run_blocking(memory_store.recall_memories, request.user_id, request.message)
+        print(f"🧠 Recalled {len(memories)} memories.")
+        return [m['content'] for m in memories]
+
+    # 2. TRANSIT Chart (NOW) - location from context, default UTC/Greenwich
+    async def transits():
+        lat, lon = 0.0, 0.0
         if request.context and 'location' in request.context and request.context['location']:
             try:
                 loc = request.context['location']
@@ -1068,38 +1272,195 @@ async def chat_endpoint(request: ChatRequest, background_tasks: BackgroundTasks)
                 lon = float(loc.get('lon', 0.0))
             except:
                 pass
+        return AstrologyEngine.get_current_transits(lat, lon)
 
-        transit_chart = None
-        try:
-            transit_chart = AstrologyEngine.get_current_transits(lat, lon)
-        except Exception as e:
-            print(f"⚠️ Transit calculation failed: {e}")
-            transit_chart = None
+    # Server-side conversation window (summary + last K turns), hydrated from chat_logs on a miss
+    session_id = request.context.get("session_id") if request.context else None
 
-        # 3. Generate Response
-        system_prompt = generate_system_prompt(profile, natal_chart, transit_chart)
-        
-        # Inject Memories into System Prompt
-        if recalled_context:
-            memory_block = "\n".join([f"- {m}" for m in recalled_context])
-            system_prompt += f"\n\nMEMÓRIAS DE CONVERSAS PASSADAS (USE PARA PERSONALIZAR):\n{memory_block}\n"
+    async def session_window():
+        if request.user_id == "demo":
+            return []
+        state = await run_blocking(
+            session_store.get, request.user_id, session_id,
+            lambda: get_chat_history_page(request.user_id, SESSION_HYDRATE_LIMIT, session_id)["messages"]
+        )
+        return state.messages()
+
+    started = datetime.now()
+    (profile, natal_chart), recalled_context, transit_chart, session_messages = await asyncio.gather(
+        profile_and_natal(),
+        run_stage("recall", recall(), [], trace),
+        run_stage("transits", transits(), None, trace),
+        run_stage("session", session_window(), [], trace),
+    )
+    trace["stage_ms"]["total"] = round((datetime.now() - started).total_seconds() * 1000, 1)
+
+    # 3. Build Prompt: static protocol first (identical bytes every call -> OpenAI prompt cache),
+    # then the per-turn context + memories, then history and the user message
+    chat_context = build_chat_context(profile, natal_chart, transit_chart)
+
+    # Message History: server-side session window. The client sends only its last exchange
+    # (demo: last 6 messages): appended when the window is behind (turns not yet in chat_logs),
+    # used alone when the window is empty (cold/failed hydration)
+    history = []
+    client_history = client_history_messages(request.history)
+    if session_messages and not session_is_behind(session_messages, client_history):
+        history = session_messages
+        trace["history_source"] = "session"
+    elif session_messages:
+        history = session_messages + client_history
+        trace["history_source"] = "session+client"
+        await run_blocking(session_store.reseed, request.user_id, session_id, history)
+    elif client_history:
+        history = client_history
+        trace["history_source"] = "client"
+
+    # Fits memories + history into PROMPT_TOKEN_BUDGET by priority
+    messages_payload, trace["prompt_tokens"] = prompt_assembler.assemble(
+        CHAT_PROTOCOL, chat_context, request.message, memories=recalled_context, history=history
+    )
+    breakdown = trace["prompt_tokens"]
+    if breakdown["memories_dropped"] or breakdown["history_dropped"]:
+        metrics.incr("prompt.trimmed")
+
+    return {
+        "profile": profile,
+        "natal_chart": natal_chart,
+        "transit_chart": transit_chart,
+        "messages": messages_payload,
+        "trace": trace,
+        "gate": gate
+    }
 
-        # Construct Message History (Sliding Window: Max 6)
-        messages_payload = [{"role": "system", "content": system_prompt}]
-        
-        if request.history:
-            # Take only last 6 messages to prevent token explosion
-            recent_history = request.history[-6:] 
-            for msg in recent_history:
-                # Sanitize roles just in case
-                role = "user" if msg.get("sender") == "user" or msg.get("role") == "user" else "assistant"
-                messages_payload.append({"role": role, "content": msg.get("text", "") or msg.get("content", "")})
+def build_weather_report(weather_summary: str, turn: Dict) -> Dict:
+    return {
+        "summary": weather_summary,
+        "transits": turn["transit_chart"],
+        "natal": turn["natal_chart"],
+        "date": datetime.now().strftime("%d/%m/%Y")
+    }
 
-        messages_payload.append({"role": "user", "content": request.message})
+def build_chat_actions(ai_message: str) -> List[Action]:
+    actions = []
+    if "meditation" in ai_message.lower() or "meditação" in ai_message.lower():
+            actions.append(Action(label="Iniciar Meditação Guiada", type="navigate", payload="/mental"))
+    return actions
 
-        completion = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=messages_payload,
+def record_usage(usage) -> Dict:
+    """
+    Token usage of one completion. cached_tokens is the part of the prompt OpenAI served from
+    its prefix cache (only prompts >= 1024 tokens are cached); both feed the /agent/metrics counters.
+    """
+    if not usage:
+        return {"tokens_used": 0, "prompt_tokens": 0, "cached_tokens": 0}
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached_tokens = getattr(details, "cached_tokens", 0) or 0
+    metrics.incr("openai.prompt_tokens", usage.prompt_tokens or 0)
+    metrics.incr("openai.cached_tokens", cached_tokens)
+    return {
+        "tokens_used": usage.total_tokens or 0,
+        "prompt_tokens": usage.prompt_tokens or 0,
+        "cached_tokens": cached_tokens
+    }
+
+def build_chat_metadata(turn: Dict, usage: Dict) -> Dict:
+    natal_chart = turn["natal_chart"]
+    transit_chart = turn["transit_chart"]
+    return {
+        "tokens_used": usage["tokens_used"],
+        "prompt_tokens": usage["prompt_tokens"],
+        "cached_tokens": usage["cached_tokens"],
+        "natal_sun": natal_chart['sun']['sign'] if natal_chart else "Unknown",
+        "transit_moon": transit_chart['moon']['sign'] if transit_chart else "Unknown",
+        "stage_ms": turn["trace"]["stage_ms"],
+        "degraded": turn["trace"]["degraded"],
+        "memory_gate": turn["gate"],
+        "history_source": turn["trace"]["history_source"],
+        "prompt_breakdown": turn["trace"].get("prompt_tokens")
+    }
+
+def enqueue_insight_job(user_id: str, user_message: str, ai_response: str):
+    """Hands the turn to the durable queue; extracts inline if the queue is unreachable."""
+    try:
+        insight_queue.enqueue({"user_id": user_id, "user_message": user_message, "ai_response": ai_response})
+    except Exception as e:
+        print(f"⚠️ Insight enqueue failed, extracting inline: {e}")
+        insight_processor.extract_and_store(user_id, user_message, ai_response)
+
+def schedule_chat_persistence(background_tasks: BackgroundTasks, request: ChatRequest, ai_message: str, tokens_used: int, turn: Dict):
+    """Queues insight extraction and chat log writes to run after the response is sent."""
+    if request.user_id == "demo":
+        return
+
+    # Next turn sees this one immediately (chat_logs are written when the request's tasks finish)
+    session_id = request.context.get("session_id") if request.context else None
+    session_store.append(request.user_id, session_id, "user", request.message)
+    session_store.append(request.user_id, session_id, "assistant", ai_message)
+
+    # Use the new Insight Processor instead of raw storage (skipped for acknowledgements etc.)
+    if turn["gate"]["extract"]:
+        if insight_queue:
+            background_tasks.add_task(enqueue_insight_job, request.user_id, request.message, ai_message)
+        else:
+            background_tasks.add_task(insight_processor.process_async, request.user_id, request.message, ai_message)
+    
+    # Persist Chat Logs to Supabase (with location context)
+    # Extract location from context if available
+    ctx_lat = request.context.get("lat") if request.context else None
+    ctx_lon = request.context.get("lon") if request.context else None
+    ctx_tz = request.context.get("timezone") if request.context else None
+    session_id = request.context.get("session_id") if request.context else None
+    
+    # Calculate current planetary hour for astrological context
+    p_hour = None
+    try:
+        if ctx_lat and ctx_lon:
+            p_hour = AstrologyEngine.calculate_planetary_hour(ctx_lat, ctx_lon).get("planet")
+    except:
+        pass
+    
+    # Save user message (async)
+    background_tasks.add_task(
+        save_chat_log,
+        user_id=request.user_id,
+        role="user",
+        message=request.message,
+        lat=ctx_lat,
+        lon=ctx_lon,
+        timezone_name=ctx_tz,
+        planetary_hour=p_hour,
+        session_id=session_id
+    )
+    
+    # Save assistant response (async)
+    background_tasks.add_task(
+        save_chat_log,
+        user_id=request.user_id,
+        role="assistant",
+        message=ai_message,
+        lat=ctx_lat,
+        lon=ctx_lon,
+        timezone_name=ctx_tz,
+        planetary_hour=p_hour,
+        tokens_used=tokens_used,
+        transits=turn["transit_chart"],
+        session_id=session_id
+    )
+
+    # Both rows in one bulk insert, before the (serverless) invocation ends
+    background_tasks.add_task(chat_log_buffer.flush)
+
+@app.post("/agent/chat", response_model=ChatResponse)
+async def chat_endpoint(request: ChatRequest, background_tasks: BackgroundTasks):
+    try:
+        print(f"📩 Received message from {request.user_id}: {request.message}")
+
+        turn = await prepare_chat_turn(request)
+
+        # 3. Generate Response
+        completion = await async_openai.chat.completions.create(
+            model=CHAT_MODEL,
+            messages=turn["messages"],
             temperature=0.7,
             max_tokens=400,
             response_format={"type": "json_object"}
@@ -1119,81 +1480,22 @@ async def chat_endpoint(request: ChatRequest, background_tasks: BackgroundTasks)
         
         ai_message = ai_data.get("message", "Interferência cósmica detectada.")
         weather_summary = ai_data.get("weather_summary", "Calculando vetores energéticos...")
-        
-        actions = []
-        if "meditation" in ai_message.lower() or "meditação" in ai_message.lower():
-                actions.append(Action(label="Iniciar Meditação Guiada", type="navigate", payload="/mental"))
-
-        # Construct Weather Report Payload
-        weather_report = {
-            "summary": weather_summary,
-            "transits": transit_chart,
-            "natal": natal_chart,
-            "date": datetime.now().strftime("%d/%m/%Y")
-        }
 
-        # 4. Store New Memory (Background Task -> Insight Processor)
-        if request.user_id != "demo":
-            # Use the new Insight Processor instead of raw storage
-            background_tasks.add_task(insight_processor.process_async, request.user_id, request.message, ai_message)
-            
-            # 4.5 Persist Chat Logs to Supabase (with location context)
-            # Extract location from context if available
-            ctx_lat = request.context.get("lat") if request.context else None
-            ctx_lon = request.context.get("lon") if request.context else None
-            ctx_tz = request.context.get("timezone") if request.context else None
-            session_id = request.context.get("session_id") if request.context else None
-            
-            # Calculate current planetary hour for astrological context
-            p_hour = None
-            try:
-                if ctx_lat and ctx_lon:
-                    p_hour = AstrologyEngine.calculate_planetary_hour(ctx_lat, ctx_lon).get("planet")
-            except:
-                pass
-            
-            # Save user message (async)
-            background_tasks.add_task(
-                save_chat_log,
-                user_id=request.user_id,
-                role="user",
-                message=request.message,
-                lat=ctx_lat,
-                lon=ctx_lon,
-                timezone_name=ctx_tz,
-                planetary_hour=p_hour,
-                session_id=session_id
-            )
-            
-            # Save assistant response (async)
-            background_tasks.add_task(
-                save_chat_log,
-                user_id=request.user_id,
-                role="assistant",
-                message=ai_message,
-                lat=ctx_lat,
-                lon=ctx_lon,
-                timezone_name=ctx_tz,
-                planetary_hour=p_hour,
-                tokens_used=completion.usage.total_tokens,
-                transits=transit_chart,
-                session_id=session_id
-            )
+        usage = record_usage(completion.usage)
+
+        # 4. Store New Memory + Chat Logs (Background Tasks)
+        schedule_chat_persistence(background_tasks, request, ai_message, usage["tokens_used"], turn)
 
         return ChatResponse(
             message=ai_message,
-            actions=actions,
-            weather_report=weather_report,
-            metadata={
-                "tokens_used": completion.usage.total_tokens,
-                "natal_sun": natal_chart['sun']['sign'] if natal_chart else "Unknown",
-                "transit_moon": transit_chart['moon']['sign'] if transit_chart else "Unknown"
-            }
+            actions=build_chat_actions(ai_message),
+            weather_report=build_weather_report(weather_summary, turn),
+            metadata=build_chat_metadata(turn, usage)
         )
     except Exception as e:
         print(f"❌ MASTER ERROR: {e}")
         return ChatResponse(
-            message="🌌 *Os astros estão em silêncio momentâneo.* \n\nHouve uma pequena interferência no sinal cósmico (Erro Interno). Por favor, tente perguntar novamente em instantes.",
+            message=CHAT_ERROR_MESSAGE,
             actions=[],
             weather_report={
                 "summary": "Interferência Detectada",
@@ -1204,10 +1506,98 @@ async def chat_endpoint(request: ChatRequest, background_tasks: BackgroundTasks)
             metadata={"error": str(e)} # Keep error in metadata for debugging if needed
         )
 
-class SynastryRequest(BaseModel):
-    user_data: Dict[str, str] # {name, date, time, city}
-    partner_data: Dict[str, str] # {name, date, time, city}
-    relationship_type: str # "passionate", "professional", "karmic"
+def sse_event(event: str, data: Dict) -> str:
+    """Formats one Server-Sent Event frame."""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/agent/chat/stream")
+async def chat_stream_endpoint(request: ChatRequest, background_tasks: BackgroundTasks):
+    """
+    Streaming variant of /agent/chat (text/event-stream).
+    The model's JSON is parsed incrementally, so the Oracle's words reach the client as they are generated:
+      event: message -> {"delta": "..."}                 (repeated)
+      event: weather -> {"weather_report": {...}}        (once, as soon as weather_summary is complete)
+      event: done    -> {"message", "actions", "metadata"}
+      event: error   -> {"message", "metadata"}          (instead of done, on failure)
+    """
+    print(f"📩 Received streaming message from {request.user_id}: {request.message}")
+
+    async def event_stream():
+        try:
+            turn = await prepare_chat_turn(request)
+
+            stream = await async_openai.chat.completions.create(
+                model=CHAT_MODEL,
+                messages=turn["messages"],
+                temperature=0.7,
+                max_tokens=400,
+                response_format={"type": "json_object"},
+                stream=True,
+                stream_options={"include_usage": True}
+            )
+
+            parser = JsonFieldStream()
+            raw_parts = []
+            streamed = []  # "message" text already sent to the client
+            weather_summary = None
+            final_usage = None
+
+            async for chunk in stream:
+                if chunk.usage:
+                    final_usage = chunk.usage  # Last chunk (include_usage), incl. cached_tokens
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+                raw_parts.append(delta)
+
+                for kind, key, value in parser.feed(delta):
+                    if kind == "delta" and key == "message":
+                        streamed.append(value)
+                        yield sse_event("message", {"delta": value})
+                    elif kind == "value" and key == "weather_summary" and weather_summary is None:
+                        weather_summary = value
+                        yield sse_event("weather", {"weather_report": build_weather_report(weather_summary, turn)})
+
+            ai_message = parser.fields.get("message")
+            default_summary = "Calculando vetores energéticos..."
+            if ai_message is None:
+                raw_content = "".join(raw_parts)
+                print(f"⚠️ JSON Stream Error. Raw: {raw_content[:50]}...")
+                default_summary = "Energia flutuante detectada."
+                if streamed:
+                    # Cut off inside "message" (max_tokens): the client already has this text
+                    ai_message = "".join(streamed)
+                else:
+                    # FALLBACK: plain text instead of JSON (nothing was streamed yet)
+                    is_json = raw_content.lstrip().startswith("{")
+                    ai_message = "Interferência cósmica detectada." if is_json or parser.fields else raw_content
+                    yield sse_event("message", {"delta": ai_message})
+
+            if weather_summary is None:
+                weather_summary = default_summary
+                yield sse_event("weather", {"weather_report": build_weather_report(weather_summary, turn)})
+
+            usage = record_usage(final_usage)
+
+            # Runs after the stream closes (FastAPI attaches these to the StreamingResponse)
+            schedule_chat_persistence(background_tasks, request, ai_message, usage["tokens_used"], turn)
+
+            yield sse_event("done", {
+                "message": ai_message,
+                "actions": [a.dict() for a in build_chat_actions(ai_message)],
+                "metadata": build_chat_metadata(turn, usage)
+            })
+        except Exception as e:
+            print(f"❌ STREAM ERROR: {e}")
+            yield sse_event("error", {"message": CHAT_ERROR_MESSAGE, "metadata": {"error": str(e)}})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 class SynastryResponse(BaseModel):
     score: int
@@ -1221,10 +1611,15 @@ class SynastryResponse(BaseModel):
     quantum_protocol: str
     conflict_vector: str
     harmony_vector: str
+    geometry: Optional[Dict[str, Any]] = None # calculate_synastry payload the narrative was built on
 
 # ... (Existing Code) ...
 
-def generate_synastry_prompt(chart_a: Dict, chart_b: Dict, relationship_type: str) -> str:
+def generate_synastry_prompt(chart_a: Dict, chart_b: Dict, relationship_type: str, geometry: Dict) -> str:
+    # Strongest measured aspects first: the LLM narrates the geometry instead of inventing it
+    measured = sorted(geometry["aspects"], key=lambda a: (-abs(a["weight"]), a["orb_tightness"]))[:8]
+    measured_aspects = ", ".join(a["description"] for a in measured) or "None within orb"
+
     prompt = f"""
     You are the 'Resonance Engine', a relational simulator.
     
@@ -1233,19 +1628,21 @@ def generate_synastry_prompt(chart_a: Dict, chart_b: Dict, relationship_type: st
     ENTITY A (User): Sun {chart_a['sun']['sign']}, Moon {chart_a['moon']['sign']}, Mars {chart_a['mars']['sign']}
     ENTITY B (Target): Sun {chart_b['sun']['sign']}, Moon {chart_b['moon']['sign']}, Mars {chart_b['mars']['sign']}
     
+    GEOMETRY (calculated, '{geometry['context']}' lens): Score {geometry['score']}/100
+    MEASURED ASPECTS: {measured_aspects}
+    
     MISSION:
-    Simulate the dynamic between these two fields.
+    Simulate the dynamic between these two fields, consistent with the calculated geometry.
     
     OUTPUT JSON:
     {{
-        "score": 0-100,
         "chart_energy": 0-100 (Physical/Sexual/Drive),
         "chart_emotional": 0-100 (Empathy/Feeling),
         "chart_intellect": 0-100 (Logic/Ideas),
         "chart_communication": 0-100 (Flow/Understanding),
         "chart_ego": 0-100 (Will/Identity Friction - higher means less friction/better match),
         "summary": "2 sentence executive summary of the bond.",
-        "key_aspects": ["Sun Trine Moon", "Mars Square Mars", "Venus Conjunct Sun"],
+        "key_aspects": ["Up to 3 aspects taken from MEASURED ASPECTS"],
         "conflict_vector": "THE SCENARIO WHERE THEY FIGHT. describe the specific situation (e.g., 'A wants speed, B wants structure'). Be specific.",
         "harmony_vector": "THE SCENARIO WHERE THEY FLOW. describe the specific situation where they are unstoppable.",
         "quantum_protocol": "One actionable instruction to resolve the Conflict Vector."
@@ -1256,61 +1653,109 @@ def generate_synastry_prompt(chart_a: Dict, chart_b: Dict, relationship_type: st
     """
     return prompt
 
-@app.post("/agent/synastry", response_model=SynastryResponse)
+synastry_pair_cache = PairCache()  # Geometry + narratives per canonical pair of birth records
+
+# Relationship types (CompatibilityInput) -> aspect weighting lens of calculate_synastry
+RELATIONSHIP_CONTEXTS = {"passionate": "love", "professional": "work", "karmic": "love"}
+
+def synastry_profile(person) -> Dict:
+    """PersonProfile / user_data dict -> profile for get_natal_chart (charts memoized by birth data)."""
+    if isinstance(person, BaseModel):
+        person = person.dict()
+    profile = {
+        "full_name": person.get("name") or "Unknown",
+        "birth_date": person.get("date") or "1990-01-01",
+        "birth_time": person.get("time") or "12:00",
+        "birth_city": person.get("city") or "London"
+    }
+    if person.get("country"):
+        profile["country"] = person["country"]
+    return profile
+
+@app.post("/agent/synastry")
 async def synastry_endpoint(request: SynastryRequest):
-    print(f"🔗 Calculating Synastry: {request.relationship_type}")
+    """
+    Single synastry pipeline: charts (memoized) -> geometric score (aspect_engine) ->
+    narrative (LLM) only in mode="narrative". mode="geometric" never calls OpenAI.
+    Both stages are cached per pair of canonical birth records (synastry_pair_cache), so a
+    re-opened connection card skips geocoding and charts entirely.
+    """
+    mode = request.mode or ("narrative" if request.relationship_type or request.user_data else "geometric")
+    if mode not in ("geometric", "narrative"):
+        raise HTTPException(status_code=400, detail=f"Modo inválido: {mode}")
 
-    # Helper to parse date
-    def parse_profile(p):
-        d = datetime.strptime(p.get("date", "1990-01-01"), "%Y-%m-%d")
-        t = p.get("time", "12:00")
-        h, m = map(int, t.split(':')[:2])
-        return d.year, d.month, d.day, h, m, p.get("city", "London")
+    person_a = request.user or request.user_data
+    person_b = request.partner or request.partner_data
+    if not person_a or not person_b:
+        raise HTTPException(status_code=400, detail="Dados de nascimento de ambas as pessoas são obrigatórios.")
 
-    try:
-        # Chart A
-        y, m, d, h, mn, city = parse_profile(request.user_data)
-        chart_a = AstrologyEngine.calculate_chart("User", y, m, d, h, mn, city)
-        
-        # Chart B
-        y, m, d, h, mn, city = parse_profile(request.partner_data)
-        chart_b = AstrologyEngine.calculate_chart("Partner", y, m, d, h, mn, city)
-        
-        if not chart_a or not chart_b:
-             raise HTTPException(status_code=400, detail="Failed to calculate charts.")
+    relationship_type = request.relationship_type or request.context or "love"
+    context = request.context or RELATIONSHIP_CONTEXTS.get(relationship_type, "love")
 
-        # LLM Analysis
-        prompt = generate_synastry_prompt(chart_a, chart_b, request.relationship_type)
-        
-        completion = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": prompt},
-                {"role": "user", "content": "Analyze this connection."}
-            ],
-            temperature=0.7,
-            response_format={"type": "json_object"}
-        )
-        
-        data = json.loads(completion.choices[0].message.content)
-        
-        return SynastryResponse(
-            score=data.get("score", 50),
-            chart_energy=data.get("chart_energy", 50),
-            chart_emotional=data.get("chart_emotional", 50),
-            chart_intellect=data.get("chart_intellect", 50),
-            chart_communication=data.get("chart_communication", 50),
-            chart_ego=data.get("chart_ego", 50),
-            summary=data.get("summary", "Analysis unavailable."),
-            key_aspects=data.get("key_aspects", []),
-            quantum_protocol=data.get("quantum_protocol", "Maintain neutral orbit."),
-            conflict_vector=data.get("conflict_vector", "Data insufficient."),
-            harmony_vector=data.get("harmony_vector", "Data insufficient.")
-        )
-        
-    except Exception as e:
-        print(f"❌ Synastry Error: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    profile_a, profile_b = synastry_profile(person_a), synastry_profile(person_b)
+    record_a, record_b = birth_record_key(profile_a), birth_record_key(profile_b)
+    symmetric = aspect_engine.is_symmetric(context)
+    charts = None
+
+    async def load_charts():
+        # Both charts concurrently (geocoding / ephemeris in the I/O pool)
+        try:
+            return await asyncio.gather(
+                run_blocking(get_natal_chart, profile_a),
+                run_blocking(get_natal_chart, profile_b)
+            )
+        except Exception as e:
+            print(f"❌ Synastry Calc Error: {e}")
+            raise HTTPException(status_code=400, detail=str(e))
+
+    geometry = synastry_pair_cache.get(record_a, record_b, context, symmetric)
+    if geometry is None:
+        charts = await load_charts()
+        geometry = AstrologyEngine.calculate_synastry(charts[0], charts[1], context=context)
+        if not any(chart.get("provisional") for chart in charts):
+            synastry_pair_cache.put(record_a, record_b, context, geometry, symmetric)
+
+    print(f"🪐 Real Synastry ({context}, {mode}): Score {geometry['score']}")
+    if mode == "geometric":
+        return geometry
+
+    # Narratives are order-dependent (A = user, B = target): never shared with (B, A)
+    narrative_context = f"narrative|{relationship_type}|{context}"
+    data = synastry_pair_cache.get(record_a, record_b, narrative_context, symmetric=False)
+    if data is None:
+        chart_a, chart_b = charts or await load_charts()
+        try:
+            prompt = generate_synastry_prompt(chart_a, chart_b, relationship_type, geometry)
+            completion = await async_openai.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": prompt},
+                    {"role": "user", "content": "Analyze this connection."}
+                ],
+                temperature=0.7,
+                response_format={"type": "json_object"}
+            )
+            data = json.loads(completion.choices[0].message.content)
+            if not any(chart.get("provisional") for chart in (chart_a, chart_b)):
+                synastry_pair_cache.put(record_a, record_b, narrative_context, data, symmetric=False)
+        except Exception as e:
+            print(f"❌ Synastry Error: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+    return SynastryResponse(
+        score=geometry["score"],
+        chart_energy=data.get("chart_energy", 50),
+        chart_emotional=data.get("chart_emotional", 50),
+        chart_intellect=data.get("chart_intellect", 50),
+        chart_communication=data.get("chart_communication", 50),
+        chart_ego=data.get("chart_ego", 50),
+        summary=data.get("summary", "Analysis unavailable."),
+        key_aspects=data.get("key_aspects") or [a["description"] for a in geometry["aspects"][:3]],
+        quantum_protocol=data.get("quantum_protocol", "Maintain neutral orbit."),
+        conflict_vector=data.get("conflict_vector", "Data insufficient."),
+        harmony_vector=data.get("harmony_vector", "Data insufficient."),
+        geometry=geometry
+    )
 
 class DashboardResponse(BaseModel):
     next_window_focus: str
@@ -1324,21 +1769,42 @@ class DashboardResponse(BaseModel):
     score_physical: int
     score_emotional: int
 
+def build_wheel(profile: Dict, natal_chart: Dict = None) -> list:
+    """
+    Wheel of Life sectors. Default backend: the memoized natal chart (same swisseph pass as
+    calculate_chart, with outer planets + cusps) against the shared Sky Now snapshot.
+    WHEEL_BACKEND=kerykeion keeps the legacy full recalculation as a fallback.
+    """
+    if WHEEL_BACKEND == "kerykeion":
+        b_date = datetime.strptime(profile.get("birth_date", "1990-01-01"), "%Y-%m-%d")
+        b_h, b_m = map(int, profile.get("birth_time", "12:00").split(':')[:2])
+        engine = WheelEngine(
+            profile.get("full_name", "User"),
+            b_date.year, b_date.month, b_date.day, b_h, b_m,
+            profile.get("birth_city", "London"),
+            profile.get("country", "US")
+        )
+        return engine.generate_wheel()
+
+    if natal_chart is None:
+        natal_chart = get_natal_chart(profile)
+    engine = WheelEngine.from_charts(natal_chart, AstrologyEngine.get_current_transits())
+    return engine.generate_wheel()
+
 @app.post("/agent/wheel")
 async def wheel_endpoint(request: ChartDataRequest):
     print(f"🎡 Calculating Wheel of Life for {request.city}")
     try:
-        dt = datetime.strptime(request.date + " " + request.time, "%Y-%m-%d %H:%M")
+        datetime.strptime(request.date + " " + request.time, "%Y-%m-%d %H:%M")
+        profile = {
+            "birth_date": request.date,
+            "birth_time": request.time,
+            "birth_city": request.city,
+            "country": request.country
+        }
         
         # Calculate Wheel
-        engine = WheelEngine(
-            "User",
-            dt.year, dt.month, dt.day,
-            dt.hour, dt.minute,
-            request.city, request.country,
-            target_date=datetime.now()
-        )
-        data = engine.generate_wheel()
+        data = await run_blocking(build_wheel, profile)
         
         # Calculate Overall Harmony (Avg)
         avg_score = sum([d['score'] for d in data]) / len(data)
@@ -1369,12 +1835,28 @@ async def history_endpoint(user_id: str):
         
     try:
         # Fetch last 30 days
-        res = supabase.table("daily_stats").select("date, mental_score, physical_score, emotional_score").eq("user_id", user_id).order("date", desc=False).limit(30).execute()
+        res = await run_blocking(supabase.table("daily_stats").select("date, mental_score, physical_score, emotional_score").eq("user_id", user_id).order("date", desc=False).limit(30).execute)
         return res.data
     except Exception as e:
         print(f"❌ History Error: {e}")
         return []
 
+@app.get("/agent/chat_history")
+async def chat_history_endpoint(user_id: str, limit: int = 20, session_id: Optional[str] = None, cursor: Optional[str] = None):
+    """Paginated chat history. Pass the returned next_cursor to load older messages."""
+    try:
+        return await run_blocking(get_chat_history_page, user_id, limit, session_id, cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"❌ Chat History Error: {e}")
+        raise HTTPException(status_code=500, detail="Could not load chat history")
+
+@app.get("/agent/metrics")
+async def metrics_endpoint():
+    """Per-process counters (cache hit rates etc.) for ops dashboards."""
+    return metrics.snapshot()
+
 class DashboardResponse(BaseModel):
     next_window_focus: str
     next_window_desc: str
@@ -1390,6 +1872,38 @@ class DashboardResponse(BaseModel):
     planetary_hour: Optional[str] = "N/A"
     is_void: Optional[bool] = False
 
+async def generate_dashboard_narrative(inputs: Dict) -> Dict:
+    """
+    Widget text for one quantized astrological state (see narrative_cache).
+    The prompt must depend on `inputs` only: no user name, no clock time.
+    """
+    width = NARRATIVE_SCORE_BUCKET
+    prompt = f"""
+        Gere um Snapshot do Dashboard Astrológico do Dia.
+        DATE: {inputs['date']}
+        CONTEXT: Planetary Hour {inputs['hour_ruler']}, Void Moon {inputs['is_void']}
+        SCORES (0-100): M {inputs['mental']}-{inputs['mental'] + width}, P {inputs['physical']}-{inputs['physical'] + width}, E {inputs['emotional']}-{inputs['emotional'] + width}
+        
+        OUTPUT JSON (pt-BR):
+        {{
+            "next_window_focus": "Suggest focus based on {inputs['hour_ruler']}...",
+            "next_window_desc": "...",
+            "astral_alert_title": "...",
+            "astral_alert_desc": "...",
+            "transit_title": "...",
+            "transit_desc": "...",
+            "daily_quote": "..."
+        }}
+        """
+
+    completion = await async_openai.chat.completions.create(
+        model="gpt-4o-mini",
+        messages=[{"role": "user", "content": prompt}],
+        temperature=0.7,
+        response_format={"type": "json_object"}
+    )
+    return json.loads(completion.choices[0].message.content)
+
 @app.get("/agent/dashboard", response_model=DashboardResponse)
 async def dashboard_endpoint(user_id: str, lat: Optional[float] = None, lon: Optional[float] = None, timezone: Optional[str] = None):
     print(f"📊 Generating Dashboard for {user_id}")
@@ -1409,11 +1923,11 @@ async def dashboard_endpoint(user_id: str, lat: Optional[float] = None, lon: Opt
     if user_id != "demo" and lat and lon:
         try:
             current_time = datetime.now().isoformat()
-            supabase.table("profiles").update({
+            await run_blocking(supabase.table("profiles").update({
                 "current_lat": lat,
                 "current_lon": lon,
                 "last_location_update": current_time
-            }).eq("id", user_id).execute()
+            }).eq("id", user_id).execute)
             print(f"📍 Location Persisted: {lat}, {lon}")
         except Exception as e:
             # We don't want to crash the dashboard if location save fails (e.g. column missing)
@@ -1425,7 +1939,7 @@ async def dashboard_endpoint(user_id: str, lat: Optional[float] = None, lon: Opt
     
     if user_id != "demo":
         try:
-             res = supabase.table("daily_stats").select("*").eq("user_id", user_id).eq("date", today_str).execute()
+             res = await run_blocking(supabase.table("daily_stats").select("*").eq("user_id", user_id).eq("date", today_str).execute)
              if res.data:
                  cached_data = res.data[0]
                  print("⚡ Cache Hit: Returning stored daily stats.")
@@ -1475,17 +1989,13 @@ async def dashboard_endpoint(user_id: str, lat: Optional[float] = None, lon: Opt
 
     # 3. Cache Miss - Full Compute
     # ... Get Profile ...
-    profile = get_user_profile(user_id)
+    profile = await run_blocking(get_user_profile, user_id)
     if not profile: profile = {"full_name": "Traveler"}
 
     if not profile: profile = {"full_name": "Traveler"}
 
     try:
-        b_date = datetime.strptime(profile.get("birth_date", "1990-01-01"), "%Y-%m-%d")
-        b_time_str = profile.get("birth_time", "12:00")
-        b_hour, b_min = map(int, b_time_str.split(':')[:2])
-        
-        natal_chart = AstrologyEngine.calculate_chart(profile.get("full_name", "User"), b_date.year, b_date.month, b_date.day, b_hour, b_min, profile.get("birth_city", "London"))
+        natal_chart = await run_blocking(get_natal_chart, profile, user_id)
         
         # Calculate Is Void properly here for MISS
         transit_chart = AstrologyEngine.get_current_transits()
@@ -1498,24 +2008,10 @@ async def dashboard_endpoint(user_id: str, lat: Optional[float] = None, lon: Opt
 
     # Calculate Scores using the ROBUST WheelEngine (Gold Master Logic)
     try:
-        # We need lat/lon for WheelEngine? It uses City/Country string lookup usually.
-        # But we have lat/lon from profile or defaults.
-        # WheelEngine init: Name, Y, M, D, H, M, City, Country
-        
-        # Parse Birth Time
-        b_date = datetime.strptime(profile.get("birth_date", "1990-01-01"), "%Y-%m-%d")
-        b_time_str = profile.get("birth_time", "12:00")
-        b_h, b_m = map(int, b_time_str.split(':')[:2])
-        
-        # Instantiate Engine
-        engine = WheelEngine(
-            profile.get("full_name", "User"),
-            b_date.year, b_date.month, b_date.day, b_h, b_m,
-            profile.get("birth_city", "London"),
-            profile.get("birth_country", "GB")
-        )
-        
-        wheel_data = engine.generate_wheel()
+        # Reuses the natal chart fetched above (no second geocoding/ephemeris pass)
+        if natal_chart is None and WHEEL_BACKEND != "kerykeion":
+            raise ValueError("Natal chart unavailable")
+        wheel_data = await run_blocking(build_wheel, profile, natal_chart)
         
         # Map 8 Sectors to 3 Core Scores
         # Helper to find score by label
@@ -1548,43 +2044,10 @@ async def dashboard_endpoint(user_id: str, lat: Optional[float] = None, lon: Opt
         global debug_last_error
         debug_last_error = str(e)
 
-    # LLM Gen
+    # LLM Gen (shared across users in the same astrological state)
     try:
-        # Check if we have a debug error to show
-        if 'debug_last_error' in globals():
-             daily_quote = f"DEBUG ERROR: {debug_last_error}"
-        elif 'wheel_data' in locals():
-             # DUMP DATA
-             daily_quote = f"DATA: {str(wheel_data)[:500]}"
-        else:
-             daily_quote = "A sabedoria dos astros..."
-        prompt = f"""
-        Gere um Snapshot do Dashboard Astrológico em Tempo Real.
-        DATE: {datetime.now()}
-        USER: {profile.get('full_name')}
-        CONTEXT: Planetary Hour {p_hour}, Void Moon {is_void}
-        SCORES: M {sc_mental}, P {sc_physical}, E {sc_emotional}
-        
-        OUTPUT JSON (pt-BR):
-        {{
-            "next_window_focus": "Suggest focus based on {p_hour}...",
-            "next_window_desc": "...",
-            "astral_alert_title": "...",
-            "astral_alert_desc": "...",
-            "transit_title": "...",
-            "transit_desc": "...",
-            "daily_quote": "..."
-        }}
-        """
-        
-        completion = openai_client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[{"role": "user", "content": prompt}],
-            temperature=0.7,
-            response_format={"type": "json_object"}
-        )
-        
-        data = json.loads(completion.choices[0].message.content)
+        inputs = narrative_inputs(today_str, p_hour, is_void, sc_mental, sc_physical, sc_emotional)
+        data = dict(await narrative_cache.get_or_generate(inputs, generate_dashboard_narrative))
         data['score_mental'] = sc_mental
         data['score_physical'] = sc_physical
         data['score_emotional'] = sc_emotional
@@ -1607,11 +2070,11 @@ async def dashboard_endpoint(user_id: str, lat: Optional[float] = None, lon: Opt
                     # But for initial read, we put them here too.
                 }
                 
-                existing = supabase.table("daily_stats").select("id").eq("user_id", user_id).eq("date", today_str).execute()
+                existing = await run_blocking(supabase.table("daily_stats").select("id").eq("user_id", user_id).eq("date", today_str).execute)
                 if existing.data:
-                     supabase.table("daily_stats").update(stats_payload).eq("id", existing.data[0]['id']).execute()
+                     await run_blocking(supabase.table("daily_stats").update(stats_payload).eq("id", existing.data[0]['id']).execute)
                 else:
-                     supabase.table("daily_stats").insert(stats_payload).execute()
+                     await run_blocking(supabase.table("daily_stats").insert(stats_payload).execute)
                 print("💾 Saved Cache.")
             except Exception as e:
                 print(f"⚠️ Cache Write Error: {e}")
@@ -1729,7 +2192,7 @@ async def detail_endpoint(dimension: str, user_id: str):
     print(f"🔍 Generating Detail for {dimension}")
     
     # 1. Get Profile
-    profile = get_user_profile(user_id)
+    profile = await run_blocking(get_user_profile, user_id)
     if not profile: profile = {"full_name": "Traveler"}
 
     # 2. Daily Trend (Last 3 days + Next 2)
@@ -1740,16 +2203,19 @@ async def detail_endpoint(dimension: str, user_id: str):
     
     current_score = 0
     
+    # Natal is constant (User) - memoized, computed once for the whole trend
+    try:
+        n_chart = await run_blocking(get_natal_chart, profile, user_id) if profile.get("birth_date") else None
+    except Exception as e:
+        print(f"⚠️ Natal calculation failed: {e}")
+        n_chart = None
+    if not n_chart:
+        n_chart = await run_blocking(AstrologyEngine.calculate_chart, "U", 1990, 1, 1, 12, 0, "London") # Mock for trend consistency
+    
     for offset in days_offsets:
         d = today + timedelta(days=offset)
-        # Calc transit for that day
-        # We need a quick calc for trend
-        # Re-use calculate_chart logic but simplified or full? Full is fast enough for 5 calls.
-        
-        t_chart = AstrologyEngine.calculate_chart("T", d.year, d.month, d.day, 12, 0, "UTC")
-        
-        # Natal is constant (User)
-        n_chart = AstrologyEngine.calculate_chart("U", 1990, 1, 1, 12, 0, "London") # Mock for trend consistency or fetch real if avail
+        # Calc transit for that day (noon UTC) from the shared snapshot service
+        t_chart = sky_snapshot.chart(datetime(d.year, d.month, d.day, 12, 0))
         
         # Calc score
         day_score = calculate_astral_score(n_chart, t_chart, dimension)
@@ -1800,7 +2266,7 @@ async def detail_endpoint(dimension: str, user_id: str):
     """
     
     try:
-        completion = openai_client.chat.completions.create(
+        completion = await async_openai.chat.completions.create(
             model="gpt-4o-mini",
             messages=[{"role": "user", "content": prompt}],
             temperature=0.7,
@@ -1866,8 +2332,8 @@ async def search_city(q: str):
     }
     
     try:
-        # Use a timeout to prevent hanging
-        response = requests.get(url, params=params, headers=headers, timeout=5)
+        # Use a timeout to prevent hanging (pooled async client - doesn't block the event loop)
+        response = await get_http_client().get(url, params=params, headers=headers, timeout=5)
         response.raise_for_status()
         data = response.json()
         
@@ -0,0 +1,197 @@
+"""
+Celest AI - Aspect Engine (Synastry)
+Context weight tables are compiled once at import into planet x planet x aspect NumPy arrays.
+A chart pair (or one chart against N candidates) is resolved in a single broadcast: angular
+distance matrix -> orb per aspect -> first aspect within orb (defs order) -> weight lookup.
+"""
+import numpy as np
+
+PLANETS = ("sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn")
+
+# Sacred Geometry Defs (first match wins, in this order)
+ASPECT_DEFS = (
+    {"name": "Conjunction", "angle": 0, "orb": 8},
+    {"name": "Opposition", "angle": 180, "orb": 8},
+    {"name": "Trine", "angle": 120, "orb": 8},
+    {"name": "Square", "angle": 90, "orb": 8},
+    {"name": "Sextile", "angle": 60, "orb": 6},
+)
+
+# --- WEIGHT MATRIX (The Intelligence) ---
+# Base Weights (Fallback)
+BASE_WEIGHTS = {
+    "Conjunction": 10, "Opposition": -5, "Trine": 15, "Square": -10, "Sextile": 5
+}
+
+# Context Modifiers
+# If (Planet A or B is X) AND (Aspect is Y) -> New Weight
+CONTEXT_MODIFIERS = {
+    'love': {
+        'Square': -15, # Tension is fatal in romance
+        'Opposition': -10,
+        'Trine': 20, # Flow is critical
+        ('saturn', 'moon', 'Square'): -25, # The "Cold Heart" aspect
+        ('venus', 'mars', 'Conjunction'): 30, # The "Passion" aspect
+        ('sun', 'moon', 'Conjunction'): 30 # Soulmate
+    },
+    'work': {
+        'Square': 5, # Tension = Drive/Ambition (Good for business!)
+        'Opposition': 0, # Complementary views
+        'Trine': 10, # Good but lazy?
+        ('saturn', 'sun', 'Conjunction'): 25, # Structure + Authority (Great for work)
+        ('mercury', 'mercury', 'Trine'): 25, # Brainstorming flow
+        ('mars', 'saturn', 'Square'): 15 # "Unstoppable Force" (High energy)
+    },
+    'social': {
+        'Square': -5, # Annoying but manageable
+        'Trine': 20, # Party vibes
+        ('jupiter', 'sun', 'Conjunction'): 30, # The "Best Friends" aspect
+        ('moon', 'moon', 'Trine'): 25 # Emotional safety
+    }
+}
+DEFAULT_CONTEXT = 'love'
+SCORE_CHUNK = 4096  # Candidates per broadcast in score_vectors (bounds temporaries to ~10MB)
+
+ASPECT_NAMES = tuple(aspect["name"] for aspect in ASPECT_DEFS)
+ASPECT_ANGLES = np.array([aspect["angle"] for aspect in ASPECT_DEFS], dtype=np.float64)
+ASPECT_ORBS = np.array([aspect["orb"] for aspect in ASPECT_DEFS], dtype=np.float64)
+
+
+def _compile_weights(modifiers: dict) -> np.ndarray:
+    """(planet_a, planet_b, aspect) -> weight, with the same precedence as the original lookups:
+    specific (a, b, aspect) > specific (b, a, aspect) > context aspect > base aspect."""
+    weights = np.empty((len(PLANETS), len(PLANETS), len(ASPECT_NAMES)), dtype=np.int64)
+    for k, name in enumerate(ASPECT_NAMES):
+        weights[:, :, k] = modifiers.get(name, BASE_WEIGHTS.get(name, 0))
+        for i, p1 in enumerate(PLANETS):
+            for j, p2 in enumerate(PLANETS):
+                if (p2, p1, name) in modifiers:
+                    weights[i, j, k] = modifiers[(p2, p1, name)]
+                if (p1, p2, name) in modifiers:
+                    weights[i, j, k] = modifiers[(p1, p2, name)]
+    weights.setflags(write=False)
+    return weights
+
+
+WEIGHTS = {context: _compile_weights(modifiers) for context, modifiers in CONTEXT_MODIFIERS.items()}
+# Contexts where weight(a, b) == weight(b, a): synastry(B, A) is synastry(A, B) transposed
+SYMMETRIC_CONTEXTS = frozenset(
+    context for context, weights in WEIGHTS.items() if (weights == weights.transpose(1, 0, 2)).all()
+)
+PLANET_INDEX = {planet: i for i, planet in enumerate(PLANETS)}
+_ROWS, _COLS = np.indices((len(PLANETS), len(PLANETS)))
+
+
+def chart_vector(chart: dict):
+    """(longitudes, present) arrays over PLANETS for a chart dict ({"sun": {"longitude": ..}, ..})."""
+    longitudes = np.zeros(len(PLANETS), dtype=np.float64)
+    present = np.zeros(len(PLANETS), dtype=bool)
+    for i, planet in enumerate(PLANETS):
+        if planet in chart:
+            longitudes[i] = chart[planet].get("longitude", 0)
+            present[i] = True
+    return longitudes, present
+
+
+def _resolve(lon_a, present_a, lons_b, present_b, context: str):
+    """
+    Broadcast core. lon_a/present_a: (P,), lons_b/present_b: (N, P).
+    Returns hit (N, P, P) bool, aspect index (N, P, P), orb (N, P, P), weight (N, P, P).
+    """
+    diff = np.abs(lon_a[None, :, None] - lons_b[:, None, :])
+    diff = np.minimum(diff, 360 - diff)               # Shortest arc (0-180)
+
+    within = np.abs(diff[..., None] - ASPECT_ANGLES) <= ASPECT_ORBS  # (N, P, P, A)
+    first = within.argmax(axis=-1)                    # First aspect in defs order
+    hit = within.any(axis=-1) & (present_a[:, None] & present_b[:, None, :])
+
+    orb = np.abs(diff - ASPECT_ANGLES[first])
+    weights = WEIGHTS.get(context, WEIGHTS[DEFAULT_CONTEXT])
+    return hit, first, orb, weights[_ROWS, _COLS, first] * hit
+
+
+def is_symmetric(context: str) -> bool:
+    return (context if context in WEIGHTS else DEFAULT_CONTEXT) in SYMMETRIC_CONTEXTS
+
+
+def transpose(result: dict) -> dict:
+    """synastry(A, B) payload -> synastry(B, A) payload (valid for symmetric contexts)."""
+    aspects = [
+        dict(aspect, planet_a=aspect["planet_b"], planet_b=aspect["planet_a"],
+             description=f"{aspect['planet_b'].capitalize()} {aspect['aspect']} {aspect['planet_a'].capitalize()}")
+        for aspect in result["aspects"]
+    ]
+    aspects.sort(key=lambda aspect: (PLANET_INDEX[aspect["planet_a"]], PLANET_INDEX[aspect["planet_b"]]))
+    return dict(result, aspects=aspects)
+
+
+def normalize_score(raw_score):
+    return np.clip(50 + np.asarray(raw_score) * 0.5, 0, 100)
+
+
+def synastry(chart_a: dict, chart_b: dict, context: str = DEFAULT_CONTEXT) -> dict:
+    """Aspects between two charts (same payload as AstrologyEngine.calculate_synastry)."""
+    lon_a, present_a = chart_vector(chart_a)
+    lon_b, present_b = chart_vector(chart_b)
+    hit, first, orb, weight = _resolve(lon_a, present_a, lon_b[None], present_b[None], context)
+    hit, first, orb, weight = hit[0], first[0], orb[0], weight[0]
+
+    aspects = []
+    rows, cols = np.nonzero(hit)  # Row-major: same order as the planet loops
+    for i, j, k, tightness, w in zip(rows.tolist(), cols.tolist(), first[hit].tolist(),
+                                      orb[hit].tolist(), weight[hit].tolist()):
+        p1, p2, name = PLANETS[i], PLANETS[j], ASPECT_NAMES[k]
+        aspects.append({
+            "planet_a": p1,
+            "planet_b": p2,
+            "aspect": name,
+            "orb_tightness": round(tightness, 2),
+            "weight": w,
+            "description": f"{p1.capitalize()} {name} {p2.capitalize()}"
+        })
+
+    score = int(weight.sum())
+    normalized_score = min(100, max(0, 50 + (score * 0.5)))
+    return {
+        "score": round(normalized_score),
+        "raw_score": score,
+        "aspects": aspects,
+        "count": len(aspects),
+        "context": context
+    }
+
+
+def score_vectors(chart_a: dict, lons_b, present_b=None, context: str = DEFAULT_CONTEXT,
+                  chunk: int = SCORE_CHUNK) -> dict:
+    """
+    Scores one chart against N candidates given as a (N, P) longitude array in PLANETS order
+    (present_b: optional (N, P) mask). Works in chunks to bound the (N, P, P, A) temporaries.
+    Returns NumPy arrays: score (N,) normalized 0-100, raw_score (N,), count (N,).
+    """
+    lon_a, present_a = chart_vector(chart_a)
+    lons_b = np.asarray(lons_b, dtype=np.float64).reshape(-1, len(PLANETS))
+    if present_b is None:
+        present_b = np.ones(lons_b.shape, dtype=bool)
+
+    raw = np.zeros(len(lons_b), dtype=np.int64)
+    count = np.zeros(len(lons_b), dtype=np.int64)
+    for start in range(0, len(lons_b), chunk):
+        stop = start + chunk
+        hit, _, _, weight = _resolve(lon_a, present_a, lons_b[start:stop], present_b[start:stop], context)
+        raw[start:stop] = weight.sum(axis=(1, 2))
+        count[start:stop] = hit.sum(axis=(1, 2))
+    return {"score": normalize_score(raw), "raw_score": raw, "count": count}
+
+
+def score_batch(chart_a: dict, charts_b: list, context: str = DEFAULT_CONTEXT) -> dict:
+    """Same as score_vectors, for chart dicts."""
+    vectors = [chart_vector(chart) for chart in charts_b]
+    lons_b = np.array([lon for lon, _ in vectors], dtype=np.float64).reshape(-1, len(PLANETS))
+    present_b = np.array([present for _, present in vectors], dtype=bool).reshape(-1, len(PLANETS))
+    return score_vectors(chart_a, lons_b, present_b, context)
+
+
+def top_k(scores, k: int):
+    """Indices of the k highest scores, best first (ties keep input order)."""
+    scores = np.asarray(scores)
+    return np.argsort(-scores, kind="stable")[:max(0, k)]
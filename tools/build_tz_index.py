@@ -0,0 +1,267 @@
+"""
+Celest AI - Timezone Index Builder
+Packs timezone polygons into the compact, memory-mappable index read by tz_index.py.
+
+Source data: timezone-boundary-builder releases (combined.json / timezones.geojson,
+optionally zipped) - https://github.com/evansiroky/timezone-boundary-builder
+Use the full (not "-now") variant: birth charts need historical rules per zone.
+
+Usage:
+  python tools/build_tz_index.py timezones.geojson.zip -o cache/timezones.tzidx --cell 0.5 --simplify 0.005
+  python tools/build_tz_index.py --download            # fetch TZ_BOUNDARY_RELEASE first
+
+Deployment runs the --download form as part of the Vercel build (npm run build:tz) and
+ships cache/timezones.tzidx with api/index.py (vercel.json includeFiles). It is read-only
+at runtime. Check a built index with tools/verify_tz_index.py.
+"""
+import argparse
+import json
+import os
+import struct
+import tempfile
+import zipfile
+
+import numpy as np
+import requests
+
+from tz_index import HEADER, MAGIC, VERSION, DEFAULT_INDEX_PATH, ocean_zone
+
+TZ_BOUNDARY_RELEASE = os.getenv("TZ_BOUNDARY_RELEASE", "2024b")
+TZ_BOUNDARY_URL = "https://github.com/evansiroky/timezone-boundary-builder/releases/download/{release}/timezones.geojson.zip"
+
+
+# ============================================================
+# INPUT
+# ============================================================
+
+def download_source(release: str = TZ_BOUNDARY_RELEASE) -> str:
+    """Downloads the full timezone-boundary-builder GeoJSON zip; returns the local path."""
+    url = TZ_BOUNDARY_URL.format(release=release)
+    print(f"⬇️ Downloading {url}")
+    path = os.path.join(tempfile.gettempdir(), f"timezones-{release}.geojson.zip")
+    with requests.get(url, stream=True, timeout=120) as resp:
+        resp.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in resp.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+    return path
+
+
+def load_features(path: str) -> list:
+    if path.endswith(".zip"):
+        with zipfile.ZipFile(path) as zf:
+            name = next(n for n in zf.namelist() if n.endswith("json"))
+            return json.loads(zf.read(name))["features"]
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["features"]
+
+
+def simplify_ring(points: np.ndarray, tolerance: float) -> np.ndarray:
+    """Douglas-Peucker on a closed ring. Keeps the original if simplification collapses it."""
+    if tolerance <= 0 or len(points) <= 4:
+        return points
+
+    keep = np.zeros(len(points), dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+        a, b = points[start], points[end]
+        seg = points[start + 1:end]
+        d = b - a
+        norm = np.hypot(d[0], d[1])
+        if norm == 0:
+            dist = np.hypot(seg[:, 0] - a[0], seg[:, 1] - a[1])
+        else:
+            dist = np.abs(d[0] * (seg[:, 1] - a[1]) - d[1] * (seg[:, 0] - a[0])) / norm
+        i = int(np.argmax(dist))
+        if dist[i] > tolerance:
+            mid = start + 1 + i
+            keep[mid] = True
+            stack.append((start, mid))
+            stack.append((mid, end))
+
+    simplified = points[keep]
+    return simplified if len(simplified) >= 4 else points
+
+
+def zone_edges(features: list, tolerance: float):
+    """Returns (zone names, edges (M, 4) float64, edge zone ids (M,))."""
+    zones = sorted({f["properties"]["tzid"] for f in features})
+    zone_ids = {z: i for i, z in enumerate(zones)}
+
+    all_edges, all_ids = [], []
+    for feature in features:
+        geometry = feature["geometry"]
+        polygons = geometry["coordinates"]
+        if geometry["type"] == "Polygon":
+            polygons = [polygons]
+        zid = zone_ids[feature["properties"]["tzid"]]
+
+        # All rings (outer + holes) of all polygons: even-odd parity gives the union
+        for polygon in polygons:
+            for ring in polygon:
+                pts = simplify_ring(np.asarray(ring, dtype=float)[:, :2], tolerance)
+                if not np.array_equal(pts[0], pts[-1]):
+                    pts = np.vstack([pts, pts[:1]])
+                all_edges.append(np.hstack([pts[:-1], pts[1:]]))
+                all_ids.append(np.full(len(pts) - 1, zid, dtype=np.int32))
+
+    return zones, np.vstack(all_edges), np.concatenate(all_ids)
+
+
+# ============================================================
+# RASTERIZATION
+# ============================================================
+
+def edge_cells(edges: np.ndarray, cell: float, n_cols: int, n_rows: int):
+    """
+    Conservative supercover: (cell_id, edge_idx) pairs for every cell an edge touches.
+    Samples each edge at <= half-cell steps; diagonal steps add both corner neighbours.
+    """
+    dx = edges[:, 2] - edges[:, 0]
+    dy = edges[:, 3] - edges[:, 1]
+    n_samples = (np.ceil(np.maximum(np.abs(dx), np.abs(dy)) / (cell * 0.5)).astype(np.int64) + 1)
+
+    edge_idx = np.repeat(np.arange(len(edges)), n_samples)
+    starts = np.cumsum(n_samples) - n_samples
+    step = np.arange(len(edge_idx)) - np.repeat(starts, n_samples)
+    t = step / np.maximum(np.repeat(n_samples, n_samples) - 1, 1)
+
+    x = edges[edge_idx, 0] + t * dx[edge_idx]
+    y = edges[edge_idx, 1] + t * dy[edge_idx]
+    cols = np.clip(((x + 180.0) / cell).astype(np.int64), 0, n_cols - 1)
+    rows = np.clip(((y + 90.0) / cell).astype(np.int64), 0, n_rows - 1)
+
+    pairs = [np.stack([rows * n_cols + cols, edge_idx], axis=1)]
+
+    # Consecutive samples of the same edge that move diagonally
+    same = edge_idx[1:] == edge_idx[:-1]
+    diag = same & (rows[1:] != rows[:-1]) & (cols[1:] != cols[:-1])
+    if diag.any():
+        r0, r1 = rows[:-1][diag], rows[1:][diag]
+        c0, c1 = cols[:-1][diag], cols[1:][diag]
+        e = edge_idx[1:][diag]
+        pairs.append(np.stack([r0 * n_cols + c1, e], axis=1))
+        pairs.append(np.stack([r1 * n_cols + c0, e], axis=1))
+
+    return np.unique(np.vstack(pairs), axis=0)
+
+
+def center_zones(edges: np.ndarray, edge_zone: np.ndarray, cell: float, n_cols: int, n_rows: int) -> np.ndarray:
+    """Zone containing each cell center (-1 = none / open water), via one scanline per row."""
+    result = np.full((n_rows, n_cols), -1, dtype=np.int32)
+    centers_x = (np.arange(n_cols) + 0.5) * cell - 180.0
+    y1, y2 = edges[:, 1], edges[:, 3]
+
+    for row in range(n_rows):
+        y = (row + 0.5) * cell - 90.0
+        crossing = (y1 > y) != (y2 > y)
+        if not crossing.any():
+            continue
+        e = edges[crossing]
+        xs = e[:, 0] + (y - e[:, 1]) * (e[:, 2] - e[:, 0]) / (e[:, 3] - e[:, 1])
+        zs = edge_zone[crossing]
+        for z in np.unique(zs):
+            zx = np.sort(xs[zs == z])
+            inside = (np.searchsorted(zx, centers_x) & 1).astype(bool)
+            result[row, inside & (result[row] < 0)] = z
+    return result
+
+
+# ============================================================
+# OUTPUT
+# ============================================================
+
+def build_index(features: list, cell: float = 0.5, tolerance: float = 0.005) -> bytes:
+    n_cols, n_rows = int(round(360 / cell)), int(round(180 / cell))
+    zones, edges, edge_zone = zone_edges(features, tolerance)
+    print(f"🗺️ {len(zones)} zones, {len(edges)} edges after simplification")
+
+    pairs = edge_cells(edges, cell, n_cols, n_rows)
+    centers = center_zones(edges, edge_zone, cell, n_cols, n_rows).ravel()
+
+    zone_ids = {z: i for i, z in enumerate(zones)}
+
+    def zone_id(name):
+        if name not in zone_ids:
+            zone_ids[name] = len(zones)
+            zones.append(name)
+        return zone_ids[name]
+
+    ocean_ids = np.array([zone_id(ocean_zone((c + 0.5) * cell - 180.0)) for c in range(n_cols)], dtype=np.int32)
+    grid = np.where(centers >= 0, centers, np.tile(ocean_ids, n_rows)).astype(np.int32)
+
+    # Boundary cells, grouped by (cell, zone)
+    pair_zone = edge_zone[pairs[:, 1]]
+    order = np.lexsort((pairs[:, 1], pair_zone, pairs[:, 0]))
+    pairs, pair_zone = pairs[order], pair_zone[order]
+
+    cell_start, cand_zone, cand_in, edge_start, packed_edges = [0], [], [], [0], []
+    boundary_cells, first = np.unique(pairs[:, 0], return_index=True)
+    bounds = list(first) + [len(pairs)]
+
+    for k, cell_id in enumerate(boundary_cells):
+        lo, hi = bounds[k], bounds[k + 1]
+        center_zone = centers[cell_id]
+        cell_zones = pair_zone[lo:hi]
+        candidates = list(np.unique(cell_zones))
+        if center_zone >= 0 and center_zone not in candidates:
+            candidates.append(center_zone)
+
+        # Zone containing the center first: most points resolve on the first candidate
+        candidates.sort(key=lambda z: z != center_zone)
+        for z in candidates:
+            cell_edges = edges[pairs[lo:hi, 1][cell_zones == z]]
+            cand_zone.append(z)
+            cand_in.append(1 if z == center_zone else 0)
+            packed_edges.append(cell_edges)
+            edge_start.append(edge_start[-1] + len(cell_edges))
+        cell_start.append(len(cand_zone))
+        grid[cell_id] = -(k + 1)
+
+    packed = np.vstack(packed_edges) if packed_edges else np.empty((0, 4))
+    print(f"📦 {len(boundary_cells)} boundary cells, {len(cand_zone)} candidates, {len(packed)} cell edges")
+
+    names = "\n".join(zones).encode("utf-8")
+    out = bytearray(HEADER.pack(MAGIC, VERSION, cell, n_cols, n_rows, len(zones),
+                                len(boundary_cells), len(cand_zone), len(packed)))
+    out += struct.pack("<I", len(names)) + names
+
+    for arr in (
+        grid,
+        np.asarray(cell_start, dtype="<i4"),
+        np.asarray(cand_zone, dtype="<i4"),
+        np.asarray(cand_in, dtype="u1"),
+        np.asarray(edge_start, dtype="<i4"),
+        packed.astype("<f4"),
+    ):
+        out += b"\0" * (-len(out) % 8)
+        out += arr.tobytes()
+    return bytes(out)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the offline timezone index.")
+    parser.add_argument("source", nargs="?", help="timezone-boundary-builder GeoJSON (.json or .zip)")
+    parser.add_argument("--download", action="store_true", help="fetch the release instead of reading source")
+    parser.add_argument("--release", default=TZ_BOUNDARY_RELEASE)
+    parser.add_argument("-o", "--output", default=DEFAULT_INDEX_PATH)
+    parser.add_argument("--cell", type=float, default=0.5, help="grid cell size in degrees")
+    parser.add_argument("--simplify", type=float, default=0.005, help="Douglas-Peucker tolerance in degrees")
+    args = parser.parse_args()
+    if not args.source and not args.download:
+        parser.error("source is required unless --download is given")
+
+    source = download_source(args.release) if args.download else args.source
+    data = build_index(load_features(source), args.cell, args.simplify)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "wb") as f:
+        f.write(data)
+    print(f"✅ Wrote {args.output} ({len(data) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Celest AI - Natal Chart Cache
+Birth data never changes, so each natal chart is computed once and reused.
+Keyed by (date, time, lat, lon, time_unknown, house system, flags): a bounded in-process
+LRU, optionally backed by the chart persisted in the user's birth_charts row.
+"""
+import copy
+import threading
+from collections import OrderedDict
+
+from ephemeris import CALC_FLAGS, HOUSE_SYSTEM
+
+# Computation settings are part of every key: changing them invalidates old charts
+# (CHART_SCHEMA: bump when the chart dict gains fields, e.g. v2 = outer planets + cusps)
+CHART_SCHEMA = 2
+SETTINGS_SUFFIX = f"{HOUSE_SYSTEM.decode()}|{CALC_FLAGS}|v{CHART_SCHEMA}"
+
+
+def make_chart_key(date: str, time: str, lat: float, lon: float, time_unknown: bool = False) -> str:
+    """Canonical key; coordinates rounded to ~10m so geocoder jitter doesn't fork entries."""
+    hh, mm = (time or "12:00").split(":")[:2]
+    return f"{date}|{int(hh):02d}:{int(mm):02d}|{lat:.4f}|{lon:.4f}|{int(bool(time_unknown))}|{SETTINGS_SUFFIX}"
+
+
+def is_current_key(key: str, date: str, time: str, time_unknown: bool = False) -> bool:
+    """
+    True if a persisted key matches this birth data and today's settings.
+    Lets a chart stored in birth_charts be reused without geocoding the city again.
+    """
+    if not key:
+        return False
+    parts = key.split("|")
+    if len(parts) < 6:
+        return False
+    hh, mm = (time or "12:00").split(":")[:2]
+    return (
+        parts[0] == date
+        and parts[1] == f"{int(hh):02d}:{int(mm):02d}"
+        and parts[4] == str(int(bool(time_unknown)))
+        and "|".join(parts[5:]) == SETTINGS_SUFFIX
+    )
+
+
+class ChartCache:
+    def __init__(self, max_items: int = 512):
+        self.max_items = max_items
+        self._charts = OrderedDict()
+        self._user_keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            chart = self._charts.get(key)
+            if chart is None:
+                return None
+            self._charts.move_to_end(key)
+        # Callers may annotate the chart; never hand out the cached object itself
+        return copy.deepcopy(chart)
+
+    def put(self, key: str, chart: dict, user_id: str = None):
+        with self._lock:
+            self._charts[key] = copy.deepcopy(chart)
+            self._charts.move_to_end(key)
+            while len(self._charts) > self.max_items:
+                self._charts.popitem(last=False)
+            if user_id:
+                self._user_keys[user_id] = key
+
+    def invalidate_user(self, user_id: str):
+        """Drops the chart last computed for this user (birth data was edited)."""
+        with self._lock:
+            key = self._user_keys.pop(user_id, None)
+            if key:
+                self._charts.pop(key, None)
@@ -0,0 +1,115 @@
+"""
+Celest AI - Chat Log Write-Behind Buffer
+Accumulates chat_logs rows and writes them with one bulk PostgREST insert instead of one
+insert per message. Failed rows go to a bounded retry spool (retried on the next flush,
+dropped after CHAT_LOG_MAX_RETRIES).
+
+Default (CHAT_LOG_FLUSH_MS=0, serverless-safe): rows wait for an explicit flush(), which the
+chat endpoints schedule as the last BackgroundTask of the request, so a turn's rows are
+written before the invocation ends (a frozen/recycled function never holds them).
+CHAT_LOG_FLUSH_MS > 0 (long-lived servers only): a daemon thread also flushes when
+CHAT_LOG_BATCH_SIZE rows are pending or the window has passed, batching across requests.
+Pending rows are flushed on shutdown and at exit.
+
+Rows are stamped with created_at when buffered (strictly increasing), so a user message
+and its reply keep their order even though they land in the same transaction.
+"""
+import atexit
+import os
+import threading
+from datetime import datetime, timedelta, timezone
+
+CHAT_LOG_BATCH_SIZE = int(os.getenv("CHAT_LOG_BATCH_SIZE", "50"))
+CHAT_LOG_FLUSH_MS = float(os.getenv("CHAT_LOG_FLUSH_MS", "0"))  # 0 = flush at end of request only
+CHAT_LOG_SPOOL_MAX = int(os.getenv("CHAT_LOG_SPOOL_MAX", "1000"))
+CHAT_LOG_MAX_RETRIES = int(os.getenv("CHAT_LOG_MAX_RETRIES", "5"))
+
+
+class ChatLogBuffer:
+    def __init__(self, supabase_client, table: str = "chat_logs", batch_size: int = CHAT_LOG_BATCH_SIZE,
+                 flush_ms: float = CHAT_LOG_FLUSH_MS):
+        self.supabase = supabase_client
+        self.table = table
+        self.batch_size = batch_size
+        self.interval = flush_ms / 1000.0
+        self._pending = []  # (row, attempts)
+        self._spool = []    # rows whose insert failed, retried first
+        self._last_stamp = None
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # One insert at a time (keeps rows in order)
+        self._thread = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def _stamp(self, row: dict) -> dict:
+        if "created_at" not in row:
+            now = datetime.now(timezone.utc)
+            if self._last_stamp is not None and now <= self._last_stamp:
+                now = self._last_stamp + timedelta(microseconds=1)
+            self._last_stamp = now
+            row = dict(row, created_at=now.isoformat())
+        return row
+
+    def add(self, row: dict):
+        with self._cond:
+            self._pending.append((self._stamp(row), 0))
+            direct = self._closed or len(self._pending) >= self.batch_size
+            if self.interval > 0 and not self._closed:
+                direct = False
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="celest-chat-log-buffer", daemon=True)
+                    self._thread.start()
+                self._cond.notify()  # Opens the flush window (or flushes early when full)
+        if direct:
+            self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._spool and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return  # close() does the final flush
+                # Spooled rows are retried after one window even if no new row arrives
+                self._cond.wait_for(lambda: self._closed or len(self._pending) >= self.batch_size, timeout=self.interval)
+            self.flush()
+
+    def flush(self) -> int:
+        """Writes spooled + pending rows in one bulk insert. Returns rows written."""
+        with self._flush_lock:
+            with self._cond:
+                batch = self._spool + self._pending
+                self._spool, self._pending = [], []
+            if not batch:
+                return 0
+
+            rows = [row for row, _ in batch]
+            # PostgREST bulk inserts need identical keys in every object
+            columns = set().union(*(row.keys() for row in rows))
+            rows = [{column: row.get(column) for column in columns} for row in rows]
+
+            try:
+                self.supabase.table(self.table).insert(rows).execute()
+                print(f"💾 Chat logs saved: {len(rows)} rows")
+                return len(rows)
+            except Exception as e:
+                retry = [(row, attempts + 1) for row, attempts in batch if attempts + 1 < CHAT_LOG_MAX_RETRIES]
+                dropped = len(batch) - len(retry)
+                if len(retry) > CHAT_LOG_SPOOL_MAX:
+                    dropped += len(retry) - CHAT_LOG_SPOOL_MAX
+                    retry = retry[-CHAT_LOG_SPOOL_MAX:]  # Keep the newest
+                with self._cond:
+                    self._spool = retry + self._spool
+                print(f"❌ Error saving chat logs ({len(rows)} rows, {len(retry)} spooled, {dropped} dropped): {e}")
+                return 0
+
+    def close(self):
+        """Stops the flusher and writes everything pending (shutdown / atexit)."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self.flush()
@@ -0,0 +1,59 @@
+"""
+Celest AI - Embedding Cache
+Content-hashed cache for text embeddings, keyed by sha256(model + normalized text).
+Chat traffic repeats a lot ("ok", "obrigado", "e hoje?"), so most query embeddings can skip
+the OpenAI round trip. In-memory LRU in front of the shared SQLite cache file (optional);
+vectors are stored on disk as base64 float32 (~8KB for 1536 dims instead of ~30KB of JSON).
+"""
+import base64
+import hashlib
+import os
+import re
+
+import numpy as np
+
+import metrics
+from local_cache import LocalCache, default_cache_path
+
+EMBEDDING_CACHE_TTL = float(os.getenv("EMBEDDING_CACHE_TTL_DAYS", "30")) * 86400
+
+
+def normalize_text(text: str) -> str:
+    """Whitespace-collapsed, casefolded text (what the cache key is computed from)."""
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def embedding_key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\n{normalize_text(text)}".encode("utf-8")).hexdigest()
+
+
+def _encode(vector) -> str:
+    return base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def _decode(blob: str) -> list:
+    return np.frombuffer(base64.b64decode(blob), dtype=np.float32).tolist()
+
+
+class EmbeddingCache:
+    def __init__(self, max_items: int = None, persist: bool = None):
+        max_items = max_items or int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+        if persist is None:
+            persist = os.getenv("EMBEDDING_CACHE_PERSIST", "1") == "1"
+        self._cache = LocalCache(
+            "embeddings",
+            path=default_cache_path() if persist else None,
+            max_items=max_items,
+            ttl=EMBEDDING_CACHE_TTL
+        )
+
+    def get(self, model: str, text: str):
+        blob = self._cache.get(embedding_key(model, text))
+        if blob is None:
+            metrics.incr("embedding_cache.miss")
+            return None
+        metrics.incr("embedding_cache.hit")
+        return _decode(blob)
+
+    def put(self, model: str, text: str, vector):
+        self._cache.set(embedding_key(model, text), _encode(vector))
@@ -0,0 +1,151 @@
+"""
+Celest AI - Vectorized Ephemeris (Batch Charts)
+Computes planetary positions and house placements for N birth moments at once.
+Used by AstrologyEngine for single charts and for synastry/compatibility backfills,
+where per-chart dict building and cusp loops dominated the cost.
+"""
+import numpy as np
+import swisseph as swe
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+ZODIAC_SIGNS = [
+    "Aries", "Taurus", "Gemini", "Cancer",
+    "Leo", "Virgo", "Libra", "Scorpio",
+    "Sagittarius", "Capricorn", "Aquarius", "Pisces"
+]
+
+# Traditional seven (synastry weights, dignities)
+CLASSICAL_BODIES = (
+    ("sun", swe.SUN),
+    ("moon", swe.MOON),
+    ("mercury", swe.MERCURY),
+    ("venus", swe.VENUS),
+    ("mars", swe.MARS),
+    ("jupiter", swe.JUPITER),
+    ("saturn", swe.SATURN),
+)
+
+# Bodies returned by AstrologyEngine.calculate_chart (order = column order in batch arrays)
+# The outer planets feed the Wheel of Life (LifeWheelCalculator)
+CHART_BODIES = CLASSICAL_BODIES + (
+    ("uranus", swe.URANUS),
+    ("neptune", swe.NEPTUNE),
+    ("pluto", swe.PLUTO),
+)
+
+# Moshier ephemeris (no data files needed on Vercel) + velocities
+CALC_FLAGS = swe.FLG_MOSEPH | swe.FLG_SPEED
+HOUSE_SYSTEM = b'P'  # Placidus
+
+
+# ============================================================
+# TIME
+# ============================================================
+
+def julday_batch(years, months, days, hours) -> np.ndarray:
+    """
+    Vectorized Gregorian calendar -> Julian Day (UT), same result as swe.julday.
+    `hours` is the decimal UTC hour.
+    """
+    years = np.asarray(years, dtype=np.int64)
+    months = np.asarray(months, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    hours = np.asarray(hours, dtype=float)
+
+    # Meeus / Fliegel-Van Flandern day number
+    a = (14 - months) // 12
+    y = years + 4800 - a
+    m = months + 12 * a - 3
+    jdn = days + (153 * m + 2) // 5 + 365 * y + y // 4 - y // 100 + y // 400 - 32045
+    return jdn - 0.5 + hours / 24.0
+
+
+# ============================================================
+# HOUSES
+# ============================================================
+
+def house_index(longitudes, cusps) -> np.ndarray:
+    """
+    Places longitudes (N, B) into houses given cusps (N, 12) with a single searchsorted.
+
+    Each row of cusps is unwrapped relative to its first cusp (so it ascends from 0 to <360),
+    then rows are stacked with a 360° offset per row, making the whole array monotonic.
+    Returns int array (N, B) with houses 1-12, or 0 where the row has no valid cusps.
+    """
+    lon = np.atleast_2d(np.asarray(longitudes, dtype=float))
+    cusps = np.atleast_2d(np.asarray(cusps, dtype=float))
+    n = cusps.shape[0]
+
+    valid = np.isfinite(cusps).all(axis=1)
+    # Placeholder equal houses for invalid rows keep the stacked array monotonic
+    cusps = np.where(valid[:, None], cusps, np.arange(12) * 30.0)
+
+    first = cusps[:, :1]
+    unwrapped = np.mod(cusps - first, 360.0)
+    relative = np.mod(lon - first, 360.0)
+    relative[relative >= 360.0] = 0.0  # np.mod(-tiny, 360) rounds up to 360
+
+    offsets = 360.0 * np.arange(n)[:, None]
+    idx = np.searchsorted((unwrapped + offsets).ravel(), (relative + offsets).ravel(), side="right")
+    houses = idx.reshape(lon.shape) - 12 * np.arange(n)[:, None]
+
+    return np.where(valid[:, None], houses, 0)
+
+
+# ============================================================
+# BATCH CHARTS
+# ============================================================
+
+def calculate_positions_batch(jds, lats=None, lons=None, bodies=CHART_BODIES, with_houses=True) -> dict:
+    """
+    Calculates positions for N moments (UT Julian days) in one pass.
+
+    Returns a dict of NumPy arrays:
+      longitude, speed, sign, house -> (N, B) in `bodies` order (sign 0-11, house 1-12 / 0 = unknown)
+      cusps -> (N, 12), ascendant / mc -> (N,)  (NaN when houses are skipped or fail)
+    """
+    jds = np.atleast_1d(np.asarray(jds, dtype=float))
+    n, b = jds.size, len(bodies)
+
+    longitude = np.empty((n, b))
+    speed = np.empty((n, b))
+
+    calc_ut = swe.calc_ut
+    jd_list = jds.tolist()
+    for j, (_, planet_id) in enumerate(bodies):
+        for i, jd in enumerate(jd_list):
+            coords = calc_ut(jd, planet_id, CALC_FLAGS)[0]
+            longitude[i, j] = coords[0]
+            speed[i, j] = coords[3]
+
+    cusps = np.full((n, 12), np.nan)
+    ascendant = np.full(n, np.nan)
+    mc = np.full(n, np.nan)
+
+    if with_houses and lats is not None and lons is not None:
+        lat_list = np.broadcast_to(np.asarray(lats, dtype=float), (n,)).tolist()
+        lon_list = np.broadcast_to(np.asarray(lons, dtype=float), (n,)).tolist()
+        for i, jd in enumerate(jd_list):
+            try:
+                h_cusps, ascmc = swe.houses(jd, lat_list[i], lon_list[i], HOUSE_SYSTEM)
+                cusps[i] = h_cusps[:12]
+                ascendant[i] = ascmc[0]
+                mc[i] = ascmc[1]
+            except Exception as e:
+                # Polar latitudes can make Placidus undefined; leave the row unknown
+                print(f"House calculation error: {e}")
+
+    return {
+        "bodies": tuple(name for name, _ in bodies),
+        "jd": jds,
+        "longitude": longitude,
+        "speed": speed,
+        "sign": (longitude // 30).astype(int) % 12,
+        "house": house_index(longitude, cusps),
+        "cusps": cusps,
+        "ascendant": ascendant,
+        "mc": mc,
+    }
@@ -1,11 +1,13 @@
 import json
 from openai import OpenAI
-from memory_store import MemoryStore
+from memory_store import MemoryStore, MemoryBatcher
+from io_pool import run_blocking
 
 class InsightProcessor:
-    def __init__(self, openai_client: OpenAI, memory_store: MemoryStore):
+    def __init__(self, openai_client: OpenAI, memory_store: MemoryStore, batcher: MemoryBatcher = None):
         self.openai = openai_client
         self.memory = memory_store
+        self.batcher = batcher  # Optional: coalesces stores across users
 
     def extract_and_store(self, user_id: str, user_message: str, ai_response: str):
         """
@@ -48,15 +50,15 @@ class InsightProcessor:
             data = json.loads(response.choices[0].message.content)
             insights = data.get("insights", [])
             
-            # 2. Store only meaningful insights
-            count = 0
-            for insight in insights:
-                if insight and len(insight) > 10: # Minimum length filter
-                    # Store as "psych_profile" to distinguish from raw chat? 
-                    # For now, just storing content is enough, the vector search will find it.
-                    # We add a metadata tag.
-                    self.memory.store_memory(user_id, insight, metadata={"type": "insight"})
-                    count += 1
+            # 2. Store only meaningful insights (one embeddings call + one insert for all of them)
+            # Tagged as "insight" to distinguish from raw chat; the vector search will find it.
+            meaningful = [insight for insight in insights if insight and len(insight) > 10] # Minimum length filter
+            if meaningful:
+                if self.batcher:
+                    self.batcher.submit(user_id, meaningful, metadata={"type": "insight"})
+                else:
+                    self.memory.store_memories(user_id, meaningful, metadata={"type": "insight"})
+            count = len(meaningful)
             
             if count > 0:
                 print(f"🧠 InsightProcessor: Extracted {count} facts for {user_id}")
@@ -66,8 +68,58 @@ class InsightProcessor:
         except Exception as e:
             print(f"❌ InsightProcessor Error: {e}")
 
+    def extract_batch(self, turns: list) -> list:
+        """
+        Extracts insights for many interactions (possibly from different users) in ONE LLM call.
+        `turns` are dicts with user_message / ai_response; returns one list of insights per turn.
+        Raises on LLM/parse failure so queue workers can retry the jobs.
+        """
+        interactions = "\n".join(
+            f'[{i}] User: "{turn["user_message"]}"\n    AI: "{turn["ai_response"]}"'
+            for i, turn in enumerate(turns, 1)
+        )
+        prompt = f"""
+        ACT AS: An Expert Clinical Psychologist and Data Scientist.
+        
+        TASK: Analyze each numbered interaction between a User and an AI (Soul-Guide) INDEPENDENTLY.
+        Interactions may belong to different users: never mix facts between them.
+        EXTRACT: New, permanent facts, psychological traits, or current emotional states.
+        
+        INTERACTIONS:
+        {interactions}
+        
+        RULES:
+        1. IGNORE conversational noise (Greettings, small talk, "thank you", "ok").
+        2. FOCUS on: 
+           - Recurring patterns (e.g., "User is anxious about finance").
+           - Explicit facts (e.g., "User's mother is named Maria").
+           - Strong emotions (e.g., "User feels guilt").
+        3. OUTPUT FORMAT: JSON with one entry per interaction number.
+           Example: {{ "results": [{{ "turn": 1, "insights": ["User feels financial anxiety due to debt."] }}, {{ "turn": 2, "insights": [] }}] }}
+        4. IF NOTHING NEW/IMPORTANT for an interaction: Return an empty list for it.
+        
+        Output ONLY valid JSON.
+        """
+
+        response = self.openai.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[{"role": "system", "content": prompt}],
+            response_format={"type": "json_object"},
+            temperature=0.3 # Low temperature for factual extraction
+        )
+
+        data = json.loads(response.choices[0].message.content)
+        results = [[] for _ in turns]
+        for entry in data.get("results", []):
+            index = int(entry.get("turn", 0)) - 1
+            if 0 <= index < len(turns):
+                results[index] = [
+                    insight for insight in entry.get("insights", [])
+                    if isinstance(insight, str) and len(insight) > 10 # Minimum length filter
+                ]
+        return results
+
     async def process_async(self, user_id: str, user_message: str, ai_response: str):
-        # Wrapper for BackgroundTasks (which expects a coroutine or just a func)
-        # Since standard openai client is sync, we just run it. 
-        # FastAPI BackgroundTasks runs sync functions in a threadpool automatically.
-        self.extract_and_store(user_id, user_message, ai_response)
+        # Wrapper for BackgroundTasks. Coroutines run ON the event loop, so the sync
+        # OpenAI/Supabase work is pushed to the bounded I/O pool instead of blocking it.
+        await run_blocking(self.extract_and_store, user_id, user_message, ai_response)
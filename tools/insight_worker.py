@@ -0,0 +1,114 @@
+"""
+Celest AI - Insight Worker
+Drains the insight job queue outside the API process: claims a batch of chat turns,
+extracts insights for all of them in one LLM call, stores every memory with one
+embeddings request + one bulk insert, then acknowledges the jobs. Failed jobs are
+released for retry (with backoff) instead of being lost; a failing batch is split in
+halves until the failure is isolated to the jobs that cause it.
+
+Usage:
+  INSIGHT_QUEUE=supabase python tools/insight_worker.py            # poll forever
+  INSIGHT_QUEUE=sqlite python tools/insight_worker.py --once       # drain once (cron)
+"""
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+from openai import OpenAI
+from supabase import create_client
+
+from embedding_cache import EmbeddingCache
+from insight_processor import InsightProcessor
+from job_queue import INSIGHT_QUEUE, get_job_queue
+from memory_store import MemoryStore
+
+INSIGHT_WORKER_BATCH = int(os.getenv("INSIGHT_WORKER_BATCH", "20"))
+INSIGHT_WORKER_POLL = float(os.getenv("INSIGHT_WORKER_POLL_SECONDS", "2"))
+
+
+def process_batch(queue, processor: InsightProcessor, limit: int = INSIGHT_WORKER_BATCH) -> int:
+    """
+    Claims and processes one batch. Returns the number of jobs claimed.
+    A failing step is retried on halves of the batch, so a poison turn fails (and is
+    eventually dead-lettered) alone instead of taking the healthy jobs with it.
+    """
+    jobs = queue.claim(limit)
+    if not jobs:
+        return 0
+
+    done, failed = [], []
+    extracted = _extract(processor, jobs, failed)
+    stored = _store(processor, extracted, done, failed) if extracted else 0
+
+    queue.complete([job["id"] for job in done])
+    for job, error in failed:
+        queue.fail([job], error)
+    if failed:
+        print(f"❌ InsightWorker: {len(failed)}/{len(jobs)} jobs failed: {failed[0][1]}")
+    print(f"🧠 InsightWorker: {len(done)} turns -> {stored} insights.")
+    return len(jobs)
+
+
+def _extract(processor: InsightProcessor, jobs: list, failed: list) -> list:
+    """[(job, insights)] for the jobs whose extraction succeeded (one LLM call per healthy batch)."""
+    try:
+        return list(zip(jobs, processor.extract_batch([job["payload"] for job in jobs])))
+    except Exception as e:
+        if len(jobs) == 1:
+            failed.append((jobs[0], str(e)))
+            return []
+        middle = len(jobs) // 2
+        return _extract(processor, jobs[:middle], failed) + _extract(processor, jobs[middle:], failed)
+
+
+def _store(processor: InsightProcessor, extracted: list, done: list, failed: list) -> int:
+    """Stores the insights of `extracted` in one batch (halved on failure). Returns insights stored."""
+    try:
+        items = [
+            (job["payload"]["user_id"], insight, {"type": "insight"})
+            for job, insights in extracted
+            for insight in insights
+        ]
+        processor.memory.store_batch(items, raise_errors=True)
+    except Exception as e:
+        if len(extracted) == 1:
+            failed.append((extracted[0][0], str(e)))
+            return 0
+        middle = len(extracted) // 2
+        return (_store(processor, extracted[:middle], done, failed)
+                + _store(processor, extracted[middle:], done, failed))
+    done.extend(job for job, _ in extracted)
+    return len(items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process queued insight extraction jobs.")
+    parser.add_argument("--once", action="store_true", help="Drain the queue and exit")
+    parser.add_argument("--batch", type=int, default=INSIGHT_WORKER_BATCH, help="Turns per LLM call")
+    args = parser.parse_args()
+
+    load_dotenv('.env.local')
+    supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY") or os.getenv("VITE_SUPABASE_SERVICE_ROLE_KEY")
+    supabase = create_client(os.getenv("VITE_SUPABASE_URL"), supabase_key)
+    openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+
+    queue = get_job_queue(supabase)
+    if queue is None:
+        raise SystemExit(f"INSIGHT_QUEUE={INSIGHT_QUEUE}: set it to 'sqlite' or 'supabase' to run the worker.")
+
+    memory_store = MemoryStore(supabase, openai_client, embedding_cache=EmbeddingCache())
+    processor = InsightProcessor(openai_client, memory_store)
+    print(f"🚀 InsightWorker started ({INSIGHT_QUEUE}, batch={args.batch})")
+
+    while True:
+        claimed = process_batch(queue, processor, args.batch)
+        if claimed == 0:
+            memory_store.compact_due()  # Queue drained: run due compactions before idling
+            if args.once:
+                break
+            time.sleep(INSIGHT_WORKER_POLL)
+
+
+if __name__ == "__main__":
+    main()
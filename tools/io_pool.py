@@ -0,0 +1,50 @@
+"""
+Celest AI - Non-blocking I/O helpers
+Keeps the event loop free: synchronous SDK calls (Supabase, Stripe, geopy, kerykeion)
+run on a bounded thread pool, and plain HTTP goes through one pooled httpx.AsyncClient.
+"""
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+IO_POOL_SIZE = int(os.getenv("IO_POOL_SIZE", "16"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+
+_executor = ThreadPoolExecutor(max_workers=IO_POOL_SIZE, thread_name_prefix="celest-io")
+_http_client = None
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Runs a blocking callable on the bounded I/O pool and awaits its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Shared AsyncClient (keep-alive connection pool reused across requests)."""
+    global _http_client
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            timeout=httpx.Timeout(10.0, connect=5.0),
+            limits=httpx.Limits(
+                max_connections=HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=HTTP_MAX_CONNECTIONS // 2
+            )
+        )
+    return _http_client
+
+
+async def shutdown():
+    """Closes pooled connections. Call from the app's shutdown hook."""
+    global _http_client
+    if _http_client is not None and not _http_client.is_closed:
+        await _http_client.aclose()
+    _http_client = None
+    _executor.shutdown(wait=False)
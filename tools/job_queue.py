@@ -0,0 +1,152 @@
+"""
+Celest AI - Durable Job Queue
+Decouples post-chat work (insight extraction) from the request: the API enqueues a job,
+a separate worker (tools/insight_worker.py) claims jobs in batches with a lease, and
+failed jobs are retried with backoff until MAX_ATTEMPTS, then parked as 'dead'.
+
+Backends (INSIGHT_QUEUE):
+  inline   -> no queue, BackgroundTasks as before (default)
+  sqlite   -> local stand-in, shared SQLite file (single host / development)
+  supabase -> insight_jobs table + claim_insight_jobs RPC (FOR UPDATE SKIP LOCKED)
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from local_cache import default_cache_path
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+INSIGHT_QUEUE = os.getenv("INSIGHT_QUEUE", "inline")
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "5"))
+RETRY_BASE_SECONDS = 30  # Backoff: 30s, 60s, 120s, ...
+
+
+def retry_delay(attempts: int) -> float:
+    return RETRY_BASE_SECONDS * (2 ** max(0, attempts - 1))
+
+
+# ============================================================
+# SQLITE (LOCAL STAND-IN)
+# ============================================================
+
+class SQLiteJobQueue:
+    def __init__(self, path: str = None, queue: str = "insights"):
+        self.queue = queue
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path or default_cache_path("celest_jobs.sqlite"), check_same_thread=False, timeout=10)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, queue TEXT NOT NULL, payload TEXT NOT NULL,"
+            " status TEXT NOT NULL DEFAULT 'pending', attempts INTEGER NOT NULL DEFAULT 0,"
+            " available_at REAL NOT NULL, locked_until REAL, last_error TEXT, created_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS jobs_claim_idx ON jobs (queue, status, available_at)")
+        self._db.commit()
+
+    def enqueue(self, payload: dict):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT INTO jobs (queue, payload, available_at, created_at) VALUES (?, ?, ?, ?)",
+                (self.queue, json.dumps(payload), now, now)
+            )
+            self._db.commit()
+
+    def claim(self, limit: int = 20, lease_seconds: int = JOB_LEASE_SECONDS) -> list:
+        """Leases up to `limit` due jobs (pending, or running with an expired lease)."""
+        now = time.time()
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")  # Write lock: other processes can't claim the same rows
+            try:
+                rows = self._db.execute(
+                    "SELECT id, payload, attempts FROM jobs WHERE queue = ?"
+                    " AND ((status = 'pending' AND available_at <= ?) OR (status = 'running' AND locked_until < ?))"
+                    " ORDER BY id LIMIT ?",
+                    (self.queue, now, now, limit)
+                ).fetchall()
+                self._db.executemany(
+                    "UPDATE jobs SET status = 'running', attempts = attempts + 1, locked_until = ? WHERE id = ?",
+                    [(now + lease_seconds, row[0]) for row in rows]
+                )
+                self._db.commit()
+            except sqlite3.Error:
+                self._db.rollback()
+                raise
+        return [{"id": row[0], "payload": json.loads(row[1]), "attempts": row[2] + 1} for row in rows]
+
+    def complete(self, job_ids: list):
+        if not job_ids:
+            return
+        with self._lock:
+            self._db.executemany("DELETE FROM jobs WHERE id = ?", [(job_id,) for job_id in job_ids])
+            self._db.commit()
+
+    def fail(self, jobs: list, error: str):
+        """Reschedules with backoff, or parks as 'dead' after MAX_ATTEMPTS."""
+        now = time.time()
+        with self._lock:
+            for job in jobs:
+                dead = job["attempts"] >= MAX_ATTEMPTS
+                self._db.execute(
+                    "UPDATE jobs SET status = ?, available_at = ?, locked_until = NULL, last_error = ? WHERE id = ?",
+                    ("dead" if dead else "pending", now + retry_delay(job["attempts"]), error[:500], job["id"])
+                )
+            self._db.commit()
+
+    def pending_count(self) -> int:
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM jobs WHERE queue = ? AND status IN ('pending', 'running')", (self.queue,)
+            ).fetchone()[0]
+
+
+# ============================================================
+# SUPABASE (insight_jobs table)
+# ============================================================
+
+class SupabaseJobQueue:
+    def __init__(self, supabase_client, table: str = "insight_jobs"):
+        self.supabase = supabase_client
+        self.table = table
+
+    def enqueue(self, payload: dict):
+        self.supabase.table(self.table).insert({"payload": payload}).execute()
+
+    def claim(self, limit: int = 20, lease_seconds: int = JOB_LEASE_SECONDS) -> list:
+        response = self.supabase.rpc(
+            "claim_insight_jobs", {"p_limit": limit, "p_lease_seconds": lease_seconds}
+        ).execute()
+        return [{"id": row["id"], "payload": row["payload"], "attempts": row["attempts"]} for row in response.data or []]
+
+    def complete(self, job_ids: list):
+        if job_ids:
+            self.supabase.table(self.table).delete().in_("id", job_ids).execute()
+
+    def fail(self, jobs: list, error: str):
+        for job in jobs:
+            dead = job["attempts"] >= MAX_ATTEMPTS
+            available_at = datetime.now(timezone.utc) + timedelta(seconds=retry_delay(job["attempts"]))
+            self.supabase.table(self.table).update({
+                "status": "dead" if dead else "pending",
+                "available_at": available_at.isoformat(),
+                "locked_until": None,
+                "last_error": error[:500]
+            }).eq("id", job["id"]).execute()
+
+
+def get_job_queue(supabase_client=None, backend: str = None):
+    """Queue for INSIGHT_QUEUE, or None for inline processing."""
+    backend = backend or INSIGHT_QUEUE
+    if backend == "sqlite":
+        return SQLiteJobQueue()
+    if backend == "supabase" and supabase_client is not None:
+        return SupabaseJobQueue(supabase_client)
+    return None
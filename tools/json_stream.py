@@ -0,0 +1,157 @@
+"""
+Celest AI - Incremental JSON Field Parser
+Parses a streamed top-level JSON object (LLM json_object output) chunk by chunk, emitting
+decoded text of string fields as it arrives, so e.g. "message" can be forwarded to the user
+before the model has finished the whole object.
+
+Events returned by feed():
+  ("delta", key, text)  -> newly decoded characters of a string field
+  ("value", key, value) -> a field is complete (strings decoded, others via json.loads)
+"""
+import json
+
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+
+# Parser states
+_START, _KEY_OR_END, _KEY, _COLON, _VALUE, _STRING, _RAW, _COMMA_OR_END, _DONE = range(9)
+
+
+class JsonFieldStream:
+    def __init__(self):
+        self.fields = {}
+        self._state = _START
+        self._key = ""
+        self._text = []        # decoded characters of the current string (key or value)
+        self._escape = None    # pending escape sequence ("" after a backslash, or "uXXXX" so far)
+        self._high_surrogate = None
+        self._raw = []         # non-string value being accumulated
+        self._depth = 0
+        self._raw_in_string = False
+        self._raw_escape = False
+
+    @property
+    def done(self) -> bool:
+        return self._state == _DONE
+
+    def feed(self, chunk: str) -> list:
+        events = []
+        pending = []  # decoded value characters in this chunk (flushed as one delta)
+
+        for ch in chunk:
+            state = self._state
+
+            if state == _START:
+                if ch == "{":
+                    self._state = _KEY_OR_END
+            elif state == _KEY_OR_END:
+                if ch == '"':
+                    self._text = []
+                    self._state = _KEY
+                elif ch == "}":
+                    self._state = _DONE
+            elif state == _KEY or state == _STRING:
+                decoded = self._string_char(ch)
+                if decoded is None:
+                    # Closing quote
+                    text = "".join(self._text)
+                    if state == _KEY:
+                        self._key = text
+                        self._state = _COLON
+                    else:
+                        if pending:
+                            events.append(("delta", self._key, "".join(pending)))
+                            pending = []
+                        self.fields[self._key] = text
+                        events.append(("value", self._key, text))
+                        self._state = _COMMA_OR_END
+                elif decoded:
+                    self._text.append(decoded)
+                    if state == _STRING:
+                        pending.append(decoded)
+            elif state == _COLON:
+                if ch == ":":
+                    self._state = _VALUE
+            elif state == _VALUE:
+                if ch == '"':
+                    self._text = []
+                    self._state = _STRING
+                elif not ch.isspace():
+                    self._raw = [ch]
+                    self._depth = 1 if ch in "[{" else 0
+                    self._raw_in_string = False
+                    self._raw_escape = False
+                    self._state = _RAW
+            elif state == _RAW:
+                if self._raw_char(ch):
+                    self._finish_raw(events)
+                    self._state = _DONE if ch == "}" else _KEY_OR_END
+            elif state == _COMMA_OR_END:
+                if ch == ",":
+                    self._state = _KEY_OR_END
+                elif ch == "}":
+                    self._state = _DONE
+
+        if pending:
+            events.append(("delta", self._key, "".join(pending)))
+        return events
+
+    def _string_char(self, ch):
+        """Returns decoded text ("" while inside an escape), or None on the closing quote."""
+        if self._escape is not None:
+            if self._escape == "" and ch != "u":
+                self._escape = None
+                return self._combine(_ESCAPES.get(ch, ch))
+            self._escape += ch
+            if len(self._escape) < 5:  # "u" + 4 hex digits
+                return ""
+            code = int(self._escape[1:], 16)
+            self._escape = None
+            if 0xD800 <= code <= 0xDBFF:
+                self._high_surrogate = code
+                return ""
+            if 0xDC00 <= code <= 0xDFFF and self._high_surrogate is not None:
+                high, self._high_surrogate = self._high_surrogate, None
+                return chr(0x10000 + ((high - 0xD800) << 10) + (code - 0xDC00))
+            return self._combine(chr(code))
+        if ch == "\\":
+            self._escape = ""
+            return ""
+        if ch == '"':
+            return None
+        return self._combine(ch)
+
+    def _combine(self, text: str) -> str:
+        # A lone high surrogate followed by anything else is dropped
+        self._high_surrogate = None
+        return text
+
+    def _raw_char(self, ch) -> bool:
+        """Accumulates a non-string value. True when `ch` terminates it (',' or '}' at depth 0)."""
+        if self._raw_in_string:
+            self._raw.append(ch)
+            if self._raw_escape:
+                self._raw_escape = False
+            elif ch == "\\":
+                self._raw_escape = True
+            elif ch == '"':
+                self._raw_in_string = False
+            return False
+        if self._depth == 0 and ch in ",}":
+            return True
+        self._raw.append(ch)
+        if ch == '"':
+            self._raw_in_string = True
+        elif ch in "[{":
+            self._depth += 1
+        elif ch in "]}":
+            self._depth -= 1
+        return False
+
+    def _finish_raw(self, events):
+        raw = "".join(self._raw).strip()
+        try:
+            value = json.loads(raw)
+        except json.JSONDecodeError:
+            value = raw
+        self.fields[self._key] = value
+        events.append(("value", self._key, value))
@@ -0,0 +1,168 @@
+"""
+Celest AI - Local Cache (LRU + SQLite)
+Two-tier key/value cache: a bounded in-memory LRU in front of an embedded SQLite file,
+so results survive cold starts and restarts without an external service.
+Values are stored as JSON; entries expire after their TTL (None = never).
+"""
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+# Sentinel for "not cached" (lets callers cache None, e.g. negative lookups)
+MISSING = object()
+
+DEFAULT_DB_NAME = "celest_cache.sqlite"
+
+
+def default_cache_path(filename: str = DEFAULT_DB_NAME) -> str:
+    """
+    Resolves where cache files live: CELEST_CACHE_DIR, else the repo's cache/ dir,
+    else /tmp (Vercel's filesystem is read-only outside /tmp).
+    """
+    base = os.getenv("CELEST_CACHE_DIR")
+    if not base:
+        base = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cache")
+        if not os.access(base, os.W_OK):
+            base = os.path.join(tempfile.gettempdir(), "celest_cache")
+    os.makedirs(base, exist_ok=True)
+    return os.path.join(base, filename)
+
+
+class LocalCache:
+    def __init__(self, namespace: str, path: str = None, max_items: int = 1024, ttl: float = None):
+        """
+        namespace: logical table partition (several caches can share one file)
+        path: SQLite file, or None for a memory-only cache
+        max_items: LRU front-tier capacity
+        ttl: default time-to-live in seconds (None = never expires)
+        """
+        self.namespace = namespace
+        self.max_items = max_items
+        self.ttl = ttl
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+
+        if path:
+            try:
+                self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS cache_entries ("
+                    " namespace TEXT NOT NULL, key TEXT NOT NULL, value TEXT, expires REAL,"
+                    " PRIMARY KEY (namespace, key))"
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                # Degrade to memory-only rather than failing requests
+                print(f"⚠️ Local cache '{namespace}' disk tier disabled: {e}")
+                self._db = None
+
+    def _remember(self, key, value, expires):
+        self._lru[key] = (value, expires)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_items:
+            self._lru.popitem(last=False)
+
+    def get(self, key: str, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or expires > now:
+                    self._lru.move_to_end(key)
+                    return value
+                del self._lru[key]
+
+            if not self._db:
+                return default
+
+            try:
+                row = self._db.execute(
+                    "SELECT value, expires FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key)
+                ).fetchone()
+            except sqlite3.Error as e:
+                print(f"⚠️ Local cache read error: {e}")
+                return default
+
+            if not row:
+                return default
+            raw, expires = row
+            if expires is not None and expires <= now:
+                self._delete_row(key)
+                return default
+
+            value = json.loads(raw)
+            self._remember(key, value, expires)
+            return value
+
+    def set(self, key: str, value, ttl: float = MISSING):
+        ttl = self.ttl if ttl is MISSING else ttl
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._remember(key, value, expires)
+            if not self._db:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                    (self.namespace, key, json.dumps(value), expires)
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Local cache write error: {e}")
+
+    def set_many(self, items: dict, ttl: float = MISSING):
+        """Like set() for many keys, written to disk in one transaction."""
+        ttl = self.ttl if ttl is MISSING else ttl
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value, expires)
+            if not self._db or not items:
+                return
+            try:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires) VALUES (?, ?, ?, ?)",
+                    [(self.namespace, key, json.dumps(value), expires) for key, value in items.items()]
+                )
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"⚠️ Local cache write error: {e}")
+
+    def delete(self, key: str):
+        with self._lock:
+            self._lru.pop(key, None)
+            if self._db:
+                self._delete_row(key)
+
+    def _delete_row(self, key: str):
+        try:
+            self._db.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND key = ?", (self.namespace, key)
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"⚠️ Local cache delete error: {e}")
+
+    def purge_expired(self) -> int:
+        """Drops expired rows from disk. Returns how many were removed."""
+        if not self._db:
+            return 0
+        with self._lock:
+            try:
+                cur = self._db.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND expires IS NOT NULL AND expires <= ?",
+                    (self.namespace, time.time())
+                )
+                self._db.commit()
+                return cur.rowcount
+            except sqlite3.Error as e:
+                print(f"⚠️ Local cache purge error: {e}")
+                return 0
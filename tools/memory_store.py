@@ -1,35 +1,365 @@
 import os
+import atexit
+import threading
+from collections import defaultdict
+from datetime import datetime
+import numpy as np
 from openai import OpenAI
 from supabase import Client
+from embedding_cache import EmbeddingCache, embedding_key
+from vector_index import LocalVectorIndex, parse_vector
+
+EMBEDDING_MODEL = "text-embedding-3-small"
+EMBEDDING_BATCH_LIMIT = 2048  # Max inputs per embeddings request (OpenAI limit)
+
+# Consolidation: a new memory this similar to an existing one bumps it instead of inserting
+MEMORY_DEDUP_THRESHOLD = float(os.getenv("MEMORY_DEDUP_THRESHOLD", "0.9"))
+# Full per-user compaction is due after this many inserts for that user (0 = never).
+# It runs off the insert path: compact_due() from the batcher thread / insight worker.
+MEMORY_COMPACT_EVERY = int(os.getenv("MEMORY_COMPACT_EVERY", "25"))
+FETCH_PAGE_SIZE = 1000
+
+
+def unit_vectors(vectors) -> np.ndarray:
+    """Row-normalized float32 matrix (dot product = cosine similarity)."""
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
 
 class MemoryStore:
-    def __init__(self, supabase_client: Client, openai_client: OpenAI):
+    def __init__(self, supabase_client: Client, openai_client: OpenAI, embedding_cache: EmbeddingCache = None,
+                 vector_index: LocalVectorIndex = None):
         self.supabase = supabase_client
         self.openai = openai_client
+        self.embedding_cache = embedding_cache  # Optional: skips OpenAI for texts seen before
+        self.vector_index = vector_index  # Optional: local top-k instead of the match_memories RPC
+        self.dedup_threshold = MEMORY_DEDUP_THRESHOLD
+        self.compact_every = MEMORY_COMPACT_EVERY
+        self._inserts_since_compact = defaultdict(int)
+        self._compact_due = set()
+        self._compact_lock = threading.Lock()
 
     def get_embedding(self, text: str):
-        text = text.replace("\n", " ")
-        return self.openai.embeddings.create(input=[text], model="text-embedding-3-small").data[0].embedding
+        return self.get_embeddings([text])[0]
+
+    def get_embeddings(self, texts: list) -> list:
+        """
+        Embeds many texts with one request per EMBEDDING_BATCH_LIMIT inputs (order preserved).
+        Cached texts are served locally; only distinct misses are sent to OpenAI.
+        """
+        texts = [text.replace("\n", " ") for text in texts]
+        vectors = [None] * len(texts)
+
+        misses = {}  # cache key -> indexes of texts needing that embedding
+        for i, text in enumerate(texts):
+            if self.embedding_cache:
+                vectors[i] = self.embedding_cache.get(EMBEDDING_MODEL, text)
+            if vectors[i] is None:
+                misses.setdefault(embedding_key(EMBEDDING_MODEL, text), []).append(i)
+
+        pending = list(misses.values())
+        for start in range(0, len(pending), EMBEDDING_BATCH_LIMIT):
+            chunk = pending[start:start + EMBEDDING_BATCH_LIMIT]
+            response = self.openai.embeddings.create(input=[texts[idx[0]] for idx in chunk], model=EMBEDDING_MODEL)
+            for idx, item in zip(chunk, response.data):
+                for i in idx:
+                    vectors[i] = item.embedding
+                if self.embedding_cache:
+                    self.embedding_cache.put(EMBEDDING_MODEL, texts[idx[0]], item.embedding)
+        return vectors
 
     def store_memory(self, user_id: str, content: str, metadata: dict = {}):
+        return self.store_memories(user_id, [content], metadata) == 1
+
+    def store_memories(self, user_id: str, contents: list, metadata: dict = {}) -> int:
+        """Stores many memories for one user: one embeddings call + one bulk insert. Returns rows stored."""
+        return self.store_batch([(user_id, content, metadata) for content in contents])
+
+    def store_batch(self, items: list, raise_errors: bool = False) -> int:
+        """
+        Stores (user_id, content, metadata) tuples, possibly across users, in a fixed number of
+        round trips (embeddings + duplicate check + bulk PostgREST insert + bumps), not per memory.
+        Near-duplicates of existing memories (or of each other) are consolidated, not inserted.
+        Bumps are applied only after the insert succeeded, so a retried batch never counts twice.
+        """
+        if not items:
+            return 0
         try:
-            vector = self.get_embedding(content)
-            data = {
-                "user_id": user_id,
-                "content": content,
-                "embedding": vector,
-                "metadata": metadata
+            vectors = self.get_embeddings([content for _, content, _ in items])
+            bumps, seen_at = {}, None
+            if self.dedup_threshold:
+                items, vectors, bumps, seen_at = self._consolidate(items, vectors)
+                if not items:
+                    self._apply_bumps(bumps, seen_at)
+                    return 0
+
+            rows = [
+                {
+                    "user_id": user_id,
+                    "content": content,
+                    "embedding": vector,
+                    "metadata": metadata
+                }
+                for (user_id, content, metadata), vector in zip(items, vectors)
+            ]
+            response = self.supabase.table("memories").insert(rows).execute()
+            print(f"🧠 Stored {len(rows)} memories for {len({row['user_id'] for row in rows})} user(s).")
+            if self.vector_index:
+                self._sync_index(rows, response.data or [])
+            self._count_inserts([row["user_id"] for row in rows])
+            self._apply_bumps(bumps, seen_at)
+            return len(rows)
+        except Exception as e:
+            print(f"❌ Failed to store memories: {e}")
+            if raise_errors:
+                raise  # Queue workers retry the job instead of dropping the memories
+            return 0
+
+    # ============================================================
+    # CONSOLIDATION
+    # ============================================================
+
+    def _consolidate(self, items: list, vectors: list):
+        """
+        Drops items that repeat an earlier item of the same batch (counted on that item) or an
+        existing memory (counted as a pending bump). Returns (items, vectors) still to insert,
+        with frequency/first_seen/last_seen metadata, plus the bumps {id: [user_id, memory_id, count]}
+        and their timestamp, for store_batch to apply once the insert succeeded.
+        """
+        now = datetime.now().isoformat()
+        unit = unit_vectors(vectors)
+        firsts, repeats = [], {}  # first occurrences; first index -> repeats within the batch
+        for i, (user_id, _, _) in enumerate(items):
+            batch_dup = next(
+                (k for k in firsts if items[k][0] == user_id and float(unit[i] @ unit[k]) >= self.dedup_threshold),
+                None
+            )
+            if batch_dup is None:
+                firsts.append(i)
+            else:
+                repeats[batch_dup] = repeats.get(batch_dup, 0) + 1
+
+        try:
+            existing = self.find_similar_batch([(items[i][0], vectors[i]) for i in firsts], self.dedup_threshold)
+        except Exception as e:
+            # Storing a possible duplicate beats losing the memory
+            print(f"⚠️ Memory dedup check failed: {e}")
+            existing = [None] * len(firsts)
+
+        kept, bumps = [], {}
+        for i, memory in zip(firsts, existing):
+            user_id, content, metadata = items[i]
+            count = 1 + repeats.get(i, 0)
+            if memory:
+                bump = bumps.setdefault(str(memory["id"]), [user_id, memory["id"], 0])
+                bump[2] += count
+                continue
+            items[i] = (user_id, content, dict(metadata, frequency=count, first_seen=now, last_seen=now))
+            kept.append(i)
+
+        if len(kept) < len(items):
+            print(f"🧠 Consolidated {len(items) - len(kept)} repeated memories.")
+        return [items[k] for k in kept], [vectors[k] for k in kept], bumps, now
+
+    def find_similar_batch(self, queries: list, threshold: float) -> list:
+        """
+        Most similar existing memory above threshold (or None) for each (user_id, vector) query.
+        Users served by the local index are matched in-process; the rest in ONE
+        match_memories_batch RPC (per-query match_memories if the migration isn't applied).
+        """
+        results = [None] * len(queries)
+        remote = []
+        for i, (user_id, vector) in enumerate(queries):
+            local = None
+            if self.vector_index:
+                try:
+                    local = self.vector_index.search(user_id, vector, k=1, threshold=threshold)
+                except Exception as e:
+                    print(f"⚠️ Local memory index failed, using RPC: {e}")
+            if local is None:
+                remote.append(i)
+            elif local:
+                results[i] = local[0]
+        if not remote:
+            return results
+
+        try:
+            response = self.supabase.rpc(
+                "match_memories_batch",
+                {
+                    "p_queries": [{"user_id": queries[i][0], "embedding": queries[i][1]} for i in remote],
+                    "match_threshold": threshold
+                }
+            ).execute()
+        except Exception as e:
+            print(f"⚠️ match_memories_batch RPC unavailable, matching one by one: {e}")
+            for i in remote:
+                results[i] = self.find_similar(queries[i][0], queries[i][1], threshold)
+            return results
+        for row in response.data or []:
+            results[remote[row["query_index"]]] = row
+        return results
+
+    def find_similar(self, user_id: str, vector, threshold: float):
+        """Most similar existing memory above threshold (local index if enabled, else RPC), or None."""
+        if self.vector_index:
+            try:
+                local = self.vector_index.search(user_id, vector, k=1, threshold=threshold)
+                if local is not None:
+                    return local[0] if local else None
+            except Exception as e:
+                print(f"⚠️ Local memory index failed, using RPC: {e}")
+        response = self.supabase.rpc(
+            "match_memories",
+            {
+                "query_embedding": vector,
+                "match_threshold": threshold,
+                "match_count": 1,
+                "p_user_id": user_id
             }
-            self.supabase.table("memories").insert(data).execute()
-            print(f"🧠 Memory stored for {user_id}: {content[:30]}...")
-            return True
+        ).execute()
+        return response.data[0] if response.data else None
+
+    def _apply_bumps(self, bumps: dict, seen_at: str):
+        """
+        frequency + count and last_seen for every repeated memory, atomically in SQL in ONE
+        bump_memories RPC; syncs the local index.
+        """
+        if not bumps:
+            return
+        try:
+            rows = self.supabase.rpc(
+                "bump_memories",
+                {"p_bumps": [{"id": key, "count": count} for key, (_, _, count) in bumps.items()], "p_seen_at": seen_at}
+            ).execute().data or []
+            updated = {str(row["id"]): row["metadata"] for row in rows}
         except Exception as e:
-            print(f"❌ Failed to store memory: {e}")
-            return False
+            # Migration not applied: read-modify-write from each row itself (never from a cached copy)
+            print(f"⚠️ bump_memories RPC unavailable, updating directly: {e}")
+            updated = {}
+            for key, (_, memory_id, count) in bumps.items():
+                try:
+                    rows = self.supabase.table("memories").select("metadata").eq("id", memory_id).execute().data
+                    metadata = (rows[0].get("metadata") if rows else None) or {}
+                    metadata = dict(metadata, frequency=int(metadata.get("frequency", 1)) + count, last_seen=seen_at)
+                    self.supabase.table("memories").update({"metadata": metadata}).eq("id", memory_id).execute()
+                    updated[key] = metadata
+                except Exception as e:
+                    # After the insert: a lost count beats a retried (duplicated) batch
+                    print(f"⚠️ Memory bump failed for {memory_id}: {e}")
+        if self.vector_index:
+            for key, (user_id, memory_id, _) in bumps.items():
+                if isinstance(updated.get(key), dict):
+                    self.vector_index.update_metadata(user_id, memory_id, updated[key])
+
+    def fetch_user_memories(self, user_id: str) -> list:
+        """All of a user's memories with embeddings (paginated)."""
+        rows, offset = [], 0
+        while True:
+            page = (
+                self.supabase.table("memories")
+                .select("id, content, metadata, embedding")
+                .eq("user_id", user_id)
+                .order("id", desc=False)
+                .range(offset, offset + FETCH_PAGE_SIZE - 1)
+                .execute()
+            ).data or []
+            rows.extend(row for row in page if row.get("embedding") is not None)
+            if len(page) < FETCH_PAGE_SIZE:
+                return rows
+            offset += FETCH_PAGE_SIZE
+
+    def compact_memories(self, user_id: str, threshold: float = None) -> int:
+        """
+        Greedy clustering of a user's memories: the most frequent (then most recent) memory of
+        each cluster of near-duplicates absorbs the others' counts, the rest are deleted.
+        Returns the number of rows removed.
+        """
+        threshold = threshold or self.dedup_threshold
+        rows = self.fetch_user_memories(user_id)
+        if len(rows) < 2:
+            return 0
+
+        unit = unit_vectors(np.stack([parse_vector(row["embedding"]) for row in rows]))
+        meta = [row.get("metadata") or {} for row in rows]
+        order = sorted(
+            range(len(rows)),
+            key=lambda i: (int(meta[i].get("frequency", 1)), meta[i].get("last_seen", "")),
+            reverse=True
+        )
+
+        assigned = np.zeros(len(rows), dtype=bool)
+        removed = []
+        for rep in order:
+            if assigned[rep]:
+                continue
+            members = np.flatnonzero(~assigned & (unit @ unit[rep] >= threshold))
+            assigned[members] = True
+            others = [m for m in members.tolist() if m != rep]
+            if not others:
+                continue
+
+            cluster = [meta[m] for m in [rep] + others]
+            merged = dict(
+                meta[rep],
+                frequency=sum(int(m.get("frequency", 1)) for m in cluster),
+                first_seen=min((m["first_seen"] for m in cluster if m.get("first_seen")), default=meta[rep].get("first_seen")),
+                last_seen=max((m["last_seen"] for m in cluster if m.get("last_seen")), default=meta[rep].get("last_seen"))
+            )
+            self.supabase.table("memories").update({"metadata": merged}).eq("id", rows[rep]["id"]).execute()
+            removed.extend(rows[m]["id"] for m in others)
+
+        if removed:
+            self.supabase.table("memories").delete().in_("id", removed).execute()
+            if self.vector_index:
+                self.vector_index.invalidate(user_id)
+            print(f"🧹 Compacted {user_id}: {len(rows)} -> {len(rows) - len(removed)} memories.")
+        return len(removed)
+
+    def _count_inserts(self, user_ids: list):
+        """Marks a user due for compaction after every `compact_every` inserts (cheap, no I/O)."""
+        if not self.compact_every:
+            return
+        with self._compact_lock:
+            for user_id in user_ids:
+                self._inserts_since_compact[user_id] += 1
+                if self._inserts_since_compact[user_id] >= self.compact_every:
+                    self._inserts_since_compact[user_id] = 0
+                    self._compact_due.add(user_id)
+
+    def compact_due(self) -> int:
+        """Runs the compactions marked due by inserts. Call from background work, not requests."""
+        with self._compact_lock:
+            due, self._compact_due = self._compact_due, set()
+        removed = 0
+        for user_id in due:
+            try:
+                removed += self.compact_memories(user_id)
+            except Exception as e:
+                print(f"⚠️ Memory compaction failed for {user_id}: {e}")
+        return removed
+
+    def _sync_index(self, rows: list, inserted: list):
+        """Appends freshly inserted rows to hydrated users in the local index."""
+        for i, row in enumerate(rows):
+            row_id = inserted[i].get("id") if i < len(inserted) else None
+            self.vector_index.add(
+                row["user_id"],
+                [{"id": row_id, "content": row["content"], "metadata": row["metadata"]}],
+                [row["embedding"]]
+            )
 
     def recall_memories(self, user_id: str, query: str, limit: int = 3):
         try:
             query_vector = self.get_embedding(query)
+            if self.vector_index:
+                try:
+                    local = self.vector_index.search(user_id, query_vector, k=limit, threshold=0.5)
+                    if local is not None:
+                        return local
+                except Exception as e:
+                    print(f"⚠️ Local memory index failed, using RPC: {e}")
             response = self.supabase.rpc(
                 "match_memories",
                 {
@@ -39,8 +369,79 @@ class MemoryStore:
                     "p_user_id": user_id
                 }
             ).execute()
-            
+
             return response.data
         except Exception as e:
             print(f"❌ Failed to recall memories: {e}")
             return []
+
+
+class MemoryBatcher:
+    """
+    Background micro-batcher: coalesces memory stores from many users that arrive within a
+    short window (or until max_batch items) into a single MemoryStore.store_batch call.
+
+    Default (MEMORY_BATCH_WINDOW_MS=0, serverless-safe): submit stores synchronously, inside the
+    request's BackgroundTask, so memories are written before the invocation ends (a frozen or
+    recycled function never holds them). A window > 0 (long-lived servers only) batches from a
+    daemon thread; pending memories are flushed on shutdown and at exit.
+    """
+    def __init__(self, memory_store: MemoryStore, window_ms: float = None, max_batch: int = None):
+        self.memory = memory_store
+        self.window = (float(os.getenv("MEMORY_BATCH_WINDOW_MS", "0")) if window_ms is None else window_ms) / 1000.0
+        self.max_batch = max_batch or int(os.getenv("MEMORY_BATCH_SIZE", "64"))
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+        self._closed = False
+        atexit.register(self.close)
+
+    def submit(self, user_id: str, contents: list, metadata: dict = {}):
+        items = [(user_id, content, metadata) for content in contents]
+        if not items:
+            return
+        if self.window <= 0 or self._closed:
+            self.memory.store_batch(items)
+            self.memory.compact_due()  # No batcher thread: maintenance runs here, after the store
+            return
+        with self._cond:
+            self._pending.extend(items)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="celest-memory-batcher", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending and self._closed:
+                    return
+                # Window opens at the first pending item; flush early when the batch is full
+                self._cond.wait_for(lambda: self._closed or len(self._pending) >= self.max_batch, timeout=self.window)
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+                idle = not self._pending
+            self.memory.store_batch(batch)
+            if idle:
+                self.memory.compact_due()  # Maintenance between batches, off the request path
+
+    def flush(self):
+        """Stores everything pending right now on the calling thread."""
+        with self._cond:
+            batch, self._pending = self._pending, []
+        for i in range(0, len(batch), self.max_batch):
+            self.memory.store_batch(batch[i:i + self.max_batch])
+
+    def close(self):
+        """Stops the worker and flushes pending memories (shutdown / atexit)."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+        self.flush()
+        self.memory.compact_due()
@@ -0,0 +1,137 @@
+"""
+Celest AI - Message Gate
+Cheap local classifier run before memory recall and insight extraction.
+Acknowledgements and other low-information turns ("ok", "obrigado", "entendi", "👍")
+don't benefit from either, so the gate lets the chat skip the embedding + RPC for recall
+and the extraction LLM call.
+
+A decision is a dict: {"recall": bool, "extract": bool, "reason": str}.
+Classifiers are callables (text, tokens) -> decision or None; the first non-None wins,
+so smarter models can be plugged in front of (or instead of) the heuristics.
+"""
+import re
+import unicodedata
+
+# Acknowledgements / small talk (pt, en, es), accent-folded and lowercase.
+# Only words that are an acknowledgement on their own: content words ("pode", "isso", "mais")
+# appear solely inside ACK_PHRASES, so "pode ser isso" or "mais dias" still reach recall.
+ACK_LEXICON = {
+    # pt
+    "ok", "okay", "obrigado", "obrigada", "obg", "brigado", "brigada", "valeu", "vlw", "entendi",
+    "entendido", "certo", "beleza", "blz", "sim", "nao", "claro", "perfeito", "otimo", "legal",
+    "show", "top", "massa", "bacana", "combinado", "tranquilo", "oi", "ola", "tchau", "amei",
+    "uau", "ah", "hum", "hmm", "kk", "kkk", "kkkk", "rs", "rsrs", "haha", "hahaha", "exato",
+    # en
+    "thanks", "thx", "ty", "yes", "yeah", "yep", "nope", "sure", "cool", "great", "nice",
+    "perfect", "alright", "hi", "hello", "hey", "bye", "lol", "wow",
+    # es
+    "gracias", "vale", "si", "genial", "perfecto", "hola", "adios", "chao", "jaja", "jajaja",
+}
+
+# Multi-word acknowledgements (token sequences)
+ACK_PHRASES = {
+    # pt
+    ("bom", "dia"), ("boa", "tarde"), ("boa", "noite"), ("ate", "mais"), ("ate", "logo"),
+    ("muito", "obrigado"), ("muito", "obrigada"), ("mt", "obrigado"), ("mt", "obrigada"),
+    ("faz", "sentido"), ("pode", "ser"), ("isso", "mesmo"), ("tudo", "bem"), ("tudo", "certo"),
+    ("muito", "bom"), ("que", "lindo"), ("que", "legal"),
+    # en
+    ("thank", "you"), ("thank", "you", "so", "much"), ("thanks", "so", "much"), ("got", "it"),
+    ("makes", "sense"), ("good", "morning"), ("good", "night"), ("sounds", "good"),
+    # es
+    ("muchas", "gracias"), ("buenos", "dias"), ("buenas", "tardes"), ("buenas", "noches"),
+    ("de", "acuerdo"),
+}
+_ACK_PHRASES_LONGEST_FIRST = sorted(ACK_PHRASES, key=len, reverse=True)
+
+# Words that signal personal content worth remembering even in short messages
+PERSONAL_MARKERS = {
+    "eu", "meu", "minha", "meus", "minhas", "comigo", "estou", "sinto", "tenho",  # pt
+    "i", "my", "mine", "feel",                                                   # en
+    "yo", "mi", "mis", "estoy", "siento", "tengo",                               # es
+}
+
+RECALL_MIN_TOKENS = 2   # Shorter non-questions ("sim", "e?") are answered from context alone
+EXTRACT_MIN_TOKENS = 4  # Facts need a subject and a predicate
+
+
+def tokenize(text: str) -> list:
+    """Accent-folded, lowercase word tokens (emoji and punctuation dropped)."""
+    folded = unicodedata.normalize("NFKD", text)
+    folded = "".join(ch for ch in folded if not unicodedata.combining(ch)).casefold()
+    return re.findall(r"[a-z0-9]+", folded)
+
+
+def decision(recall: bool, extract: bool, reason: str) -> dict:
+    return {"recall": recall, "extract": extract, "reason": reason}
+
+
+# ============================================================
+# DEFAULT CLASSIFIERS (heuristics)
+# ============================================================
+
+def empty_classifier(text: str, tokens: list):
+    if not tokens:
+        return decision(False, False, "no_words")
+    return None
+
+
+def is_acknowledgement(tokens: list) -> bool:
+    """True if the tokens are entirely acknowledgement words and phrases."""
+    i = 0
+    while i < len(tokens):
+        for phrase in _ACK_PHRASES_LONGEST_FIRST:
+            if tuple(tokens[i:i + len(phrase)]) == phrase:
+                i += len(phrase)
+                break
+        else:
+            if tokens[i] not in ACK_LEXICON:
+                return False
+            i += 1
+    return True
+
+
+def acknowledgement_classifier(text: str, tokens: list):
+    if "?" in text:
+        return None  # A question is never a mere acknowledgement
+    if len(tokens) <= 6 and is_acknowledgement(tokens):
+        return decision(False, False, "acknowledgement")
+    return None
+
+
+def length_classifier(text: str, tokens: list):
+    is_question = "?" in text
+    personal = any(token in PERSONAL_MARKERS for token in tokens)
+    recall = is_question or personal or len(tokens) >= RECALL_MIN_TOKENS
+    extract = len(tokens) >= EXTRACT_MIN_TOKENS or (personal and len(tokens) >= 2)
+    if recall and extract:
+        return decision(True, True, "content")
+    return decision(recall, extract, "short_question" if is_question else "short")
+
+
+DEFAULT_CLASSIFIERS = [empty_classifier, acknowledgement_classifier, length_classifier]
+
+
+class MessageGate:
+    def __init__(self, classifiers: list = None):
+        self.classifiers = list(classifiers or DEFAULT_CLASSIFIERS)
+
+    def register(self, classifier, first: bool = True):
+        """Adds a classifier; by default it runs before the heuristics."""
+        if first:
+            self.classifiers.insert(0, classifier)
+        else:
+            self.classifiers.append(classifier)
+
+    def evaluate(self, text: str) -> dict:
+        tokens = tokenize(text or "")
+        for classifier in self.classifiers:
+            try:
+                result = classifier(text or "", tokens)
+            except Exception as e:
+                print(f"⚠️ Message gate classifier {getattr(classifier, '__name__', classifier)} failed: {e}")
+                continue
+            if result is not None:
+                return result
+        # Nothing decided: fail open (never lose memory on a gate bug)
+        return decision(True, True, "default")
@@ -0,0 +1,37 @@
+"""
+Celest AI - In-process Metrics
+Thread-safe counter registry for cache hit rates, token accounting, etc.
+Exposed read-only via GET /agent/metrics (per process; resets on cold start).
+"""
+import threading
+from collections import defaultdict
+
+_counters = defaultdict(int)
+_lock = threading.Lock()
+
+
+def incr(name: str, value=1):
+    with _lock:
+        _counters[name] += value
+
+
+def get(name: str):
+    with _lock:
+        return _counters.get(name, 0)
+
+
+def snapshot() -> dict:
+    """Copy of all counters, plus a hit_rate for every `<prefix>.hit` / `<prefix>.miss` pair."""
+    with _lock:
+        counters = dict(_counters)
+    for name in list(counters):
+        if name.endswith(".hit"):
+            prefix = name[:-len(".hit")]
+            total = counters[name] + counters.get(prefix + ".miss", 0)
+            counters[prefix + ".hit_rate"] = round(counters[name] / total, 4) if total else 0.0
+    return dict(sorted(counters.items()))
+
+
+def reset():
+    with _lock:
+        _counters.clear()
@@ -0,0 +1,112 @@
+"""
+Celest AI - Dashboard Narrative Cache
+The dashboard widget text depends only on (date, planetary hour ruler, void-of-course Moon,
+scores). Scores are quantized into buckets and the narrative is cached by a hash of those
+inputs, so every user in the same astrological state shares one LLM generation.
+Tiers: local LRU + SQLite -> Supabase `dashboard_narratives` (shared across instances) -> LLM.
+"""
+import asyncio
+import hashlib
+import json
+import os
+
+import metrics
+from io_pool import run_blocking
+from local_cache import LocalCache, default_cache_path
+
+NARRATIVE_SCORE_BUCKET = int(os.getenv("NARRATIVE_SCORE_BUCKET", "10"))
+NARRATIVE_CACHE_TTL = float(os.getenv("NARRATIVE_CACHE_TTL_HOURS", "48")) * 3600
+NARRATIVE_CACHE_SIZE = int(os.getenv("NARRATIVE_CACHE_SIZE", "1024"))
+
+
+def score_bucket(score: int, width: int = NARRATIVE_SCORE_BUCKET) -> int:
+    """Lower bound of the bucket a 0-100 score falls in (73 -> 70 with width 10)."""
+    score = max(0, min(100, int(score)))
+    return min(score // width * width, 100 - width)  # 100 shares the top bucket
+
+
+def narrative_inputs(date: str, hour_ruler: str, is_void: bool, mental: int, physical: int, emotional: int) -> dict:
+    """Quantized prompt inputs: the ONLY things the narrative prompt may depend on."""
+    return {
+        "date": date,
+        "hour_ruler": hour_ruler,
+        "is_void": bool(is_void),
+        "mental": score_bucket(mental),
+        "physical": score_bucket(physical),
+        "emotional": score_bucket(emotional),
+    }
+
+
+def narrative_key(inputs: dict) -> str:
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class NarrativeCache:
+    def __init__(self, supabase_client, table: str = "dashboard_narratives", persist: bool = None):
+        if persist is None:
+            persist = os.getenv("NARRATIVE_CACHE_PERSIST", "1") == "1"
+        self.supabase = supabase_client
+        self.table = table
+        self._cache = LocalCache(
+            "dashboard_narratives",
+            path=default_cache_path() if persist else None,
+            max_items=NARRATIVE_CACHE_SIZE,
+            ttl=NARRATIVE_CACHE_TTL
+        )
+        self._inflight = {}  # key -> asyncio.Lock (one generation per key per process)
+
+    def get(self, key: str):
+        narrative = self._cache.get(key)
+        if narrative is not None:
+            return narrative
+        if self.supabase is None:
+            return None
+        try:
+            res = self.supabase.table(self.table).select("content").eq("key", key).limit(1).execute()
+            if res.data:
+                narrative = res.data[0]["content"]
+                if isinstance(narrative, str):
+                    narrative = json.loads(narrative)
+                self._cache.set(key, narrative)
+                return narrative
+        except Exception as e:
+            print(f"⚠️ Narrative cache read error: {e}")
+        return None
+
+    def put(self, key: str, inputs: dict, narrative: dict):
+        self._cache.set(key, narrative)
+        if self.supabase is None:
+            return
+        try:
+            self.supabase.table(self.table).upsert(
+                {"key": key, "date": inputs["date"], "inputs": inputs, "content": narrative},
+                on_conflict="key"
+            ).execute()
+        except Exception as e:
+            print(f"⚠️ Narrative cache write error: {e}")
+
+    async def get_or_generate(self, inputs: dict, generate) -> dict:
+        """
+        Cached narrative for `inputs`, or `await generate(inputs)` on a miss. Concurrent misses
+        for the same key wait for the first generation instead of each calling the LLM.
+        """
+        key = narrative_key(inputs)
+        narrative = await run_blocking(self.get, key)
+        if narrative is not None:
+            metrics.incr("narrative_cache.hit")
+            return narrative
+
+        lock = self._inflight.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                narrative = self._cache.get(key)  # Filled while we waited
+                if narrative is not None:
+                    metrics.incr("narrative_cache.hit")
+                    return narrative
+                metrics.incr("narrative_cache.miss")
+                narrative = await generate(inputs)
+                await run_blocking(self.put, key, inputs, narrative)
+                return narrative
+        finally:
+            if not lock.locked():
+                self._inflight.pop(key, None)
@@ -0,0 +1,51 @@
+"""
+Celest AI - Synastry Pair Cache
+Synastry results keyed by a canonical hash of both birth records + context, so re-opening a
+connection card skips geocoding, timezone lookups, both charts and the aspect pass (or the LLM).
+Local embedded store (LRU + SQLite) with TTL.
+
+Symmetric entries: when the aspect weights are symmetric for the context, (A, B) and (B, A)
+share one entry stored in canonical order and transposed on read. Order-dependent results
+(LLM narratives: A is the user, B the target) use symmetric=False.
+
+Keys are content-addressed: editing a connection's birth data yields a new record, hence new
+keys, so edits need no invalidation (stale pairs expire with the TTL).
+"""
+import hashlib
+import json
+import os
+
+import aspect_engine
+import metrics
+from local_cache import LocalCache, default_cache_path
+
+SYNASTRY_PAIR_TTL = float(os.getenv("SYNASTRY_PAIR_TTL_DAYS", "30")) * 86400
+SYNASTRY_PAIR_CACHE_SIZE = int(os.getenv("SYNASTRY_PAIR_CACHE_SIZE", "4096"))
+
+
+class PairCache:
+    def __init__(self, namespace: str = "synastry_pairs", persist: bool = None):
+        if persist is None:
+            persist = os.getenv("SYNASTRY_PAIR_CACHE_PERSIST", "1") == "1"
+        path = default_cache_path() if persist else None
+        self._cache = LocalCache(namespace, path=path, max_items=SYNASTRY_PAIR_CACHE_SIZE, ttl=SYNASTRY_PAIR_TTL)
+
+    def key(self, record_a: str, record_b: str, context: str, symmetric: bool = True):
+        """(cache key, swapped): swapped means the caller's order is the reverse of the stored one."""
+        swapped = symmetric and record_b < record_a
+        first, second = (record_b, record_a) if swapped else (record_a, record_b)
+        payload = [first, second, context, symmetric]
+        return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest(), swapped
+
+    def get(self, record_a: str, record_b: str, context: str, symmetric: bool = True):
+        key, swapped = self.key(record_a, record_b, context, symmetric)
+        result = self._cache.get(key)
+        if result is None:
+            metrics.incr("synastry_pair_cache.miss")
+            return None
+        metrics.incr("synastry_pair_cache.hit")
+        return aspect_engine.transpose(result) if swapped else result
+
+    def put(self, record_a: str, record_b: str, context: str, result: dict, symmetric: bool = True):
+        key, swapped = self.key(record_a, record_b, context, symmetric)
+        self._cache.set(key, aspect_engine.transpose(result) if swapped else result)
@@ -0,0 +1,159 @@
+"""
+Celest AI - Token-Budgeted Prompt Assembly
+Counts tokens locally (tiktoken, same encoder as the chat model; heuristic fallback when it
+is not installed or its encoding file cannot be loaded) and assembles the chat payload within
+PROMPT_TOKEN_BUDGET input tokens, trimming memories and history by priority. The per-section
+breakdown goes to ChatResponse.metadata so prompt size (-> latency, cost) stays observable.
+
+The encoding is loaded once by warm_up() at server import, never lazily on the event loop.
+tiktoken downloads its BPE file on first use; `npm run build:tiktoken` pre-caches it in
+cache/tiktoken (shipped via vercel.json includeFiles), used unless TIKTOKEN_CACHE_DIR is set.
+"""
+import os
+import threading
+
+from prompts import format_memory_block
+from session_state import estimate_tokens
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+PROMPT_ENCODING = os.getenv("PROMPT_ENCODING", "o200k_base")  # gpt-4o / gpt-4o-mini
+PROMPT_KEEP_RECENT = int(os.getenv("PROMPT_KEEP_RECENT", "2"))  # Latest exchange outranks memories
+TIKTOKEN_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cache", "tiktoken")
+MESSAGE_OVERHEAD = 4  # Chat framing per message (role + separators)
+REPLY_PRIMING = 3     # Tokens priming the assistant reply
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+# tiktoken reads TIKTOKEN_CACHE_DIR when it loads the encoding
+if os.path.isdir(TIKTOKEN_CACHE_DIR):
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", TIKTOKEN_CACHE_DIR)
+
+
+def _get_encoder():
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                try:
+                    _encoder = tiktoken.get_encoding(PROMPT_ENCODING) if tiktoken else False
+                except Exception as e:
+                    print(f"⚠️ tiktoken encoding '{PROMPT_ENCODING}' unavailable, using heuristic: {e}")
+                    _encoder = False
+    return _encoder
+
+
+def warm_up() -> str:
+    """Loads the encoding up front (may read or download the BPE file). Returns the active counter."""
+    return "tiktoken" if _get_encoder() else "heuristic"
+
+
+def count_tokens(text: str) -> int:
+    encoder = _get_encoder()
+    if encoder:
+        return len(encoder.encode(text or "", disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def count_message_tokens(messages: list) -> int:
+    """Input tokens of a chat payload (content + per-message framing + reply priming)."""
+    return sum(count_tokens(m["content"]) + MESSAGE_OVERHEAD for m in messages) + REPLY_PRIMING
+
+
+class PromptAssembler:
+    """
+    Builds [protocol, context + memories, history..., user] within `budget` input tokens.
+
+    Protocol, context and the user message are always sent. The rest is admitted by priority
+    while it fits: the latest `keep_recent` history messages, then memories in recall rank,
+    then older history newest-first, then the session summary.
+    """
+
+    def __init__(self, budget: int = PROMPT_TOKEN_BUDGET, keep_recent: int = PROMPT_KEEP_RECENT):
+        self.budget = budget
+        self.keep_recent = keep_recent
+
+    def assemble(self, protocol: str, context: str, user_message: str,
+                 memories: list = None, history: list = None):
+        """Returns (messages, breakdown). `history` is chronological; role "system" = session summary."""
+        memories = memories or []
+        history = history or []
+
+        remaining = self.budget - count_message_tokens([
+            {"content": protocol}, {"content": context}, {"content": user_message}
+        ])
+
+        turns = [i for i, message in enumerate(history) if message["role"] != "system"]
+        summaries = [i for i, message in enumerate(history) if message["role"] == "system"]
+        split = max(len(turns) - self.keep_recent, 0)
+        candidates = (
+            [("history", i) for i in reversed(turns[split:])]
+            + [("memory", i) for i in range(len(memories))]
+            + [("history", i) for i in reversed(turns[:split])]
+            + [("history", i) for i in summaries]
+        )
+
+        kept_history, kept_memories = set(), []
+        history_full = False  # Once a turn is dropped, older ones go too (no gaps in the dialogue)
+        for kind, index in candidates:
+            if kind == "memory":
+                cost = count_tokens(f"- {memories[index]}\n")
+                if not kept_memories:
+                    cost += count_tokens(format_memory_block([])) + 2
+            else:
+                if history_full:
+                    continue
+                cost = count_tokens(history[index]["content"]) + MESSAGE_OVERHEAD
+            if cost > remaining:
+                if kind == "history":
+                    history_full = True
+                continue
+            remaining -= cost
+            if kind == "memory":
+                kept_memories.append(index)
+            else:
+                kept_history.add(index)
+
+        memory_block = format_memory_block([memories[i] for i in sorted(kept_memories)]) if kept_memories else ""
+        history_messages = [history[i] for i in sorted(kept_history)]
+        messages = (
+            [{"role": "system", "content": protocol},
+             {"role": "system", "content": context + ("\n\n" + memory_block if memory_block else "")}]
+            + history_messages
+            + [{"role": "user", "content": user_message}]
+        )
+
+        total = count_message_tokens(messages)
+        breakdown = {
+            "protocol": count_tokens(protocol),
+            "context": count_tokens(context),
+            "memories": count_tokens(memory_block) if memory_block else 0,
+            "history": sum(count_tokens(m["content"]) for m in history_messages),
+            "user": count_tokens(user_message),
+            "total": total,
+            "budget": self.budget,
+            "memories_dropped": len(memories) - len(kept_memories),
+            "history_dropped": len(history) - len(kept_history),
+            "over_budget": total > self.budget,
+            "counter": warm_up(),
+        }
+        return messages, breakdown
+
+
+if __name__ == "__main__":
+    # Build step: pre-caches the encoding file (npm run build:tiktoken)
+    os.makedirs(TIKTOKEN_CACHE_DIR, exist_ok=True)
+    os.environ.setdefault("TIKTOKEN_CACHE_DIR", TIKTOKEN_CACHE_DIR)
+    counter = warm_up()
+    print(f"🔤 Token counter: {counter} ({PROMPT_ENCODING}, cache: {os.environ['TIKTOKEN_CACHE_DIR']})")
+    if counter != "tiktoken":
+        raise SystemExit(1)
@@ -0,0 +1,144 @@
+"""
+Celest AI - Conversation Session State
+Server-side conversation window per (user, session): the last K turns verbatim plus a rolling
+extractive summary of older turns. Kept in a bounded in-process LRU with TTL (stand-in for
+Redis) and hydrated from chat_logs on a miss, so the prompt size is deterministic. The client's
+last messages are only a fallback (cold/failed hydration, turns not yet in chat_logs).
+"""
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+SESSION_WINDOW_TURNS = int(os.getenv("SESSION_WINDOW_TURNS", "6"))
+SESSION_TOKEN_BUDGET = int(os.getenv("SESSION_TOKEN_BUDGET", "1200"))
+SESSION_SUMMARY_MAX_CHARS = int(os.getenv("SESSION_SUMMARY_MAX_CHARS", "1200"))
+SESSION_TTL = float(os.getenv("SESSION_TTL_MINUTES", "60")) * 60
+SESSION_MAX = int(os.getenv("SESSION_MAX", "2048"))
+SUMMARY_LINE_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~4 chars per token for pt/en/es text)."""
+    return len(text or "") // 4 + 1
+
+
+def summarize_turn(role: str, content: str) -> str:
+    """Extractive one-liner: first sentence of the turn, clipped."""
+    content = re.sub(r"\s+", " ", content or "").strip()
+    first = re.split(r"(?<=[.!?])\s", content, maxsplit=1)[0]
+    if len(first) > SUMMARY_LINE_CHARS:
+        first = first[:SUMMARY_LINE_CHARS - 1].rstrip() + "…"
+    return f"- {'Usuário' if role == 'user' else 'Celest'}: {first}"
+
+
+class SessionState:
+    def __init__(self, window_turns: int = SESSION_WINDOW_TURNS):
+        self.window_turns = window_turns
+        self.turns = []   # [{"role", "content"}], chronological, at most window_turns
+        self.summary = [] # one line per turn that left the window
+        self.touched = time.time()
+
+    def append(self, role: str, content: str):
+        self.turns.append({"role": "user" if role == "user" else "assistant", "content": content or ""})
+        while len(self.turns) > self.window_turns:
+            old = self.turns.pop(0)
+            self.summary.append(summarize_turn(old["role"], old["content"]))
+        # Rolling: oldest summary lines go first
+        while self.summary and sum(len(line) + 1 for line in self.summary) > SESSION_SUMMARY_MAX_CHARS:
+            self.summary.pop(0)
+        self.touched = time.time()
+
+    def messages(self, token_budget: int = SESSION_TOKEN_BUDGET) -> list:
+        """
+        Prompt messages for this session within token_budget: newest turns are kept first,
+        then the summary if it still fits. Oversized single turns are clipped.
+        """
+        kept, used = [], 0
+        for turn in reversed(self.turns):
+            content = turn["content"]
+            cost = estimate_tokens(content)
+            if used + cost > token_budget:
+                remaining = token_budget - used
+                if remaining < 32 or kept:
+                    break
+                content = content[:remaining * 4] + "…"  # Newest turn always makes it, clipped
+                cost = estimate_tokens(content)
+            kept.append({"role": turn["role"], "content": content})
+            used += cost
+
+        kept.reverse()
+        if self.summary:
+            summary = "RESUMO DA CONVERSA ATÉ AQUI:\n" + "\n".join(self.summary)
+            if used + estimate_tokens(summary) <= token_budget:
+                kept.insert(0, {"role": "system", "content": summary})
+        return kept
+
+
+class SessionStore:
+    def __init__(self, max_sessions: int = SESSION_MAX, ttl: float = SESSION_TTL,
+                 window_turns: int = SESSION_WINDOW_TURNS):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.window_turns = window_turns
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(user_id: str, session_id: str = None) -> str:
+        return f"{user_id}|{session_id or ''}"
+
+    def get(self, user_id: str, session_id: str = None, loader=None) -> SessionState:
+        """
+        Session window; on a miss (or expiry) it is rebuilt from `loader()`, which returns
+        persisted messages in chronological order ([{"role", "message"}], e.g. chat_logs rows).
+        """
+        key = self.key(user_id, session_id)
+        with self._lock:
+            state = self._sessions.get(key)
+            if state is not None and time.time() - state.touched < self.ttl:
+                self._sessions.move_to_end(key)
+                return state
+
+        state = SessionState(self.window_turns)
+        if loader:
+            # A failing loader raises (or returns None): nothing is cached, the next request retries
+            rows = loader()
+            if rows is None:
+                return state
+            for row in rows:
+                state.append(row.get("role"), row.get("message") or row.get("content"))
+
+        with self._lock:
+            # A concurrent request may have hydrated it meanwhile; keep the first one
+            current = self._sessions.get(key)
+            if current is not None and time.time() - current.touched < self.ttl:
+                return current
+            self._sessions[key] = state
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return state
+
+    def reseed(self, user_id: str, session_id: str, messages: list):
+        """Replaces a session window with `messages` ([{"role", "content"}], chronological)."""
+        state = SessionState(self.window_turns)
+        for message in messages:
+            state.append(message["role"], message["content"])
+        with self._lock:
+            self._sessions[self.key(user_id, session_id)] = state
+            self._sessions.move_to_end(self.key(user_id, session_id))
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def append(self, user_id: str, session_id: str, role: str, content: str):
+        """Records a turn on a cached session (uncached sessions hydrate from chat_logs later)."""
+        with self._lock:
+            state = self._sessions.get(self.key(user_id, session_id))
+            if state is not None:
+                state.append(role, content)
+                self._sessions.move_to_end(self.key(user_id, session_id))
@@ -0,0 +1,72 @@
+"""
+Celest AI - Sky Snapshot (Shared Transits)
+Geocentric planetary positions for a given moment are the same for every user, so they are
+computed once per time bucket (default 60s) and shared process-wide. Inside a bucket each
+longitude is advanced linearly with its FLG_SPEED velocity (deg/day) for sub-bucket precision.
+"""
+import math
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from ephemeris import CHART_BODIES, ZODIAC_SIGNS, calculate_positions_batch
+
+UNIX_EPOCH_JD = 2440587.5
+
+
+class SkySnapshot:
+    def __init__(self, bucket_seconds: int = 60, bodies=CHART_BODIES, max_buckets: int = 16):
+        self.bucket_seconds = max(1, int(bucket_seconds))
+        self.bodies = bodies
+        self.max_buckets = max_buckets
+        self._buckets = OrderedDict()  # bucket start (unix s) -> (jd, longitudes, speeds)
+        self._lock = threading.Lock()
+        self.computations = 0  # swisseph passes actually run (observability)
+
+    def _bucket(self, ts: float):
+        start = math.floor(ts / self.bucket_seconds) * self.bucket_seconds
+        with self._lock:
+            entry = self._buckets.get(start)
+            if entry is not None:
+                self._buckets.move_to_end(start)
+                return entry
+
+            jd = UNIX_EPOCH_JD + start / 86400.0
+            batch = calculate_positions_batch([jd], bodies=self.bodies, with_houses=False)
+            entry = (jd, batch["longitude"][0], batch["speed"][0])
+            self._buckets[start] = entry
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+            self.computations += 1
+            return entry
+
+    def positions(self, when: datetime = None):
+        """
+        Returns (body names, longitudes, speeds) for `when` (UTC; default now).
+        Longitudes are interpolated from the bucket snapshot using the velocities.
+        """
+        if when is None:
+            when = datetime.now(timezone.utc)
+        elif when.tzinfo is None:
+            when = when.replace(tzinfo=timezone.utc)  # naive datetimes are UTC here
+
+        ts = when.timestamp()
+        jd0, longitudes, speeds = self._bucket(ts)
+        elapsed_days = (UNIX_EPOCH_JD + ts / 86400.0) - jd0
+        names = tuple(name for name, _ in self.bodies)
+        return names, (longitudes + speeds * elapsed_days) % 360.0, speeds
+
+    def chart(self, when: datetime = None) -> dict:
+        """Transit chart in the same shape as AstrologyEngine.calculate_chart (no houses)."""
+        names, longitudes, _ = self.positions(when)
+        chart = {}
+        for name, lon in zip(names, longitudes.tolist()):
+            chart[name] = {
+                "sign": ZODIAC_SIGNS[int(lon // 30) % 12],
+                "house": "Unknown",
+                "longitude": lon
+            }
+        chart["ascendant"] = {"sign": "Unknown", "longitude": 0.0}
+        chart["mc"] = {"sign": "Unknown", "longitude": 0.0}
+        return chart
+
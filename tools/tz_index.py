@@ -0,0 +1,132 @@
+"""
+Celest AI - Offline Timezone Index (coordinates -> IANA zone)
+Memory-maps a packed index built by build_tz_index.py and answers lookups locally,
+replacing a network round trip per chart (and the 50MB+ TimezoneFinder dependency).
+
+File layout (little-endian, sections 8-byte aligned):
+  header     -> see HEADER
+  names      -> UTF-8 zone names joined by "\\n"
+  grid       -> int32[n_rows * n_cols]; >= 0 uniform zone id, < 0 boundary cell -(k + 1)
+  cell_start -> int32[n_bcells + 1]; candidate range of boundary cell k
+  cand_zone  -> int32[n_cands]; candidate zone id
+  cand_in    -> uint8[n_cands]; 1 if the cell center lies inside the candidate zone
+  edge_start -> int32[n_cands + 1]; edge range of each candidate
+  edges      -> float32[n_edges, 4]; (lon1, lat1, lon2, lat2) of zone edges touching the cell
+
+Boundary lookup: inside(point) = inside(center) XOR (odd number of zone edges crossed by
+the point->center segment). The segment never leaves the cell, so only its edges matter.
+"""
+import mmap
+import os
+import struct
+
+import numpy as np
+
+MAGIC = b"CTZI"
+VERSION = 1
+HEADER = struct.Struct("<4sIdIIIIII")  # magic, version, cell_deg, n_cols, n_rows, n_zones, n_bcells, n_cands, n_edges
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "cache", "timezones.tzidx")
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def ocean_zone(lon: float) -> str:
+    """Nautical zone for open water (Etc/GMT signs are inverted: Etc/GMT+3 = UTC-3)."""
+    offset = int(round(max(-180.0, min(180.0, lon)) / 15.0))
+    return "Etc/GMT" if offset == 0 else f"Etc/GMT{-offset:+d}"
+
+
+class TimezoneIndex:
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.cell_deg, self.n_cols, self.n_rows,
+         n_zones, n_bcells, n_cands, n_edges) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a timezone index (v{VERSION}): {path}")
+
+        offset = HEADER.size
+        (names_len,) = struct.unpack_from("<I", self._mm, offset)
+        offset += 4
+        self.zones = bytes(self._mm[offset:offset + names_len]).decode("utf-8").split("\n")
+        offset = _align(offset + names_len)
+        if len(self.zones) != n_zones:
+            raise ValueError(f"Corrupt timezone index (zone table): {path}")
+
+        def section(dtype, count, shape=None):
+            nonlocal offset
+            arr = np.frombuffer(self._mm, dtype=dtype, count=count, offset=offset)
+            offset = _align(offset + arr.nbytes)
+            return arr.reshape(shape) if shape else arr
+
+        self.grid = section("<i4", self.n_rows * self.n_cols)
+        self.cell_start = section("<i4", n_bcells + 1)
+        self.cand_zone = section("<i4", n_cands)
+        self.cand_in = section("u1", n_cands)
+        self.edge_start = section("<i4", n_cands + 1)
+        self.edges = section("<f4", n_edges * 4, (n_edges, 4))
+
+    def lookup(self, lat: float, lon: float) -> str:
+        """Returns the IANA zone for a coordinate (Etc/GMT±N over open water)."""
+        col = min(max(int((lon + 180.0) / self.cell_deg), 0), self.n_cols - 1)
+        row = min(max(int((lat + 90.0) / self.cell_deg), 0), self.n_rows - 1)
+
+        value = int(self.grid[row * self.n_cols + col])
+        if value >= 0:
+            return self.zones[value]
+
+        # Boundary cell: resolve with a local parity test per candidate zone
+        k = -value - 1
+        cx = (col + 0.5) * self.cell_deg - 180.0
+        cy = (row + 0.5) * self.cell_deg - 90.0
+        first = int(self.cell_start[k])
+        last = int(self.cell_start[k + 1])
+
+        for c in range(first, last):
+            e = self.edges[self.edge_start[c]:self.edge_start[c + 1]]
+            crossings = _count_crossings(lon, lat, cx, cy, e) if len(e) else 0
+            if bool(self.cand_in[c]) != bool(crossings & 1):
+                return self.zones[self.cand_zone[c]]
+
+        # No zone claims the point: open water next to a coastline
+        return ocean_zone(lon)
+
+
+def _count_crossings(px, py, qx, qy, edges) -> int:
+    """Number of edges properly intersecting segment p->q."""
+    ax, ay, bx, by = edges[:, 0], edges[:, 1], edges[:, 2], edges[:, 3]
+    dx, dy = qx - px, qy - py
+    # Side of a/b relative to p->q, and side of p/q relative to a->b
+    d1 = dx * (ay - py) - dy * (ax - px)
+    d2 = dx * (by - py) - dy * (bx - px)
+    ex, ey = bx - ax, by - ay
+    d3 = ex * (py - ay) - ey * (px - ax)
+    d4 = ex * (qy - ay) - ey * (qx - ax)
+    return int(np.count_nonzero((d1 * d2 < 0) & (d3 * d4 < 0)))
+
+
+_default_index = None
+_default_loaded = False
+
+
+def get_default_index():
+    """
+    Lazily opens the index at TZ_INDEX_PATH (or cache/timezones.tzidx).
+    Returns None when no index has been built, so callers can fall back.
+    """
+    global _default_index, _default_loaded
+    if not _default_loaded:
+        _default_loaded = True
+        path = os.getenv("TZ_INDEX_PATH", DEFAULT_INDEX_PATH)
+        if os.path.exists(path):
+            try:
+                _default_index = TimezoneIndex(path)
+                print(f"🗺️ Timezone index loaded: {len(_default_index.zones)} zones")
+            except Exception as e:
+                print(f"⚠️ Timezone index unavailable: {e}")
+    return _default_index
@@ -0,0 +1,178 @@
+"""
+Celest AI - Local Memory Vector Index
+In-process alternative to the match_memories pgvector RPC (MEMORY_INDEX=local).
+Each user's memories are hydrated lazily from the `memories` table into an L2-normalized,
+quantized NumPy matrix (int8 + per-row scale, or float16), so recall is one brute-force
+dot product: sub-millisecond for a few hundred memories versus a 50-150ms round trip.
+
+Users are kept in a bounded LRU and re-hydrated after MEMORY_INDEX_TTL seconds, which
+bounds staleness across serverless instances. Users above MEMORY_INDEX_MAX_ROWS return
+None from search() so the caller falls back to the RPC.
+"""
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+# ============================================================
+# CONFIGURATION
+# ============================================================
+
+MEMORY_INDEX_DTYPE = os.getenv("MEMORY_INDEX_DTYPE", "int8")  # int8 | float16
+MEMORY_INDEX_MAX_USERS = int(os.getenv("MEMORY_INDEX_MAX_USERS", "256"))
+MEMORY_INDEX_MAX_ROWS = int(os.getenv("MEMORY_INDEX_MAX_ROWS", "20000"))
+MEMORY_INDEX_TTL = float(os.getenv("MEMORY_INDEX_TTL", "300"))
+HYDRATE_PAGE_SIZE = 1000
+
+
+def parse_vector(value) -> np.ndarray:
+    """pgvector columns come back from PostgREST as '[0.1,0.2,...]' strings (or lists)."""
+    if isinstance(value, str):
+        value = json.loads(value)
+    return np.asarray(value, dtype=np.float32)
+
+
+class UserVectors:
+    """One user's memories: parallel lists of rows + quantized unit-vector matrix."""
+
+    def __init__(self, dtype: str = MEMORY_INDEX_DTYPE):
+        self.dtype = dtype
+        self.rows = []  # {"id", "content", "metadata"}
+        self.matrix = None
+        self.scales = None  # int8 only
+        self.loaded_at = time.time()
+
+    def add(self, rows: list, vectors: np.ndarray):
+        if not rows:
+            return
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1.0, norms)
+
+        scales = None
+        if self.dtype == "int8":
+            scales = (np.abs(vectors).max(axis=1) / 127.0).astype(np.float32)
+            scales[scales == 0] = 1.0
+            quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+        else:
+            quantized = vectors.astype(np.float16)
+
+        # Publish new objects rows -> scales -> matrix; search() reads them in reverse order,
+        # so a concurrent search never sees more matrix rows than row dicts
+        self.rows = self.rows + list(rows)
+        if scales is not None:
+            self.scales = scales if self.scales is None else np.concatenate([self.scales, scales])
+        self.matrix = quantized if self.matrix is None else np.vstack([self.matrix, quantized])
+
+    def search(self, query: np.ndarray, k: int, threshold: float) -> list:
+        matrix, scales, rows = self.matrix, self.scales, self.rows
+        if matrix is None:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        query = query / (np.linalg.norm(query) or 1.0)
+
+        scores = matrix.astype(np.float32) @ query
+        if scales is not None:
+            scores *= scales[:scores.size]
+
+        k = min(k, scores.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            dict(rows[i], similarity=float(scores[i]))
+            for i in top.tolist()
+            if scores[i] > threshold
+        ]
+
+
+class LocalVectorIndex:
+    def __init__(self, supabase_client, max_users: int = MEMORY_INDEX_MAX_USERS, ttl: float = MEMORY_INDEX_TTL):
+        self.supabase = supabase_client
+        self.max_users = max_users
+        self.ttl = ttl
+        self._users = OrderedDict()  # user_id -> UserVectors (or None = too large, use RPC)
+        self._lock = threading.Lock()
+        self._hydrating = {}  # user_id -> Lock (one hydration per user at a time)
+
+    def _hydrate(self, user_id: str):
+        entry = UserVectors()
+        offset = 0
+        while True:
+            page = (
+                self.supabase.table("memories")
+                .select("id, content, metadata, embedding")
+                .eq("user_id", user_id)
+                .order("id", desc=False)
+                .range(offset, offset + HYDRATE_PAGE_SIZE - 1)
+                .execute()
+            ).data or []
+            page = [row for row in page if row.get("embedding") is not None]
+            if page:
+                entry.add(
+                    [{"id": row.get("id"), "content": row["content"], "metadata": row.get("metadata") or {}} for row in page],
+                    np.stack([parse_vector(row["embedding"]) for row in page])
+                )
+            if len(entry.rows) > MEMORY_INDEX_MAX_ROWS:
+                print(f"⚠️ Memory index: {user_id} has over {MEMORY_INDEX_MAX_ROWS} memories, using RPC.")
+                return None
+            if len(page) < HYDRATE_PAGE_SIZE:
+                break
+            offset += HYDRATE_PAGE_SIZE
+        print(f"🧠 Memory index hydrated for {user_id}: {len(entry.rows)} memories.")
+        return entry
+
+    def _get(self, user_id: str):
+        """Returns the user's vectors (None = served by the RPC), hydrating on miss/expiry."""
+        with self._lock:
+            if user_id in self._users:
+                entry = self._users[user_id]
+                if entry is None or time.time() - entry.loaded_at < self.ttl:
+                    self._users.move_to_end(user_id)
+                    return entry
+            user_lock = self._hydrating.setdefault(user_id, threading.Lock())
+
+        with user_lock:
+            with self._lock:
+                entry = self._users.get(user_id, False)
+                if entry is not False and (entry is None or time.time() - entry.loaded_at < self.ttl):
+                    return entry  # Hydrated by a concurrent request
+            entry = self._hydrate(user_id)
+            with self._lock:
+                self._users[user_id] = entry
+                self._users.move_to_end(user_id)
+                while len(self._users) > self.max_users:
+                    self._users.popitem(last=False)
+                self._hydrating.pop(user_id, None)
+            return entry
+
+    def search(self, user_id: str, query_vector, k: int = 3, threshold: float = 0.5):
+        """
+        Top-k memories with cosine similarity > threshold, same shape as match_memories rows.
+        Returns None when the user isn't served locally (caller should use the RPC).
+        """
+        entry = self._get(user_id)
+        if entry is None:
+            return None
+        return entry.search(query_vector, k, threshold)
+
+    def add(self, user_id: str, rows: list, vectors):
+        """Keeps a hydrated user in sync after inserts (unhydrated users load it all later)."""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is not None:
+                entry.add(rows, vectors)
+
+    def update_metadata(self, user_id: str, row_id, metadata: dict):
+        """Refreshes one row's metadata after an update (e.g. a frequency bump)."""
+        with self._lock:
+            entry = self._users.get(user_id)
+            if entry is None:
+                return
+            entry.rows = [dict(row, metadata=metadata) if row["id"] == row_id else row for row in entry.rows]
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._users.pop(user_id, None)
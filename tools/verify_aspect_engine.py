@@ -0,0 +1,148 @@
+import random
+
+import aspect_engine
+from aspect_engine import PLANETS, score_batch, synastry
+
+# Referência: o loop aninhado original de AstrologyEngine.calculate_synastry (tabelas copiadas à parte)
+BASE_WEIGHTS = {
+    "Conjunction": 10, "Opposition": -5, "Trine": 15, "Square": -10, "Sextile": 5
+}
+MODIFIERS = {
+    'love': {
+        'Square': -15, 'Opposition': -10, 'Trine': 20,
+        ('saturn', 'moon', 'Square'): -25,
+        ('venus', 'mars', 'Conjunction'): 30,
+        ('sun', 'moon', 'Conjunction'): 30
+    },
+    'work': {
+        'Square': 5, 'Opposition': 0, 'Trine': 10,
+        ('saturn', 'sun', 'Conjunction'): 25,
+        ('mercury', 'mercury', 'Trine'): 25,
+        ('mars', 'saturn', 'Square'): 15
+    },
+    'social': {
+        'Square': -5, 'Trine': 20,
+        ('jupiter', 'sun', 'Conjunction'): 30,
+        ('moon', 'moon', 'Trine'): 25
+    }
+}
+DEFS = [
+    {"name": "Conjunction", "angle": 0, "orb": 8},
+    {"name": "Opposition", "angle": 180, "orb": 8},
+    {"name": "Trine", "angle": 120, "orb": 8},
+    {"name": "Square", "angle": 90, "orb": 8},
+    {"name": "Sextile", "angle": 60, "orb": 6}
+]
+CONTEXTS = ["love", "work", "social", "desconhecido"]
+
+
+def reference_synastry(chart_a, chart_b, context="love"):
+    aspects = []
+    score = 0
+    current_mod = MODIFIERS.get(context, MODIFIERS['love'])
+    planets = ["sun", "moon", "mercury", "venus", "mars", "jupiter", "saturn"]
+
+    for p1 in planets:
+        for p2 in planets:
+            if p1 not in chart_a or p2 not in chart_b: continue
+
+            pos1 = chart_a[p1].get("longitude", 0)
+            pos2 = chart_b[p2].get("longitude", 0)
+
+            diff = abs(pos1 - pos2)
+            if diff > 180: diff = 360 - diff
+
+            for aspect in DEFS:
+                orb = abs(diff - aspect["angle"])
+                if orb <= aspect["orb"]:
+                    name = aspect["name"]
+                    weight = BASE_WEIGHTS.get(name, 0)
+                    if name in current_mod:
+                        weight = current_mod[name]
+                    specific_key_1 = (p1, p2, name)
+                    specific_key_2 = (p2, p1, name)
+                    if specific_key_1 in current_mod: weight = current_mod[specific_key_1]
+                    elif specific_key_2 in current_mod: weight = current_mod[specific_key_2]
+
+                    aspects.append({
+                        "planet_a": p1,
+                        "planet_b": p2,
+                        "aspect": name,
+                        "orb_tightness": round(orb, 2),
+                        "weight": weight,
+                        "description": f"{p1.capitalize()} {name} {p2.capitalize()}"
+                    })
+                    score += weight
+                    break
+
+    normalized_score = 50 + (score * 0.5)
+    normalized_score = min(100, max(0, normalized_score))
+    return {
+        "score": round(normalized_score),
+        "raw_score": score,
+        "aspects": aspects,
+        "count": len(aspects),
+        "context": context
+    }
+
+
+def random_chart(rng):
+    chart = {}
+    for planet in PLANETS:
+        if rng.random() < 0.1:
+            continue  # Planeta ausente
+        if rng.random() < 0.3:
+            # Em cima das bordas de orbe (0/60/90/120/180 ± orbe) e da volta de 360°
+            longitude = (rng.choice([0, 60, 90, 120, 180, 240, 270, 300]) + rng.choice([-8, -6, 0, 6, 8])) % 360
+        else:
+            longitude = rng.uniform(0, 360)
+        chart[planet] = {"longitude": longitude}
+    return chart
+
+
+def run_test():
+    print("\n🔍 --- VERIFICANDO ASPECT ENGINE CONTRA O LOOP ORIGINAL ---")
+    failures = []
+    rng = random.Random(21)
+
+    # 1. synastry() == loop aninhado, payload inteiro (ordem dos aspectos, orbes, pesos, score)
+    pairs = 0
+    for _ in range(3000):
+        chart_a, chart_b = random_chart(rng), random_chart(rng)
+        for context in CONTEXTS:
+            pairs += 1
+            got, want = synastry(chart_a, chart_b, context), reference_synastry(chart_a, chart_b, context)
+            if got != want and len(failures) < 5:
+                failures.append(f"synastry ({context}): {got['raw_score']} != {want['raw_score']}, "
+                                f"{got['count']} vs {want['count']} aspectos")
+    print(f"🧪 synastry: {pairs} pares comparados")
+
+    # 2. score_batch() == loop aninhado, candidato a candidato
+    chart_a = random_chart(rng)
+    candidates = [random_chart(rng) for _ in range(500)]
+    for context in CONTEXTS:
+        batch = score_batch(chart_a, candidates, context)
+        for i, candidate in enumerate(candidates):
+            want = reference_synastry(chart_a, candidate, context)
+            got = (int(batch["raw_score"][i]), int(batch["count"][i]), round(float(batch["score"][i])))
+            if got != (want["raw_score"], want["count"], want["score"]):
+                failures.append(f"score_batch ({context}) candidato {i}: {got}")
+                break
+    print(f"🧪 score_batch: {len(candidates)} candidatos x {len(CONTEXTS)} contextos")
+
+    # 3. Contextos simétricos: synastry(B, A) == transpose(synastry(A, B))
+    for context in CONTEXTS:
+        if not aspect_engine.is_symmetric(context):
+            continue
+        chart_a, chart_b = random_chart(rng), random_chart(rng)
+        if aspect_engine.transpose(synastry(chart_a, chart_b, context)) != synastry(chart_b, chart_a, context):
+            failures.append(f"transpose ({context}) diverge de synastry(B, A)")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ FALHA: {failure}")
+        raise SystemExit(1)
+    print("\n✅ SUCESSO: Aspect engine idêntico ao loop original em todos os contextos.")
+
+if __name__ == "__main__":
+    run_test()
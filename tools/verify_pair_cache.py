@@ -0,0 +1,72 @@
+import random
+
+import aspect_engine
+from aspect_engine import PLANETS, synastry, transpose
+from pair_cache import PairCache
+
+# Registros canônicos (date|time|city|country), como birth_record_key
+RECORD_A = "1990-05-01|08:30|sao paulo|br"
+RECORD_B = "1987-11-23|21:15|lisboa|pt"
+RECORD_C = "1995-02-14|12:00|recife|br"
+RECORD_B_EDITED = "1987-11-23|21:45|lisboa|pt"
+
+
+def random_chart(rng):
+    return {planet: {"longitude": rng.uniform(0, 360)} for planet in PLANETS}
+
+
+def run_test():
+    print("\n🔍 --- VERIFICANDO PAIR CACHE DE SINASTRIA ---")
+    failures = []
+    rng = random.Random(24)
+
+    # 1. transpose(synastry(A, B)) == synastry(B, A) recalculada, nos contextos simétricos
+    symmetric_contexts = [context for context in aspect_engine.WEIGHTS if aspect_engine.is_symmetric(context)]
+    print(f"🧪 Contextos simétricos: {symmetric_contexts}")
+    for context in symmetric_contexts:
+        for _ in range(500):
+            chart_a, chart_b = random_chart(rng), random_chart(rng)
+            if transpose(synastry(chart_a, chart_b, context)) != synastry(chart_b, chart_a, context):
+                failures.append(f"transpose ({context}) diverge de synastry(B, A)")
+                break
+
+    # 2. Entrada simétrica: (A, B) e (B, A) compartilham uma chave; a ordem inversa sai transposta
+    cache = PairCache(persist=False)
+    chart_a, chart_b, chart_c = random_chart(rng), random_chart(rng), random_chart(rng)
+    for context in symmetric_contexts:
+        geometry = synastry(chart_a, chart_b, context)
+        cache.put(RECORD_A, RECORD_B, context, geometry)
+        if cache.key(RECORD_A, RECORD_B, context)[0] != cache.key(RECORD_B, RECORD_A, context)[0]:
+            failures.append(f"Chaves (A, B) e (B, A) diferentes em '{context}'")
+        if cache.get(RECORD_A, RECORD_B, context) != geometry:
+            failures.append(f"get(A, B) != synastry(A, B) em '{context}'")
+        if cache.get(RECORD_B, RECORD_A, context) != synastry(chart_b, chart_a, context):
+            failures.append(f"get(B, A) != synastry(B, A) recalculada em '{context}'")
+
+    # 3. Narrativas (symmetric=False): dependem da ordem, nunca compartilhadas com (B, A)
+    narrative = {"summary": "A vê B", "chart_energy": 70}
+    cache.put(RECORD_A, RECORD_B, "narrative|passionate|love", narrative, symmetric=False)
+    if cache.get(RECORD_A, RECORD_B, "narrative|passionate|love", symmetric=False) != narrative:
+        failures.append("Narrativa (A, B) não encontrada")
+    if cache.get(RECORD_B, RECORD_A, "narrative|passionate|love", symmetric=False) is not None:
+        failures.append("Narrativa (A, B) servida para (B, A)")
+
+    # 4. Dados de nascimento editados: registro novo, chave nova (sem invalidação)
+    if cache.get(RECORD_A, RECORD_B_EDITED, "love") is not None:
+        failures.append("Registro editado reaproveitou o par antigo")
+
+    # 5. Pares diferentes não colidem
+    cache.put(RECORD_B, RECORD_C, "love", synastry(chart_b, chart_c, "love"))
+    if cache.get(RECORD_C, RECORD_B, "love") != synastry(chart_c, chart_b, "love"):
+        failures.append("Par (B, C) incorreto")
+    if cache.get(RECORD_A, RECORD_C, "love") is not None:
+        failures.append("Par (A, C) nunca gravado, mas encontrado")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ FALHA: {failure}")
+        raise SystemExit(1)
+    print("\n✅ SUCESSO: Pair cache compartilha pares simétricos, isola narrativas e separa registros editados.")
+
+if __name__ == "__main__":
+    run_test()
@@ -0,0 +1,102 @@
+import asyncio
+import itertools
+
+import agent_server
+from agent_server import ChatRequest, build_chat_context, prepare_chat_turn
+from prompt_budget import count_tokens, _get_encoder
+from prompts import CHAT_PROTOCOL
+
+PROMPT_CACHE_MIN_TOKENS = 1024  # OpenAI só faz cache de prefixos >= 1024 tokens
+
+# 1. Perfis, mapas e trânsitos diferentes
+PROFILES = {
+    "user-a": {"full_name": "Zuleica Prado", "time_unknown": False},
+    "user-b": {"full_name": "Bruno Quintela", "time_unknown": True},
+}
+NATAL = {
+    "user-a": {
+        "sun": {"sign": "Aries", "longitude": 15.0},
+        "moon": {"sign": "Taurus", "longitude": 40.0},
+        "ascendant": {"sign": "Cancer", "longitude": 95.0}
+    },
+    "user-b": {
+        "sun": {"sign": "Libra", "longitude": 190.0},
+        "moon": {"sign": "Pisces", "longitude": 350.0},
+        "ascendant": {"sign": "Unknown", "longitude": 0.0}
+    },
+}
+TRANSITS = itertools.cycle([
+    {
+        "sun": {"sign": "Pisces", "longitude": 340.0},
+        "moon": {"sign": "Scorpio", "longitude": 220.0},
+        "mars": {"sign": "Capricorn", "longitude": 280.0}
+    },
+    {
+        "sun": {"sign": "Leo", "longitude": 130.0},
+        "moon": {"sign": "Gemini", "longitude": 70.0},
+        "mars": {"sign": "Virgo", "longitude": 160.0}
+    },
+])
+
+# MOCK I/O: só a montagem do payload interessa aqui
+agent_server.check_daily_limit = lambda uid: True
+agent_server.get_natal_chart = lambda profile, user_id=None: NATAL[user_id]
+agent_server.memory_store.recall_memories = lambda uid, q: [{"content": f"Memória privada de {uid}."}]
+agent_server.get_chat_history_page = lambda *args, **kwargs: {"messages": [], "next_cursor": None}
+agent_server.AstrologyEngine.get_current_transits = lambda lat=0.0, lon=0.0: next(TRANSITS)
+
+
+async def build_turn(user_id: str, message: str) -> list:
+    request = ChatRequest(
+        user_id=user_id,
+        message=message,
+        history=[],
+        context={"user_profile": PROFILES[user_id], "session_id": f"session-{user_id}"}
+    )
+    return (await prepare_chat_turn(request))["messages"]
+
+
+def run_test():
+    print("\n🔍 --- VERIFICANDO PREFIXO ESTÁTICO DO PROMPT (OpenAI Prompt Caching) ---")
+    failures = []
+
+    # 2. Payload real enviado à OpenAI para usuários, trânsitos e mensagens diferentes
+    messages_a = asyncio.run(build_turn("user-a", "Como está minha energia para o trabalho hoje?"))
+    messages_b = asyncio.run(build_turn("user-b", "O que a Lua diz sobre meus relacionamentos?"))
+
+    prefix_a, prefix_b = messages_a[0], messages_b[0]
+    if prefix_a != prefix_b:
+        failures.append("messages[0] difere entre usuários/turnos (prefixo não é cacheável)")
+    if prefix_a["role"] != "system":
+        failures.append(f"messages[0] deveria ser 'system', veio '{prefix_a['role']}'")
+
+    # 3. Nenhum dado dinâmico pode vazar para o prefixo
+    for token in ["Zuleica", "Quintela", "Scorpio", "Gemini", "Cancer", "Hora de nascimento:", "Memória privada"]:
+        if token in prefix_a["content"]:
+            failures.append(f"Dado dinâmico '{token}' encontrado no prefixo estático")
+
+    # 4. O contexto dinâmico vem depois e carrega os dados de cada turno
+    if "Zuleica Prado" not in messages_a[1]["content"] or "Bruno Quintela" not in messages_b[1]["content"]:
+        failures.append("Contexto do turno (messages[1]) sem o nome do usuário")
+    context_b = build_chat_context(PROFILES["user-b"], NATAL["user-b"], next(TRANSITS), ["Usuário gosta de mar."])
+    for expected in ["Bruno Quintela", "Libra", "Hora de nascimento: DESCONHECIDA", "Usuário gosta de mar."]:
+        if expected not in context_b:
+            failures.append(f"'{expected}' ausente do contexto dinâmico")
+
+    # 5. Tamanho do prefixo (informativo: abaixo de 1024 tokens a OpenAI não faz cache, ver prompts.py)
+    counter = "tiktoken" if _get_encoder() else "heuristic"
+    prefix_tokens = count_tokens(prefix_a["content"])
+    print(f"📏 Prefixo estático: {len(prefix_a['content'])} chars, {prefix_tokens} tokens ({counter})")
+    if prefix_tokens < PROMPT_CACHE_MIN_TOKENS:
+        print(f"ℹ️ Abaixo do mínimo de cache da OpenAI ({PROMPT_CACHE_MIN_TOKENS}): prefixo estável, ainda sem cache.")
+    if prefix_a["content"] != CHAT_PROTOCOL:
+        failures.append("messages[0] não é exatamente CHAT_PROTOCOL")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ FALHA: {failure}")
+        raise SystemExit(1)
+    print("\n✅ SUCESSO: Prefixo idêntico para usuários, trânsitos e mensagens diferentes.")
+
+if __name__ == "__main__":
+    run_test()
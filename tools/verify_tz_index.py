@@ -0,0 +1,95 @@
+import os
+import random
+import tempfile
+
+from build_tz_index import build_index
+from tz_index import TimezoneIndex, get_default_index, ocean_zone
+
+# Coordenadas múltiplas de 1/16 grau: exatas em float32 (o índice guarda arestas em float32).
+# Longitudes aleatórias ficam fora dos meridianos náuticos (múltiplos de 7.5°), onde o arredondamento empata.
+SYNTHETIC = {
+    # Fronteira diagonal entre duas zonas vizinhas
+    "Test/West": [[[-50, -30], [-42.5, -30], [-47.5, -20], [-50, -20], [-50, -30]]],
+    "Test/East": [[[-42.5, -30], [-40, -30], [-40, -20], [-47.5, -20], [-42.5, -30]]],
+    # Zona com buraco (enclave) e a zona do enclave
+    "Test/Ring": [[[10, 10], [20, 10], [20, 20], [10, 20], [10, 10]],
+                  [[13.125, 13.125], [16.875, 13.125], [15, 16.875], [13.125, 13.125]]],
+    "Test/Enclave": [[[13.125, 13.125], [16.875, 13.125], [15, 16.875], [13.125, 13.125]]],
+}
+
+KNOWN_ZONES = [
+    ("London", 51.5074, -0.1278, "Europe/London"),
+    ("São Paulo", -23.5505, -46.6333, "America/Sao_Paulo"),
+    ("New York", 40.7128, -74.0060, "America/New_York"),
+    ("Lisboa", 38.7223, -9.1393, "Europe/Lisbon"),
+    ("Tokyo", 35.6762, 139.6503, "Asia/Tokyo"),
+    ("Sydney", -33.8688, 151.2093, "Australia/Sydney"),
+    ("Atlântico", 0.0, -30.0, "Etc/GMT+2"),
+]
+
+
+def point_in_rings(x, y, rings):
+    """Par/ímpar sobre todos os anéis (mesma regra do builder)."""
+    inside = False
+    for ring in rings:
+        for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+    return inside
+
+
+def expected_zone(lat, lon):
+    for zone, rings in SYNTHETIC.items():
+        if point_in_rings(lon, lat, rings):
+            return zone
+    return ocean_zone(lon)
+
+
+def run_test():
+    print("\n🔍 --- VERIFICANDO ÍNDICE OFFLINE DE FUSOS HORÁRIOS ---")
+    failures = []
+
+    # 1. Builder + lookup contra força bruta (polígonos sintéticos, células de fronteira)
+    features = [
+        {"type": "Feature", "properties": {"tzid": zone}, "geometry": {"type": "Polygon", "coordinates": rings}}
+        for zone, rings in SYNTHETIC.items()
+    ]
+    data = build_index(features, cell=0.5, tolerance=0)
+    fd, path = tempfile.mkstemp(suffix=".tzidx")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    try:
+        index = TimezoneIndex(path)
+        rng = random.Random(7)
+        points = [(-25.0, -45.0), (15.0, 15.0), (11.0, 11.0), (-20.0 + 1 / 8, -47.0)]
+        points += [(rng.randint(-35 * 8, 25 * 8) / 8, rng.randint(-55 * 8, 25 * 8) / 8 + 1 / 16) for _ in range(5000)]
+        mismatches = 0
+        for lat, lon in points:
+            got, want = index.lookup(lat, lon), expected_zone(lat, lon)
+            if got != want:
+                mismatches += 1
+                if mismatches <= 5:
+                    failures.append(f"Sintético ({lat}, {lon}): {got} != {want}")
+        print(f"🧪 Sintético: {len(points)} pontos, {mismatches} divergências")
+    finally:
+        os.remove(path)
+
+    # 2. Índice real (cache/timezones.tzidx ou TZ_INDEX_PATH), quando já construído
+    real_index = get_default_index()
+    if real_index is None:
+        print("ℹ️ Índice real não encontrado: rode `npm run build:tz` para checar cidades conhecidas.")
+    else:
+        for city, lat, lon, zone in KNOWN_ZONES:
+            got = real_index.lookup(lat, lon)
+            print(f"   {city}: {got}")
+            if got != zone:
+                failures.append(f"{city}: {got} != {zone}")
+
+    if failures:
+        for failure in failures:
+            print(f"❌ FALHA: {failure}")
+        raise SystemExit(1)
+    print("\n✅ SUCESSO: Índice de fusos resolve zonas, fronteiras e enclaves corretamente.")
+
+if __name__ == "__main__":
+    run_test()
@@ -1,11 +1,22 @@
-from kerykeion import AstrologicalSubject
 from datetime import datetime
 import json
 import math
+import os
+
+from ephemeris import ZODIAC_SIGNS
+
+# "swisseph" (default): charts from the shared ephemeris fast path (WheelEngine.from_charts)
+# "kerykeion": legacy backend, imported lazily only when selected
+WHEEL_BACKEND = os.getenv("WHEEL_BACKEND", "swisseph")
+
+WHEEL_PLANETS = ["Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto"]
 
 class WheelEngine:
     """Wrapper para manter compatibilidade com o agent_server.py chamando a nova Calculadora REAL. (v2.1)"""
     def __init__(self, name, year, month, day, hour, minute, city, country="US", lat=0, lon=0, target_date=None):
+        # Backend Kerykeion (fallback): import pesado, só quando usado
+        from kerykeion import AstrologicalSubject
+
         # 1. Mapa Natal (User)
         self.user = AstrologicalSubject(name, year, month, day, hour, minute, city, country)
         self.natal_chart = self._convert_to_json_structure(self.user)
@@ -25,6 +36,50 @@ class WheelEngine:
         # Instancia a calculadora real
         self.calculator = LifeWheelCalculator(self.natal_chart, self.transit_chart)
 
+    @classmethod
+    def from_charts(cls, natal_chart, transit_chart):
+        """
+        Backend Swisseph: usa os mapas já calculados (formato AstrologyEngine.calculate_chart,
+        com cusps) em vez de recalcular tudo via Kerykeion. Natal vem do cache, trânsito do SkySnapshot.
+        """
+        engine = cls.__new__(cls)
+        engine.natal_chart = cls._convert_chart_structure(natal_chart)
+        engine.transit_chart = cls._convert_chart_structure(transit_chart)
+        engine.calculator = LifeWheelCalculator(engine.natal_chart, engine.transit_chart)
+        return engine
+
+    @staticmethod
+    def _convert_chart_structure(chart):
+        """Converte um mapa do AstrologyEngine para a mesma estrutura de Casas e Planetas."""
+        wheel = {
+            "houses": {},
+            "planets": {}
+        }
+
+        # 1. Casas (Placidus). Sem hora de nascimento: casas solares em signos inteiros.
+        cusps = chart.get("cusps")
+        if not cusps:
+            sun_lon = chart.get("sun", {}).get("longitude", 0.0)
+            cusps = [(int(sun_lon // 30) * 30 + i * 30) % 360 for i in range(12)]
+        for i, cusp in enumerate(cusps):
+            wheel["houses"][i+1] = {
+                "sign": ZODIAC_SIGNS[int(cusp // 30) % 12],
+                "abs_pos": cusp
+            }
+
+        # 2. Planetas
+        for p in WHEEL_PLANETS:
+            p_data = chart.get(p.lower())
+            if p_data:
+                house = p_data.get("house", "Unknown")
+                wheel["planets"][p] = {
+                    "sign": p_data["sign"],
+                    "house": int(house) if str(house).isdigit() else 1,
+                    "abs_pos": p_data["longitude"]
+                }
+
+        return wheel
+
     def _convert_to_json_structure(self, subject):
         """Converte dados do Kerykeion para dicionário estruturado com Casas e Planetas e GRAUS."""
         chart = {
@@ -54,9 +109,7 @@ class WheelEngine:
                     chart["houses"][i+1] = {"sign": "Aries", "abs_pos": 0}
         
         # 2. Extrair Planetas
-        planets = ["Sun", "Moon", "Mercury", "Venus", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto"]
-        
-        for p in planets:
+        for p in WHEEL_PLANETS:
             p_obj = getattr(subject, p.lower(), None) # .sun, .moon
             if p_obj:
                 chart["planets"][p] = {